@@ -1,8 +1,10 @@
-from django.contrib.auth.models import User, update_last_login
+from django.contrib.auth.models import User
 from rest_framework.serializers import ModelSerializer
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer  #Gère l’authentification avec JWT.
 from rest_framework_simplejwt.settings import api_settings  #Accède aux paramètres de Django REST Framework JWT.
 
+from prepa_Auth_app.last_login import enregistrer_derniere_connexion
+
 
 #Le TokenSerializer joue un rôle clé dans l’authentification JWT: Son rôle principale est de générer un jeton
 #JWT(JSON Web Token) pour l'authentification des utilisateus dans l'API Django et de permettre au projet React
@@ -44,7 +46,9 @@ class RegisterSerializer(ModelSerializer):
 #Ce sérializer génère un token JWT (access + refresh) pour l’authentification.
 class TokenSerializer(TokenObtainPairSerializer):
   def validate(self, attrs):  #Surcharge la méthode validate() pour personnaliser la réponse.
-    data = super().validate(attrs)  #Appelle la validation par défaut de Django REST Framework.
+    #Appelle la validation par défaut (authentification) de TokenObtainSerializer: on saute celle de
+    #TokenObtainPairSerializer, qui génèrerait une seconde paire de jetons et un second UPDATE de last_login.
+    data = super(TokenObtainPairSerializer, self).validate(attrs)
 
     refresh = self.get_token(self.user) #Génère un token JWT.
 
@@ -53,7 +57,7 @@ class TokenSerializer(TokenObtainPairSerializer):
     #Ajoute les informations utilisateur à la réponse.
     data['user'] = UserSerializer(self.user, context={'request': self.context['request']}).data
 
-    if api_settings.UPDATE_LAST_LOGIN:  #Met à jour "last_login" si l'option est activée.
-      update_last_login(None, self.user)
+    if api_settings.UPDATE_LAST_LOGIN:  #Met à jour "last_login" si l'option est activée (en différé si LAST_LOGIN_DEFERRED).
+      enregistrer_derniere_connexion(self.user)
 
     return data
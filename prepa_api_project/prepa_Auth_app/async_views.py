@@ -0,0 +1,105 @@
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import authenticate
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import close_old_connections
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from prepa_Auth_app.last_login import enregistrer_derniere_connexion
+from prepa_Auth_app.utils import verify_recaptcha
+from prepa_Auth_app.Serializers import RegisterSerializer, UserSerializer
+
+
+# Variantes asynchrones (servies par asgi.py) de TokenViewSet et RegisterView.
+# Mêmes entrées et mêmes réponses que les versions synchrones, mais le worker n'attend plus:
+#  - la vérification reCAPTCHA et le hachage du mot de passe (connexion et inscription) sont délégués au pool
+#    de threads. La connexion passe par authenticate(), comme TokenSerializer, mais dans le pool: aauthenticate()
+#    de ModelBackend hache sur la boucle d'événements et bloquerait toutes les coroutines du worker (flux SSE).
+# Aucun client HTTP asynchrone n'est dans requirements.txt: le vérificateur (Session poolée) est réutilisé.
+
+verify_recaptcha_async = sync_to_async(verify_recaptcha, thread_sensitive=False)
+make_password_async = sync_to_async(make_password, thread_sensitive=False)
+
+
+def _authentifier(request, **identifiants):
+    # Thread du pool, hors du cycle de la requête: la connexion est rendue comme à la fin d'une requête synchrone
+    try:
+        return authenticate(request, **identifiants)
+    finally:
+        close_old_connections()
+
+
+authenticate_async = sync_to_async(_authentifier, thread_sensitive=False)
+
+
+def _lire_json(request):
+    try:
+        return json.loads(request.body or b'{}')
+    except ValueError:
+        return None
+
+
+#Connexion: retourne "access", "refresh" et l'utilisateur, comme TokenSerializer.
+@csrf_exempt
+@require_POST
+async def token_async(request):
+    data = _lire_json(request)
+    if not isinstance(data, dict):
+        return JsonResponse({"error": "JSON invalide"}, status=400)
+
+    # Captcha d'abord: sans lui, pas de hachage de mot de passe (coûteux) ni d'échec de connexion enregistré
+    if not await verify_recaptcha_async(data.get("recaptcha_token")):
+        return JsonResponse({"error": "reCAPTCHA invalide"}, status=400)
+
+    # AUTHENTICATION_BACKENDS, signal user_login_failed et mise à niveau du hachage, comme la version synchrone
+    user = await authenticate_async(request, username=data.get("username"), password=data.get("password"))
+    if not api_settings.USER_AUTHENTICATION_RULE(user):
+        return JsonResponse('no_active_account', status=401, safe=False)
+
+    refresh = RefreshToken.for_user(user)
+    if api_settings.UPDATE_LAST_LOGIN:
+        await sync_to_async(enregistrer_derniere_connexion)(user)
+
+    return JsonResponse({
+        'refresh': str(refresh),
+        'access': str(refresh.access_token),
+        'user': UserSerializer(user).data,
+    })
+
+
+#Inscription: mêmes contrôles que RegisterView.
+@csrf_exempt
+@require_POST
+async def register_async(request):
+    data = _lire_json(request)
+    if not isinstance(data, dict):
+        return JsonResponse({"error": "JSON invalide"}, status=400)
+
+    recaptcha_ok, username_pris, email_pris = await asyncio.gather(
+        verify_recaptcha_async(data.get("recaptcha_token")),
+        User.objects.filter(username=data.get("username")).aexists(),
+        User.objects.filter(email=data.get("email")).aexists(),
+    )
+    if not recaptcha_ok:
+        return JsonResponse({"error": "reCAPTCHA invalide"}, status=400)
+    if username_pris:
+        return JsonResponse('username_already_exists', status=400, safe=False)
+    if email_pris:
+        return JsonResponse('email_already_exists', status=400, safe=False)
+
+    serializer = RegisterSerializer(data=data)
+    if not await sync_to_async(serializer.is_valid)():
+        return JsonResponse(serializer.errors, status=400)
+
+    donnees = dict(serializer.validated_data)
+    donnees['password'] = await make_password_async(donnees['password'])
+    user = await User.objects.acreate(**donnees)
+
+    return JsonResponse(UserSerializer(user).data, status=201)
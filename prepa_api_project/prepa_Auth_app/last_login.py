@@ -0,0 +1,82 @@
+import atexit
+import logging
+import threading
+
+from django.conf import settings
+from django.contrib.auth.models import User, update_last_login
+from django.db import close_old_connections
+from django.db.models import Case, DateTimeField, Q, Value, When
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# Utilisateurs par UPDATE
+TAILLE_LOT = 500
+
+
+#Tampon des dates de dernière connexion: au lieu d'un UPDATE auth_user à chaque jeton émis, on garde
+#user_id -> date en mémoire et on écrit le tout en un seul UPDATE toutes les
+#LAST_LOGIN_FLUSH_INTERVAL secondes (et à l'arrêt du processus).
+#L'UPDATE ne recule jamais une date: une connexion plus récente écrite entre-temps (autre processus,
+#connexion non différée) est gardée.
+class LastLoginBuffer:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def record(self, user):
+        maintenant = timezone.now()
+        user.last_login = maintenant  # La réponse reflète déjà la connexion
+        with self._lock:
+            self._pending[user.pk] = maintenant
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._boucle, name='last-login-flush', daemon=True)
+                self._thread.start()
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+        try:
+            pks = sorted(pending)
+            for i in range(0, len(pks), TAILLE_LOT):
+                lot = pks[i:i + TAILLE_LOT]
+                date = Case(*(When(pk=pk, then=Value(pending[pk])) for pk in lot), output_field=DateTimeField())
+                User.objects.filter(Q(last_login__isnull=True) | Q(last_login__lt=date), pk__in=lot).update(
+                    last_login=date
+                )
+        except Exception:
+            logger.exception("Écriture des dernières connexions impossible (%d utilisateurs)", len(pending))
+            with self._lock:
+                # On remet les dates en attente sans écraser une connexion plus récente
+                for pk, date in pending.items():
+                    self._pending.setdefault(pk, date)
+            return 0
+        return len(pending)
+
+    def _flush_thread(self):
+        # Thread hors requête: personne d'autre ne ferme sa connexion (coupée par le serveur, CONN_MAX_AGE)
+        close_old_connections()
+        try:
+            self.flush()
+        finally:
+            close_old_connections()
+
+    def _boucle(self):
+        while not self._stop.wait(settings.LAST_LOGIN_FLUSH_INTERVAL):
+            self._flush_thread()
+
+
+last_login_buffer = LastLoginBuffer()
+atexit.register(last_login_buffer.flush)
+
+
+def enregistrer_derniere_connexion(user):
+    """Met à jour last_login, immédiatement ou en différé selon settings.LAST_LOGIN_DEFERRED."""
+    if settings.LAST_LOGIN_DEFERRED:
+        last_login_buffer.record(user)
+    else:
+        update_last_login(None, user)
@@ -0,0 +1,52 @@
+import asyncio
+import time
+import uuid
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.test import AsyncClient, override_settings
+
+
+class Command(BaseCommand):
+    help = ("Compare les connexions/seconde de /token/ (synchrone) et /async/token/ (asynchrone) "
+            "servies par le handler ASGI, avec une latence reCAPTCHA simulée.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--connexions', type=int, default=50, help="Nombre de connexions simultanées")
+        parser.add_argument('--latence-captcha', type=float, default=0.15,
+                            help="Latence simulée de Google reCAPTCHA, en secondes")
+
+    def handle(self, *args, **options):
+        username = f'bench-{uuid.uuid4().hex[:8]}'
+        password = uuid.uuid4().hex
+        User.objects.create_user(username=username, password=password)
+
+        try:
+            with override_settings(
+                ALLOWED_HOSTS=['testserver'],
+                RECAPTCHA_BACKEND='prepa_Auth_app.utils.LocalRecaptchaBackend',
+                RECAPTCHA_LOCAL_LATENCY=options['latence_captcha'],
+            ):
+                for url in ('/token/', '/async/token/'):
+                    duree, succes = asyncio.run(self.rafale(url, username, password, options['connexions']))
+                    self.stdout.write(
+                        f"{url:<15} {succes}/{options['connexions']} connexions en {duree:.2f}s "
+                        f"-> {succes / duree:.1f} connexions/s"
+                    )
+        finally:
+            User.objects.filter(username=username).delete()
+
+    async def rafale(self, url, username, password, nombre):
+        client = AsyncClient()
+
+        async def connexion(i):
+            response = await client.post(url, {
+                'username': username,
+                'password': password,
+                'recaptcha_token': f'{url}-{i}-{uuid.uuid4().hex}',  # Jetons distincts: pas de hit cache
+            }, content_type='application/json')
+            return response.status_code == 200
+
+        debut = time.perf_counter()
+        resultats = await asyncio.gather(*(connexion(i) for i in range(nombre)))
+        return time.perf_counter() - debut, sum(resultats)
@@ -1,3 +1,202 @@
-from django.test import TestCase
+import asyncio
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+import requests
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+from django.contrib.auth.models import User
+from django.contrib.auth.signals import user_login_failed
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework_simplejwt.settings import api_settings
+
+from prepa_Auth_app.last_login import last_login_buffer
+from prepa_Auth_app.utils import GoogleRecaptchaBackend, RecaptchaVerifier, LocalRecaptchaBackend
+
+
+class RecaptchaVerifierTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_jeton_a_usage_unique(self):
+        backend = mock.Mock(wraps=LocalRecaptchaBackend())
+        verifier = RecaptchaVerifier(backend=backend)
+
+        self.assertTrue(verifier.verify('jeton'))
+        self.assertFalse(verifier.verify('jeton'))  # Rejeu refusé, sans appel au backend
+
+        backend.verify.assert_called_once_with('jeton')
+        self.assertEqual(verifier.metrics.snapshot()['rejeux'], 1)
+
+    def test_jeton_refuse_reverifie(self):
+        backend = mock.Mock()
+        backend.verify.side_effect = [False, True]
+        verifier = RecaptchaVerifier(backend=backend)
+
+        self.assertFalse(verifier.verify('jeton'))
+        self.assertTrue(verifier.verify('jeton'))
+        self.assertEqual(backend.verify.call_count, 2)
+
+    def test_jeton_vide_refuse_sans_appel(self):
+        backend = mock.Mock(wraps=LocalRecaptchaBackend())
+        verifier = RecaptchaVerifier(backend=backend)
+
+        self.assertFalse(verifier.verify(''))
+        self.assertFalse(verifier.verify(None))
+        backend.verify.assert_not_called()
+
+    @override_settings(RECAPTCHA_TIMEOUT=(1, 1))
+    def test_google_timeout_refuse(self):
+        backend = GoogleRecaptchaBackend()
+        with mock.patch.object(backend.session, 'post', side_effect=requests.Timeout) as post:
+            self.assertFalse(backend.verify('jeton'))
+        self.assertEqual(post.call_args.kwargs['timeout'], (1, 1))
+
+
+# TransactionTestCase: authenticate() tourne dans le pool de threads, sur une autre connexion que le test
+@override_settings(RECAPTCHA_BACKEND='prepa_Auth_app.utils.LocalRecaptchaBackend')
+class AsyncLoginTests(TransactionTestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('marie', 'marie@example.com', 'motdepasse-solide')
+
+    async def test_token_async(self):
+        response = await self.async_client.post('/async/token/', {
+            'username': 'marie', 'password': 'motdepasse-solide', 'recaptcha_token': 'ok',
+        }, content_type='application/json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('access', response.json())
+        self.assertEqual(response.json()['user']['email'], 'marie@example.com')
+
+    async def test_token_async_mauvais_mot_de_passe(self):
+        response = await self.async_client.post('/async/token/', {
+            'username': 'marie', 'password': 'faux', 'recaptcha_token': 'ok',
+        }, content_type='application/json')
+
+        self.assertEqual(response.status_code, 401)
+
+    async def test_token_async_passe_par_authenticate(self):
+        echecs = []
+
+        def echec(sender, credentials, **kwargs):
+            echecs.append(credentials['username'])
+        user_login_failed.connect(echec)
+        self.addCleanup(user_login_failed.disconnect, echec)
+
+        response = await self.async_client.post('/async/token/', {
+            'username': 'marie', 'password': 'faux', 'recaptcha_token': 'jeton-1',
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(echecs, ['marie'])  # Vu par les outils de verrouillage/audit, comme la connexion synchrone
+
+        self.user.is_active = False
+        await self.user.asave()
+        response = await self.async_client.post('/async/token/', {
+            'username': 'marie', 'password': 'motdepasse-solide', 'recaptcha_token': 'jeton-2',
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, 401)
+
+    async def test_token_async_hache_hors_boucle(self):
+        sur_la_boucle = []
+        encode = PBKDF2PasswordHasher.encode
+
+        def espion(hasher, *args, **kwargs):
+            try:
+                asyncio.get_running_loop()
+                sur_la_boucle.append(True)
+            except RuntimeError:
+                sur_la_boucle.append(False)
+            return encode(hasher, *args, **kwargs)
+
+        with mock.patch.object(PBKDF2PasswordHasher, 'encode', espion):
+            for username, token in (('marie', 'jeton-1'), ('inconnu', 'jeton-2')):  # Inconnu: hachage factice
+                await self.async_client.post('/async/token/', {
+                    'username': username, 'password': 'motdepasse-solide', 'recaptcha_token': token,
+                }, content_type='application/json')
+
+        self.assertTrue(sur_la_boucle)
+        self.assertNotIn(True, sur_la_boucle)  # Jamais sur la boucle d'événements du worker
+
+    async def test_token_async_captcha_invalide(self):
+        response = await self.async_client.post('/async/token/', {
+            'username': 'marie', 'password': 'motdepasse-solide', 'recaptcha_token': '',
+        }, content_type='application/json')
+
+        self.assertEqual(response.status_code, 400)
+
+    async def test_register_async(self):
+        response = await self.async_client.post('/async/register/', {
+            'username': 'luc', 'email': 'luc@example.com', 'password': 'secret-123',
+            'first_name': 'Luc', 'last_name': 'Roy', 'recaptcha_token': 'ok',
+        }, content_type='application/json')
+
+        self.assertEqual(response.status_code, 201)
+        user = await User.objects.aget(username='luc')
+        self.assertTrue(user.check_password('secret-123'))
+
+    async def test_register_async_username_pris(self):
+        response = await self.async_client.post('/async/register/', {
+            'username': 'marie', 'email': 'autre@example.com', 'password': 'secret-123',
+            'recaptcha_token': 'ok',
+        }, content_type='application/json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), 'username_already_exists')
+
+
+@override_settings(RECAPTCHA_BACKEND='prepa_Auth_app.utils.LocalRecaptchaBackend', LAST_LOGIN_DEFERRED=True)
+class LastLoginDiffereTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('marie', 'marie@example.com', 'motdepasse-solide')
+        # simplejwt garde une référence à ses réglages: override_settings(SIMPLE_JWT=...) n'y suffit pas
+        patcher = mock.patch.object(api_settings, 'UPDATE_LAST_LOGIN', True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_connexion_sans_ecriture_puis_flush_en_lot(self):
+        autre = User.objects.create_user('luc', 'luc@example.com', 'motdepasse-solide')
+
+        with CaptureQueriesContext(connection) as requetes:
+            for username in ('marie', 'luc'):
+                response = self.client.post('/token/', {
+                    'username': username, 'password': 'motdepasse-solide', 'recaptcha_token': f'ok-{username}',
+                }, content_type='application/json')
+                self.assertEqual(response.status_code, 200)
+
+        self.assertFalse([q for q in requetes.captured_queries if q['sql'].startswith('UPDATE')])
+        self.user.refresh_from_db()
+        self.assertIsNone(self.user.last_login)
+
+        with CaptureQueriesContext(connection) as requetes:
+            self.assertEqual(last_login_buffer.flush(), 2)
+        self.assertEqual(len(requetes.captured_queries), 1)
+
+        self.user.refresh_from_db()
+        autre.refresh_from_db()
+        self.assertIsNotNone(self.user.last_login)
+        self.assertIsNotNone(autre.last_login)
+
+    def test_flush_ne_recule_pas_une_connexion_plus_recente(self):
+        ancienne = timezone.now() - timedelta(minutes=5)
+        with mock.patch('prepa_Auth_app.last_login.timezone.now', return_value=ancienne):
+            last_login_buffer.record(self.user)
+        recente = timezone.now()
+        User.objects.filter(pk=self.user.pk).update(last_login=recente)  # Ex. écrite par un autre processus
+
+        last_login_buffer.flush()
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.last_login, recente)
+
+    def test_flush_du_thread_ferme_les_connexions(self):
+        with mock.patch('prepa_Auth_app.last_login.close_old_connections') as fermer:
+            last_login_buffer._flush_thread()
+        self.assertEqual(fermer.call_count, 2)  # Avant et après l'écriture
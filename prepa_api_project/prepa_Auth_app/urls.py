@@ -1,7 +1,7 @@
 from django.urls import include, path
 from rest_framework import routers  #Gère les routes automatiques pour les ViewSets.
 
-from prepa_Auth_app import views
+from prepa_Auth_app import async_views, views
 
 
 # Seulement pour modifier le nom du router (Api Root --> Api Auth)
@@ -42,6 +42,10 @@ urlpatterns = [
     # Appeler en DELETE
     path('user-delete/me/', views.CurrentUserDeleteView.as_view()),  # /api/auth/user-delete/me/
 
+    # Variantes asynchrones (servies par ASGI), appeler en POST
+    path('async/token/', async_views.token_async),  # /api/auth/async/token/
+    path('async/register/', async_views.register_async),  # /api/auth/async/register/
+
 ]
 
 # Ce fichier gère toutes les routes d'authentification et de gestion des utilisateurs
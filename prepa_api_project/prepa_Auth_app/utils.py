@@ -1,14 +1,143 @@
+import hashlib
+import logging
+import threading
+import time
+from collections import deque
+
 import requests
+from requests.adapters import HTTPAdapter
 from django.conf import settings
+from django.core.cache import cache
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+RECAPTCHA_VERIFY_URL = "https://www.google.com/recaptcha/api/siteverify"
+
+
+#Backend de production: une Session requests partagée garde les connexions TLS ouvertes (keep-alive)
+#vers Google, au lieu d'une nouvelle poignée de main à chaque connexion/inscription.
+class GoogleRecaptchaBackend:
+    def __init__(self):
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=settings.RECAPTCHA_POOL_SIZE)
+        self.session.mount("https://", adapter)
+
+    def verify(self, token: str) -> bool:
+        try:
+            response = self.session.post(
+                RECAPTCHA_VERIFY_URL,
+                data={
+                    "secret": settings.RECAPTCHA_SECRET_KEY,  # On lira la clé depuis les settings
+                    "response": token,
+                },
+                timeout=settings.RECAPTCHA_TIMEOUT,  # (connexion, lecture) en secondes
+            )
+            result = response.json()
+        except (requests.RequestException, ValueError) as e:
+            # Google lent ou injoignable: on refuse plutôt que de bloquer un worker indéfiniment.
+            logger.warning("Vérification reCAPTCHA impossible: %s", e)
+            return False
+        return result.get("success", False)
+
+
+#Backend local pour les tests et le développement: aucun appel réseau, tout jeton non vide est accepté.
+#RECAPTCHA_LOCAL_LATENCY simule le temps d'aller-retour vers Google (benchmarks).
+class LocalRecaptchaBackend:
+    def verify(self, token: str) -> bool:
+        if settings.RECAPTCHA_LOCAL_LATENCY:
+            time.sleep(settings.RECAPTCHA_LOCAL_LATENCY)
+        return bool(token)
+
+
+#Mesures de latence des vérifications (en mémoire, par processus).
+class RecaptchaMetrics:
+    def __init__(self, taille_fenetre=1000):
+        self._lock = threading.Lock()
+        self._durees = deque(maxlen=taille_fenetre)
+        self.appels = 0
+        self.succes = 0
+        self.rejeux = 0
+
+    def enregistrer(self, duree, succes):
+        with self._lock:
+            self.appels += 1
+            self.succes += int(succes)
+            self._durees.append(duree)
+
+    def enregistrer_rejeu(self):
+        with self._lock:
+            self.rejeux += 1
+
+    def percentile(self, p):
+        with self._lock:
+            durees = sorted(self._durees)
+        if not durees:
+            return 0.0
+        return durees[min(len(durees) - 1, int(len(durees) * p / 100))]
+
+    def snapshot(self):
+        return {
+            "appels": self.appels,
+            "succes": self.succes,
+            "rejeux": self.rejeux,
+            "p50_ms": round(self.percentile(50) * 1000, 1),
+            "p99_ms": round(self.percentile(99) * 1000, 1),
+        }
+
+
+#Service de vérification: backend interchangeable (settings.RECAPTCHA_BACKEND), jetons à usage unique et mesures.
+#Chaque jeton est marqué dans le cache (cache.add, atomique) avant la vérification: un jeton déjà présenté est
+#refusé sans aller-retour vers Google, un captcha résolu ne sert pas à plusieurs essais de mot de passe.
+class RecaptchaVerifier:
+    def __init__(self, backend=None):
+        self.backend = backend or import_string(settings.RECAPTCHA_BACKEND)()
+        self.metrics = RecaptchaMetrics()
+
+    @staticmethod
+    def cache_key(token):
+        return "recaptcha:" + hashlib.sha256(token.encode()).hexdigest()
+
+    def verify(self, token: str) -> bool:
+        if not token:
+            return False
+
+        key = self.cache_key(token)
+        if not cache.add(key, True, settings.RECAPTCHA_CACHE_TTL):
+            self.metrics.enregistrer_rejeu()
+            return False
+
+        debut = time.perf_counter()
+        succes = self.backend.verify(token)
+        self.metrics.enregistrer(time.perf_counter() - debut, succes)
+
+        if not succes:
+            cache.delete(key)  # Refus (ou Google injoignable): un nouvel essai repasse par le backend
+        return succes
+
+
+_verifier = None
+_verifier_lock = threading.Lock()
+
+
+def get_recaptcha_verifier() -> RecaptchaVerifier:
+    global _verifier
+    if _verifier is None:
+        with _verifier_lock:
+            if _verifier is None:
+                _verifier = RecaptchaVerifier()
+    return _verifier
+
+
+@receiver(setting_changed)
+def _reset_recaptcha_verifier(setting, **kwargs):
+    # Permet override_settings(RECAPTCHA_BACKEND=...) dans les tests
+    global _verifier
+    if setting.startswith("RECAPTCHA_"):
+        _verifier = None
+
 
 def verify_recaptcha(token: str) -> bool:
-    secret_key = settings.RECAPTCHA_SECRET_KEY  # On lira la clé depuis les settings
-    response = requests.post(
-        "https://www.google.com/recaptcha/api/siteverify",
-        data={
-            "secret": secret_key,
-            "response": token,
-        },
-    )
-    result = response.json()
-    return result.get("success", False)
+    return get_recaptcha_verifier().verify(token)
@@ -1,15 +1,30 @@
 # admin.py
 from django.contrib import admin
 from django.utils.html import format_html
-from django.db.models import Count, Q
+from django.db.models import Count, F, Max, OuterRef, Q, Subquery
 from django.utils.safestring import mark_safe
 from django.contrib import messages
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
 from django.utils import timezone
 from datetime import timedelta
-from django.http import HttpResponse
-import csv
 
-from .models import Employe, Technicien, ModeleIA, Alerte
+from .annuaire import couleur_avatar, get_annuaire
+from .cache import panneau_en_cache
+from .delais import hors_sla
+from .epi import filtrer_par_epi, libelles_pour, prochain_bit
+from .export_analytique import reponse_export_streaming
+from .miniatures import planifier_miniatures, url_apercu
+from .modeles_actifs import invalider_modeles
+from .models import (
+    Employe, Technicien, ModeleIA, Alerte, HistoriqueStatutAlerte, MetriquesEmployeModele, MetriquesModeleIA, TypeEpi,
+)
+from .statistiques import resume, totaux_par_periodes
+from .transitions import changer_statut
+from .utils import reponse_csv_streaming
+
+# Nombre de lignes lues par aller-retour du curseur serveur lors des exports
+TAILLE_LOT_EXPORT = 2000
 
 
 # ============================================================================
@@ -44,7 +59,7 @@ class AlerteNonTraiteeFilter(admin.SimpleListFilter):
             ('non_traite', 'Non traitées'),
             ('en_cours', 'En cours'),
             ('traite', 'Traitées'),
-            ('urgent', 'Urgentes (>24h)'),
+            ('urgent', 'Hors SLA'),
         )
 
     def queryset(self, request, queryset):
@@ -55,8 +70,8 @@ class AlerteNonTraiteeFilter(admin.SimpleListFilter):
         if self.value() == 'traite':
             return queryset.filter(statut__in=['RESOLU', 'IGNORE'])
         if self.value() == 'urgent':
-            limite = timezone.now() - timedelta(hours=24)
-            return queryset.filter(statut='NOUVEAU', created_at__lt=limite)
+            # Délai de prise en charge ou de traitement dépassé pour le niveau de l'alerte (settings.ALERTES_SLA_*)
+            return queryset.filter(hors_sla())
 
 
 class NiveauGraviteFilter(admin.SimpleListFilter):
@@ -77,6 +92,19 @@ class NiveauGraviteFilter(admin.SimpleListFilter):
             return queryset.filter(niveau=self.value())
 
 
+class TypeEpiManquantFilter(admin.SimpleListFilter):
+    """Filtre par type d'EPI manquant (test de bit sur le masque)"""
+    title = 'EPI manquant'
+    parameter_name = 'epi'
+
+    def lookups(self, request, model_admin):
+        return TypeEpi.objects.values_list('code', 'libelle')
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return filtrer_par_epi(queryset, self.value())
+
+
 # ============================================================================
 # INLINE ADMIN
 # ============================================================================
@@ -106,8 +134,8 @@ class AlerteInlineEmploye(admin.TabularInline):
     def image_miniature(self, obj):
         if obj.image:
             return format_html(
-                '<img src="{}" width="50" height="50" style="object-fit: cover; border-radius: 4px;" />',
-                obj.image.url
+                '<img src="{}" width="50" height="50" loading="lazy" style="object-fit: cover; border-radius: 4px;" />',
+                url_apercu(obj)
             )
         return "Pas d'image"
 
@@ -134,6 +162,23 @@ class AlerteInlineModeleIA(admin.TabularInline):
         return qs.order_by('-created_at')[:10]
 
 
+class HistoriqueStatutInline(admin.TabularInline):
+    """Inline pour afficher l'historique des statuts d'une alerte"""
+    model = HistoriqueStatutAlerte
+    extra = 0
+    fields = ['created_at', 'utilisateur', 'statut_avant', 'statut_apres', 'niveau_avant', 'niveau_apres']
+    readonly_fields = fields
+    can_delete = False
+    verbose_name = "Changement"
+    verbose_name_plural = "Historique des statuts"
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('utilisateur')
+
+
 # ============================================================================
 # ADMIN EMPLOYE
 # ============================================================================
@@ -188,11 +233,23 @@ class EmployeAdmin(admin.ModelAdmin):
 
     actions = ['activer_employes', 'desactiver_employes', 'exporter_rapport_csv']
 
+    def get_queryset(self, request):
+        # Tous les agrégats de la liste sont calculés en une seule requête annotée
+        # au lieu de ~6 requêtes par ligne dans les badges.
+        qs = super().get_queryset(request)
+        derniere_alerte = Alerte.objects.filter(employee=OuterRef('pk')).order_by('-created_at')
+        return qs.annotate(
+            nb_alertes=Count('alertes'),
+            nb_alertes_critiques=Count('alertes', filter=Q(alertes__niveau='CRITIQUE')),
+            nb_alertes_nouvelles=Count('alertes', filter=Q(alertes__statut='NOUVEAU')),
+            nb_alertes_en_cours=Count('alertes', filter=Q(alertes__statut='EN_COURS')),
+            derniere_alerte_date=Max('alertes__created_at'),
+            derniere_alerte_niveau=Subquery(derniere_alerte.values('niveau')[:1]),
+        )
+
     def nom_complet_badge(self, obj):
         """Affiche le nom complet avec avatar coloré"""
-        couleurs = ['#FF6B6B', '#4ECDC4', '#45B7D1', '#FFA07A', '#98D8C8', '#F7DC6F']
-        index_couleur = hash(obj.name) % len(couleurs)
-        couleur = couleurs[index_couleur]
+        couleur = couleur_avatar(obj.name)
 
         return format_html(
             '<div style="display: flex; align-items: center; gap: 10px;">'
@@ -234,8 +291,8 @@ class EmployeAdmin(admin.ModelAdmin):
 
     def nombre_alertes_badge(self, obj):
         """Nombre total d'alertes avec badge"""
-        count = obj.alertes.count()
-        critique = obj.alertes.filter(niveau='CRITIQUE').count()
+        count = obj.nb_alertes
+        critique = obj.nb_alertes_critiques
 
         if critique > 0:
             color = 'linear-gradient(135deg, #fa709a 0%, #fee140 100%)'
@@ -260,11 +317,12 @@ class EmployeAdmin(admin.ModelAdmin):
         )
 
     nombre_alertes_badge.short_description = 'Total Alertes'
+    nombre_alertes_badge.admin_order_field = 'nb_alertes'
 
     def alertes_non_traitees_badge(self, obj):
         """Alertes en attente avec animation"""
-        nouveau = obj.alertes.filter(statut='NOUVEAU').count()
-        en_cours = obj.alertes.filter(statut='EN_COURS').count()
+        nouveau = obj.nb_alertes_nouvelles
+        en_cours = obj.nb_alertes_en_cours
 
         if nouveau > 0:
             return format_html(
@@ -286,12 +344,12 @@ class EmployeAdmin(admin.ModelAdmin):
         return format_html('<span style="color: #4CAF50; font-size: 18px;">✓</span>')
 
     alertes_non_traitees_badge.short_description = 'À traiter'
+    alertes_non_traitees_badge.admin_order_field = 'nb_alertes_nouvelles'
 
     def derniere_alerte_info(self, obj):
         """Info sur la dernière alerte"""
-        alerte = obj.alertes.order_by('-created_at').first()
-        if alerte:
-            delta = timezone.now() - alerte.created_at
+        if obj.derniere_alerte_date:
+            delta = timezone.now() - obj.derniere_alerte_date
             if delta.days == 0:
                 if delta.seconds < 3600:
                     temps = f"{delta.seconds // 60} min"
@@ -312,23 +370,26 @@ class EmployeAdmin(admin.ModelAdmin):
                 'MOYEN': '🟡',
                 'FAIBLE': '🟢'
             }
-            icon = niveau_icons.get(alerte.niveau, '⚪')
+            icon = niveau_icons.get(obj.derniere_alerte_niveau, '⚪')
+            niveau = dict(Alerte.NIVEAU_CHOICES).get(obj.derniere_alerte_niveau, obj.derniere_alerte_niveau)
 
             return format_html(
                 '<div style="font-size: 11px; text-align: center;">'
                 '<div style="color: {}; font-weight: 600;">{}</div>'
                 '<div style="color: #666; margin-top: 2px;">{} {}</div>'
                 '</div>',
-                color, temps, icon, alerte.get_niveau_display()
+                color, temps, icon, niveau
             )
         return format_html('<span style="color: #9E9E9E;">Aucune</span>')
 
     derniere_alerte_info.short_description = 'Dernière'
+    derniere_alerte_info.admin_order_field = 'derniere_alerte_date'
 
+    @panneau_en_cache('employe')
     def statistiques_alertes_display(self, obj):
         """Affichage des statistiques avec design moderne"""
-        alertes = obj.alertes.all()
-        total = alertes.count()
+        stats = resume(employee=obj)
+        total = stats['total']
 
         if total == 0:
             return format_html(
@@ -341,19 +402,8 @@ class EmployeAdmin(admin.ModelAdmin):
                 '</div>'
             )
 
-        stats_statut = {
-            'NOUVEAU': alertes.filter(statut='NOUVEAU').count(),
-            'EN_COURS': alertes.filter(statut='EN_COURS').count(),
-            'RESOLU': alertes.filter(statut='RESOLU').count(),
-            'IGNORE': alertes.filter(statut='IGNORE').count(),
-        }
-
-        stats_niveau = {
-            'CRITIQUE': alertes.filter(niveau='CRITIQUE').count(),
-            'ELEVE': alertes.filter(niveau='ELEVE').count(),
-            'MOYEN': alertes.filter(niveau='MOYEN').count(),
-            'FAIBLE': alertes.filter(niveau='FAIBLE').count(),
-        }
+        stats_statut = stats['statut']
+        stats_niveau = stats['niveau']
 
         taux_resolution = (stats_statut['RESOLU'] / total * 100) if total > 0 else 0
 
@@ -468,24 +518,17 @@ class EmployeAdmin(admin.ModelAdmin):
 
     statistiques_alertes_display.short_description = 'Vue d\'ensemble'
 
+    @panneau_en_cache('employe')
     def graphique_alertes(self, obj):
         """Graphique visuel des alertes sur 7 jours"""
-        from datetime import timedelta
-
-        alertes = obj.alertes.all()
-        if not alertes.exists():
+        # Préparer les données pour les 7 derniers jours (une requête sur les statistiques journalières)
+        aujourdhui = timezone.localdate()
+        jours = [aujourdhui - timedelta(days=i) for i in range(6, -1, -1)]
+        total, counts = totaux_par_periodes([(jour, jour) for jour in jours], employee=obj)
+        if total == 0:
             return "Pas de données"
 
-        # Préparer les données pour les 7 derniers jours
-        aujourdhui = timezone.now().date()
-        donnees_jours = []
-
-        for i in range(6, -1, -1):
-            jour = aujourdhui - timedelta(days=i)
-            count = alertes.filter(
-                created_at__date=jour
-            ).count()
-            donnees_jours.append((jour, count))
+        donnees_jours = list(zip(jours, counts))
 
         max_count = max([c for _, c in donnees_jours]) if donnees_jours else 1
 
@@ -538,6 +581,7 @@ class EmployeAdmin(admin.ModelAdmin):
 
     graphique_alertes.short_description = 'Tendance hebdomadaire'
 
+    @panneau_en_cache('employe')
     def timeline_alertes(self, obj):
         """Timeline des 15 dernières alertes"""
         alertes = obj.alertes.order_by('-created_at')[:15]
@@ -625,41 +669,37 @@ class EmployeAdmin(admin.ModelAdmin):
 
     # Actions personnalisées
     def activer_employes(self, request, queryset):
-        count = queryset.update(status='ACTIF')
+        count = queryset.update(status='ACTIF', updated_at=timezone.now())  # Annuaire et flux de changements
         self.message_user(request, f'{count} employé(s) activé(s) avec succès.', messages.SUCCESS)
 
     activer_employes.short_description = "✅ Activer les employés sélectionnés"
 
     def desactiver_employes(self, request, queryset):
-        count = queryset.update(status='INACTIF')
+        count = queryset.update(status='INACTIF', updated_at=timezone.now())
         self.message_user(request, f'{count} employé(s) désactivé(s) avec succès.', messages.WARNING)
 
     desactiver_employes.short_description = "❌ Désactiver les employés sélectionnés"
 
     def exporter_rapport_csv(self, request, queryset):
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = 'attachment; filename="rapport_employes.csv"'
-        response.write('\ufeff')  # BOM pour Excel
-
-        writer = csv.writer(response, delimiter=';')
-        writer.writerow(['ID', 'Nom', 'Prénom', 'Poste', 'Département', 'Statut',
-                         'Total Alertes', 'Alertes Non Traitées', 'Alertes Critiques'])
-
-        for employe in queryset:
-            writer.writerow([
-                employe.id,
-                employe.name,
-                employe.surname,
-                employe.poste,
-                employe.department,
-                employe.get_status_display(),
-                employe.alertes.count(),
-                employe.alertes.filter(statut='NOUVEAU').count(),
-                employe.alertes.filter(niveau='CRITIQUE').count(),
-            ])
-
-        self.message_user(request, f'Rapport CSV généré pour {queryset.count()} employé(s).', messages.SUCCESS)
-        return response
+        # Le queryset de l'action vient de get_queryset(): les compteurs d'alertes sont déjà annotés.
+        statuts = dict(Employe.STATUS_CHOICES)
+        employes = queryset.values_list(
+            'id', 'name', 'surname', 'poste', 'department', 'status',
+            'nb_alertes', 'nb_alertes_nouvelles', 'nb_alertes_critiques',
+        ).order_by('pk').iterator(chunk_size=TAILLE_LOT_EXPORT)
+
+        lignes = (
+            (pk, nom, prenom, poste, departement, statuts.get(statut, statut), total, nouvelles, critiques)
+            for pk, nom, prenom, poste, departement, statut, total, nouvelles, critiques in employes
+        )
+
+        self.message_user(request, 'Rapport CSV des employés sélectionnés en cours de téléchargement.', messages.SUCCESS)
+        return reponse_csv_streaming(
+            'rapport_employes.csv',
+            ['ID', 'Nom', 'Prénom', 'Poste', 'Département', 'Statut',
+             'Total Alertes', 'Alertes Non Traitées', 'Alertes Critiques'],
+            lignes
+        )
 
     exporter_rapport_csv.short_description = "📥 Exporter en CSV"
 
@@ -734,6 +774,29 @@ class TechnicienAdmin(admin.ModelAdmin):
     employe_info.short_description = 'Poste / Département'
 
 
+# ============================================================================
+# ADMIN TYPE EPI
+# ============================================================================
+
+@admin.register(TypeEpi)
+class TypeEpiAdmin(admin.ModelAdmin):
+    """Types d'EPI: le bit est attribué automatiquement et ne change plus (il est stocké dans les masques)"""
+    list_display = ['libelle', 'code', 'bit']
+    search_fields = ['libelle', 'code']
+    readonly_fields = ['bit']
+
+    def get_readonly_fields(self, request, obj=None):
+        return ['code', 'bit'] if obj else ['bit']
+
+    def save_model(self, request, obj, form, change):
+        if not change:
+            obj.bit = prochain_bit()
+        super().save_model(request, obj, form, change)
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
 # ============================================================================
 # ADMIN MODELE IA
 # ============================================================================
@@ -787,6 +850,17 @@ class ModeleIAAdmin(admin.ModelAdmin):
 
     actions = ['activer_modele', 'desactiver_modele', 'dupliquer_modele']
 
+    def get_queryset(self, request):
+        # Les compteurs de la liste viennent de la table des métriques (jointure, aucune requête par ligne)
+        return super().get_queryset(request).select_related('metriques')
+
+    @staticmethod
+    def _metriques(obj):
+        try:
+            return obj.metriques
+        except MetriquesModeleIA.DoesNotExist:
+            return MetriquesModeleIA(modeleIA=obj)
+
     def nom_version_badge(self, obj):
         return format_html(
             '<div style="display: flex; align-items: center; gap: 10px;">'
@@ -836,7 +910,7 @@ class ModeleIAAdmin(admin.ModelAdmin):
 
     def types_epi_display(self, obj):
         """Affichage des types d'EPI sous forme de tags"""
-        types = [t.strip() for t in obj.typesEpi.split(',')]
+        types = libelles_pour(obj.typesEpiMasque) or [t.strip() for t in obj.typesEpi.split(',')]
         tags_html = ''
 
         colors = ['#2196F3', '#4CAF50', '#FF9800', '#9C27B0', '#F44336', '#00BCD4']
@@ -885,8 +959,9 @@ class ModeleIAAdmin(admin.ModelAdmin):
 
     def nombre_alertes_generees(self, obj):
         """Nombre d'alertes générées par ce modèle"""
-        total = obj.alertes.count()
-        nouveau = obj.alertes.filter(statut='NOUVEAU').count()
+        metriques = self._metriques(obj)
+        total = metriques.total
+        nouveau = metriques.statut_nouveau
 
         return format_html(
             '<div style="text-align: center;">'
@@ -900,18 +975,14 @@ class ModeleIAAdmin(admin.ModelAdmin):
         )
 
     nombre_alertes_generees.short_description = 'Alertes'
+    nombre_alertes_generees.admin_order_field = 'metriques__total'
 
     def taux_precision(self, obj):
         """Calcul du taux de précision basé sur les faux positifs"""
-        total = obj.alertes.count()
-        if total == 0:
-            return format_html('<span style="color: #999;">N/A</span>')
-
-        resolu = obj.alertes.filter(statut='RESOLU').count()
-        ignore = obj.alertes.filter(statut='IGNORE').count()
-
         # Précision = (alertes résolues + ignorées) / total
-        precision = ((resolu + ignore) / total) * 100
+        precision = self._metriques(obj).taux_traitement
+        if precision is None:
+            return format_html('<span style="color: #999;">N/A</span>')
 
         if precision >= 80:
             color = '#4CAF50'
@@ -924,16 +995,17 @@ class ModeleIAAdmin(admin.ModelAdmin):
             icon = '🔴'
 
         return format_html(
-            '<span style="color: {}; font-weight: 600; font-size: 13px;">{} {:.0f}%</span>',
-            color, icon, precision
+            '<span style="color: {}; font-weight: 600; font-size: 13px;">{} {}%</span>',
+            color, icon, f'{precision:.0f}'
         )
 
     taux_precision.short_description = 'Précision'
 
+    @panneau_en_cache('modele')
     def statistiques_modele(self, obj):
         """Statistiques détaillées du modèle"""
-        alertes = obj.alertes.all()
-        total = alertes.count()
+        metriques = self._metriques(obj)
+        total = metriques.total
 
         if total == 0:
             return format_html(
@@ -945,28 +1017,15 @@ class ModeleIAAdmin(admin.ModelAdmin):
                 '</div>'
             )
 
-        stats = {
-            'nouveau': alertes.filter(statut='NOUVEAU').count(),
-            'en_cours': alertes.filter(statut='EN_COURS').count(),
-            'resolu': alertes.filter(statut='RESOLU').count(),
-            'ignore': alertes.filter(statut='IGNORE').count(),
-        }
+        stats = {'nouveau': metriques.statut_nouveau}
+        niveaux = {'CRITIQUE': metriques.niveau_critique}
 
-        niveaux = {
-            'CRITIQUE': alertes.filter(niveau='CRITIQUE').count(),
-            'ELEVE': alertes.filter(niveau='ELEVE').count(),
-            'MOYEN': alertes.filter(niveau='MOYEN').count(),
-            'FAIBLE': alertes.filter(niveau='FAIBLE').count(),
-        }
+        taux_traitement = metriques.taux_traitement
 
-        taux_traitement = ((stats['resolu'] + stats['ignore']) / total * 100) if total > 0 else 0
-
-        # Employés les plus alertés
-        top_employes = alertes.values(
-            'employee__name', 'employee__surname'
-        ).annotate(
-            count=Count('id')
-        ).order_by('-count')[:5]
+        # Employés les plus alertés (lecture de l'index metriques_modele_total_idx)
+        top_employes = MetriquesEmployeModele.objects.filter(modeleIA=obj, total__gt=0).values(
+            'employee__name', 'employee__surname', count=F('total')
+        ).order_by('-total')[:5]
 
         top_html = ''
         for emp in top_employes:
@@ -1017,26 +1076,21 @@ class ModeleIAAdmin(admin.ModelAdmin):
 
     statistiques_modele.short_description = 'Vue d\'ensemble'
 
+    @panneau_en_cache('modele')
     def performance_analysis(self, obj):
         """Analyse de performance du modèle sur 30 jours"""
-        from datetime import timedelta
-
-        alertes_30j = obj.alertes.filter(
-            created_at__gte=timezone.now() - timedelta(days=30)
+        # Une requête sur les statistiques journalières: total sur 30 jours et répartition par semaine
+        aujourdhui = timezone.localdate()
+        semaines = [
+            (aujourdhui - timedelta(days=(4 - i) * 7 - 1), aujourdhui - timedelta(days=(3 - i) * 7))
+            for i in range(4)
+        ]
+        total_30j, semaines_data = totaux_par_periodes(
+            semaines, modeleIA=obj, jour__gt=aujourdhui - timedelta(days=30)
         )
-
-        total_30j = alertes_30j.count()
         if total_30j == 0:
             return "Pas de données sur les 30 derniers jours"
 
-        # Répartition par semaine
-        semaines_data = []
-        for i in range(4):
-            debut = timezone.now() - timedelta(days=(4 - i) * 7)
-            fin = timezone.now() - timedelta(days=(3 - i) * 7)
-            count = alertes_30j.filter(created_at__gte=debut, created_at__lt=fin).count()
-            semaines_data.append(count)
-
         max_week = max(semaines_data) if semaines_data else 1
 
         barres_html = ''
@@ -1086,6 +1140,7 @@ class ModeleIAAdmin(admin.ModelAdmin):
         if not alertes.exists():
             return "Aucune alerte générée"
 
+        employes = get_annuaire().fiches(alerte.employee_id for alerte in alertes)
         lignes_html = ''
         for alerte in alertes:
             niveau_colors = {
@@ -1099,7 +1154,7 @@ class ModeleIAAdmin(admin.ModelAdmin):
             lignes_html += f'''
             <tr style="border-bottom: 1px solid #eee;">
                 <td style="padding: 10px;">#{alerte.id}</td>
-                <td style="padding: 10px;">{alerte.employee.name} {alerte.employee.surname}</td>
+                <td style="padding: 10px;">{employes[alerte.employee_id].nom_complet}</td>
                 <td style="padding: 10px;">
                     <span style="color: {color}; font-weight: 600;">●</span> {alerte.get_niveau_display()}
                 </td>
@@ -1138,9 +1193,11 @@ class ModeleIAAdmin(admin.ModelAdmin):
 
     # Actions
     def activer_modele(self, request, queryset):
-        # Désactiver tous les autres modèles d'abord
-        ModeleIA.objects.update(active=False)
-        count = queryset.update(active=True)
+        # Désactiver tous les autres modèles d'abord; les workers d'ingestion sont prévenus après le commit
+        with transaction.atomic():
+            ModeleIA.objects.update(active=False)
+            count = queryset.update(active=True)
+            transaction.on_commit(invalider_modeles)
         self.message_user(request, f'{count} modèle(s) activé(s). Les autres ont été désactivés.', messages.SUCCESS)
 
 
@@ -1148,6 +1205,7 @@ class ModeleIAAdmin(admin.ModelAdmin):
 
     def desactiver_modele(self, request, queryset):
         count = queryset.update(active=False)
+        transaction.on_commit(invalider_modeles)
         self.message_user(request, f'{count} modèle(s) désactivé(s).', messages.WARNING)
 
     desactiver_modele.short_description = "❌ Désactiver les modèles sélectionnés"
@@ -1158,7 +1216,7 @@ class ModeleIAAdmin(admin.ModelAdmin):
             modele.pk = None
             modele.name = f"{modele.name} (Copie)"
             modele.active = False
-            modele.save()
+            modele.save()  # post_save: nouvelle version du cache des modèles
             count += 1
         self.message_user(request, f'{count} modèle(s) dupliqué(s).', messages.SUCCESS)
 
@@ -1184,6 +1242,7 @@ class ModeleIAAdmin(admin.ModelAdmin):
         list_filter = [
             AlerteNonTraiteeFilter,
             NiveauGraviteFilter,
+            TypeEpiManquantFilter,
             'statut',
             'niveau',
             'created_at',
@@ -1196,10 +1255,14 @@ class ModeleIAAdmin(admin.ModelAdmin):
             'modeleIA__name'
         ]
         list_per_page = 30
+        # L'employé est lu par employe_badge et par __str__ (libellé de la case à cocher des actions)
+        list_select_related = ['employee', 'modeleIA']
         date_hierarchy = 'created_at'
 
         readonly_fields = [
             'created_at',
+            'pris_en_charge_at',
+            'traite_at',
             'image_large',
             'employee',
             'modeleIA',
@@ -1222,24 +1285,40 @@ class ModeleIAAdmin(admin.ModelAdmin):
                 'classes': ('collapse',)
             }),
             ('🕐 Métadonnées', {
-                'fields': ('created_at',),
+                'fields': ('created_at', 'pris_en_charge_at', 'traite_at'),
                 'classes': ('collapse',)
             }),
         )
 
+        inlines = [HistoriqueStatutInline]
+
+        def save_model(self, request, obj, form, change):
+            super().save_model(request, obj, form, change)
+            # Modification à la main depuis le formulaire: tracée comme les transitions en lot
+            if change and {'statut', 'niveau'} & set(form.changed_data):
+                HistoriqueStatutAlerte.objects.create(
+                    alerte=obj,
+                    utilisateur=request.user,
+                    statut_avant=form.initial['statut'],
+                    statut_apres=obj.statut,
+                    niveau_avant=form.initial['niveau'],
+                    niveau_apres=obj.niveau,
+                    created_at=obj.updated_at,
+                )
+
         actions = [
             'marquer_resolu',
             'marquer_en_cours',
             'marquer_ignore',
             'changer_niveau_critique',
-            'exporter_alertes_csv'
+            'regenerer_miniatures',
+            'exporter_alertes_csv',
+            'exporter_alertes_parquet'
         ]
 
         def employe_badge(self, obj):
             """Badge de l'employé avec avatar"""
-            couleurs = ['#FF6B6B', '#4ECDC4', '#45B7D1', '#FFA07A', '#98D8C8', '#F7DC6F']
-            index_couleur = hash(obj.employee.name) % len(couleurs)
-            couleur = couleurs[index_couleur]
+            couleur = couleur_avatar(obj.employee.name)
 
             return format_html(
                 '<div style="display: flex; align-items: center; gap: 8px;">'
@@ -1317,8 +1396,9 @@ class ModeleIAAdmin(admin.ModelAdmin):
 
         def epis_manquants_preview(self, obj):
             """Prévisualisation des EPIs manquants"""
-            epis = obj.typeEpiManquants[:60]
-            if len(obj.typeEpiManquants) > 60:
+            texte = ', '.join(libelles_pour(obj.epiManquantsMasque)) or obj.typeEpiManquants
+            epis = texte[:60]
+            if len(texte) > 60:
                 epis += '...'
 
             return format_html(
@@ -1334,10 +1414,10 @@ class ModeleIAAdmin(admin.ModelAdmin):
             """Miniature de l'image"""
             if obj.image:
                 return format_html(
-                    '<img src="{}" width="60" height="60" '
+                    '<img src="{}" width="60" height="60" loading="lazy" '
                     'style="object-fit: cover; border-radius: 4px; '
                     'box-shadow: 0 2px 4px rgba(0,0,0,0.1);" />',
-                    obj.image.url
+                    url_apercu(obj)
                 )
             return format_html('<span style="color: #999; font-size: 11px;">Pas d\'image</span>')
 
@@ -1398,6 +1478,7 @@ class ModeleIAAdmin(admin.ModelAdmin):
 
         def analyse_details(self, obj):
             """Détails d'analyse de l'alerte"""
+            employe = get_annuaire().fiche(obj.employee_id)
             html = f'''
             <div style="background: white; padding: 20px; border-radius: 12px; 
                         box-shadow: 0 2px 8px rgba(0,0,0,0.1);">
@@ -1409,10 +1490,10 @@ class ModeleIAAdmin(admin.ModelAdmin):
                     <div style="background: #f5f5f5; padding: 15px; border-radius: 8px;">
                         <div style="font-size: 12px; color: #666; margin-bottom: 5px;">Employé</div>
                         <div style="font-size: 14px; font-weight: 600; color: #333;">
-                            {obj.employee.name} {obj.employee.surname}
+                            {employe.nom_complet}
                         </div>
                         <div style="font-size: 11px; color: #666; margin-top: 3px;">
-                            {obj.employee.poste} - {obj.employee.department}
+                            {employe.poste} - {employe.department}
                         </div>
                     </div>
 
@@ -1450,54 +1531,73 @@ class ModeleIAAdmin(admin.ModelAdmin):
 
         # Actions personnalisées
         def marquer_resolu(self, request, queryset):
-            count = queryset.update(statut='RESOLU')
+            count = len(changer_statut(queryset, request.user, statut='RESOLU'))
             self.message_user(request, f'{count} alerte(s) marquée(s) comme résolue(s).', messages.SUCCESS)
 
         marquer_resolu.short_description = "✅ Marquer comme résolu"
 
         def marquer_en_cours(self, request, queryset):
-            count = queryset.update(statut='EN_COURS')
+            count = len(changer_statut(queryset, request.user, statut='EN_COURS'))
             self.message_user(request, f'{count} alerte(s) en cours de traitement.', messages.INFO)
 
         marquer_en_cours.short_description = "⏳ Marquer en cours"
 
         def marquer_ignore(self, request, queryset):
-            count = queryset.update(statut='IGNORE')
+            count = len(changer_statut(queryset, request.user, statut='IGNORE'))
             self.message_user(request, f'{count} alerte(s) ignorée(s).', messages.WARNING)
 
         marquer_ignore.short_description = "🚫 Ignorer"
 
         def changer_niveau_critique(self, request, queryset):
-            count = queryset.update(niveau='CRITIQUE')
+            count = len(changer_statut(queryset, request.user, niveau='CRITIQUE'))
             self.message_user(request, f'{count} alerte(s) passée(s) en niveau CRITIQUE.', messages.ERROR)
 
         changer_niveau_critique.short_description = "🔴 Passer en CRITIQUE"
 
+        def regenerer_miniatures(self, request, queryset):
+            ids = list(queryset.values_list('id', flat=True))
+            planifier_miniatures(ids, forcer=True)
+            self.message_user(request, f'Génération de {len(ids)} miniature(s) lancée.', messages.INFO)
+
+        regenerer_miniatures.short_description = "🖼️ Régénérer les miniatures"
+
         def exporter_alertes_csv(self, request, queryset):
-            response = HttpResponse(content_type='text/csv')
-            response['Content-Disposition'] = 'attachment; filename="alertes_export.csv"'
-            response.write('\ufeff')  # BOM pour Excel
-
-            writer = csv.writer(response, delimiter=';')
-            writer.writerow([
-                'ID', 'Date', 'Employé', 'Poste', 'Département',
-                'Niveau', 'Statut', 'EPIs Manquants', 'Modèle IA'
-            ])
-
-            for alerte in queryset:
-                writer.writerow([
+            alertes = queryset.select_related('modeleIA').iterator(chunk_size=TAILLE_LOT_EXPORT)
+            annuaire = get_annuaire()
+
+            lignes = (
+                [
                     alerte.id,
                     alerte.created_at.strftime('%d/%m/%Y %H:%M'),
-                    f"{alerte.employee.name} {alerte.employee.surname}",
-                    alerte.employee.poste,
-                    alerte.employee.department,
+                    employe.nom_complet,
+                    employe.poste,
+                    employe.department,
                     alerte.get_niveau_display(),
                     alerte.get_statut_display(),
                     alerte.typeEpiManquants,
                     f"{alerte.modeleIA.name} v{alerte.modeleIA.version}"
-                ])
+                ]
+                for alerte in alertes
+                for employe in [annuaire.fiche(alerte.employee_id)]
+            )
 
-            self.message_user(request, f'Export CSV généré pour {queryset.count()} alerte(s).', messages.SUCCESS)
-            return response
+            self.message_user(request, 'Export CSV des alertes sélectionnées en cours de téléchargement.', messages.SUCCESS)
+            return reponse_csv_streaming(
+                'alertes_export.csv',
+                [
+                    'ID', 'Date', 'Employé', 'Poste', 'Département',
+                    'Niveau', 'Statut', 'EPIs Manquants', 'Modèle IA'
+                ],
+                lignes
+            )
 
         exporter_alertes_csv.short_description = "📥 Exporter en CSV"
+
+        def exporter_alertes_parquet(self, request, queryset):
+            # Valeurs brutes (codes, dates UTC) pour les analyses; export incrémental: commande exporter_alertes
+            try:
+                return reponse_export_streaming('alertes_export', queryset, 'parquet')
+            except ImproperlyConfigured as e:
+                self.message_user(request, str(e), messages.ERROR)
+
+        exporter_alertes_parquet.short_description = "📊 Exporter en Parquet (analyse)"
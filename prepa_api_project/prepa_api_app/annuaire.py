@@ -0,0 +1,152 @@
+# annuaire.py
+import threading
+import time
+import zlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+from .models import Employe
+
+#Annuaire des employés en mémoire (par processus): id -> FicheEmploye (nom, prénom, poste, département, statut).
+#L'ingestion, les exports et l'admin y lisent les employés au lieu de charger la ligne complète par alerte.
+#Rafraîchi par incréments (employés dont updated_at a changé depuis le dernier passage) au plus toutes les
+#ANNUAIRE_RAFRAICHISSEMENT secondes, et rechargé en entier toutes les ANNUAIRE_RECHARGEMENT secondes
+#(queryset.update(), qui ne touche pas updated_at, fait par d'autres processus) ou dès que le nombre
+#d'employés en base devient inférieur à celui de l'annuaire (suppression faite par un autre processus).
+
+COULEURS_AVATAR = ['#FF6B6B', '#4ECDC4', '#45B7D1', '#FFA07A', '#98D8C8', '#F7DC6F']
+
+# Recouvrement du rafraîchissement incrémental: une ligne enregistrée juste avant le dernier passage mais
+# validée après (transaction plus longue) est quand même relue
+MARGE_RAFRAICHISSEMENT = timedelta(seconds=5)
+
+CHAMPS = ('id', 'name', 'surname', 'poste', 'department', 'status', 'updated_at')
+
+
+def couleur_avatar(nom):
+    """Couleur d'avatar stable d'un processus à l'autre (hash() est salé à chaque démarrage)."""
+    return COULEURS_AVATAR[zlib.crc32((nom or '').encode()) % len(COULEURS_AVATAR)]
+
+
+class FicheEmploye:
+    __slots__ = ('id', 'name', 'surname', 'poste', 'department', 'status')
+
+    def __init__(self, id, name, surname, poste, department, status):
+        self.id = id
+        self.name = name
+        self.surname = surname
+        self.poste = poste
+        self.department = department
+        self.status = status
+
+    @property
+    def nom_complet(self):
+        return f"{self.name} {self.surname}"
+
+    @property
+    def initiale(self):
+        return self.name[0].upper() if self.name else '?'
+
+    @property
+    def couleur(self):
+        return couleur_avatar(self.name)
+
+
+class Annuaire:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._fiches = {}
+        self._depuis = None  # Plus grand updated_at lu
+        self._rafraichi_a = None
+        self._charge_a = None
+
+    def _lire(self, employes):
+        fiches = {}
+        depuis = None
+        for pk, name, surname, poste, department, status, updated_at in employes.order_by().values_list(*CHAMPS):
+            fiches[pk] = FicheEmploye(pk, name, surname, poste, department, status)
+            depuis = updated_at if depuis is None else max(depuis, updated_at)
+        return fiches, depuis
+
+    def _a_jour(self):
+        maintenant = time.monotonic()
+        if (
+            self._charge_a is None
+            or maintenant - self._charge_a >= settings.ANNUAIRE_RECHARGEMENT
+            or (maintenant - self._rafraichi_a >= settings.ANNUAIRE_RAFRAICHISSEMENT
+                and Employe.objects.count() < len(self._fiches))
+        ):
+            fiches, depuis = self._lire(Employe.objects.all())
+            with self._lock:
+                self._fiches, self._depuis = fiches, depuis
+                self._charge_a = self._rafraichi_a = maintenant
+        elif maintenant - self._rafraichi_a >= settings.ANNUAIRE_RAFRAICHISSEMENT:
+            employes = Employe.objects.all()
+            if self._depuis is not None:
+                employes = employes.filter(updated_at__gte=self._depuis - MARGE_RAFRAICHISSEMENT)
+            fiches, depuis = self._lire(employes)
+            with self._lock:
+                self._fiches.update(fiches)
+                if depuis is not None:
+                    self._depuis = max(self._depuis, depuis) if self._depuis else depuis
+                self._rafraichi_a = maintenant
+        return self._fiches
+
+    def fiche(self, pk):
+        return self.fiches([pk]).get(pk)
+
+    def fiches(self, ids):
+        """{id: FicheEmploye} des ids connus; ceux absents de l'annuaire sont lus en base (une requête)."""
+        connues = self._a_jour()
+        ids = set(ids)
+        resultat = {pk: connues[pk] for pk in ids if pk in connues}
+        manquants = ids - resultat.keys()
+        if manquants:
+            lues, _ = self._lire(Employe.objects.filter(pk__in=manquants))
+            self.enregistrer(*lues.values())
+            resultat.update(lues)
+        return resultat
+
+    def enregistrer(self, *fiches):
+        with self._lock:
+            self._fiches.update((fiche.id, fiche) for fiche in fiches)
+
+    def oublier(self, *pks):
+        with self._lock:
+            for pk in pks:
+                self._fiches.pop(pk, None)
+
+    def recharger(self):
+        """Rechargement complet au prochain accès."""
+        with self._lock:
+            self._charge_a = None
+
+    def __len__(self):
+        return len(self._a_jour())
+
+
+_annuaire = None
+_annuaire_lock = threading.Lock()
+
+
+def get_annuaire():
+    global _annuaire
+    if _annuaire is None:
+        with _annuaire_lock:
+            if _annuaire is None:
+                _annuaire = Annuaire()
+    return _annuaire
+
+
+def fiche_employe(employe):
+    return FicheEmploye(employe.pk, employe.name, employe.surname, employe.poste, employe.department, employe.status)
+
+
+@receiver(setting_changed)
+def _reset_annuaire(setting, **kwargs):
+    global _annuaire
+    if setting.startswith('ANNUAIRE_'):
+        _annuaire = None
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class PrepaApiAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'prepa_api_app'
+
+    def ready(self):
+        from . import signals  # noqa: F401  (connecte les receivers)
@@ -0,0 +1,60 @@
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+
+from .temps_reel import evenement_sse, get_broker
+
+
+# Flux temps réel des alertes pour le tableau de bord des superviseurs (Server-Sent Events, servi par asgi.py).
+# Une connexion = une coroutine en attente sur sa file: pas de worker bloqué, pas de requête de polling.
+#   GET /alertes/flux/?department=Atelier&niveau=CRITIQUE&niveau=ELEVE
+# EventSource ne permet pas d'en-tête Authorization: le jeton d'accès JWT peut aussi passer en ?token=.
+
+def _authentifier(request):
+    authentification = JWTAuthentication()
+    brut = request.GET.get('token')
+    if brut is None:
+        entete = authentification.get_header(request)
+        brut = entete and authentification.get_raw_token(entete)
+    if not brut:
+        return None
+    try:
+        return authentification.get_user(authentification.get_validated_token(brut))
+    except (InvalidToken, TokenError, AuthenticationFailed):
+        return None
+
+
+@require_GET
+async def flux_alertes(request):
+    user = await sync_to_async(_authentifier)(request)
+    if user is None or not user.is_active:
+        return JsonResponse({'detail': "Informations d'authentification non fournies ou invalides."}, status=401)
+
+    departements = request.GET.getlist('department')
+    niveaux = request.GET.getlist('niveau')
+
+    async def evenements():
+        broker = get_broker()
+        abonnement = broker.abonner(departements, niveaux)
+        try:
+            yield f"retry: {settings.TEMPS_REEL_RECONNEXION_MS}\n: connecté\n\n"
+            while True:
+                try:
+                    message = await asyncio.wait_for(abonnement.file.get(), settings.TEMPS_REEL_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"  # Garde la connexion ouverte à travers les proxys
+                    continue
+                yield evenement_sse(message)
+        finally:
+            broker.desabonner(abonnement)
+
+    response = StreamingHttpResponse(evenements(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # nginx: envoyer chaque événement tout de suite
+    return response
@@ -0,0 +1,92 @@
+# cache.py
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+
+
+#Cache des panneaux HTML de l'admin (statistiques, graphiques, historique).
+#Clé: (panneau, portée, id de l'objet, version des données). Chaque employé et chaque modèle IA a sa
+#propre version, changée dès qu'une de ses alertes change: les panneaux restent exacts sans rien
+#recalculer tant que rien n'a bougé, et l'ingestion pour un employé n'invalide pas les autres.
+#Une version globale, changée à chaque fois, sert aux vues qui agrègent tous les employés.
+#Les nouvelles versions sont publiées au commit: un lecteur qui voit une nouvelle version voit aussi les données
+#validées. Une transaction qui a des versions pas encore publiées ne met rien en cache (versions_en_attente).
+
+# Version de toutes les données d'alertes (vues agrégées sur tous les employés, ex. tendances.py)
+VERSION_GLOBALE = ('toutes', 0)
+
+
+def _cle_version(portee, pk):
+    return f'alertes:version:{portee}:{pk}'
+
+
+def version_donnees(portee, pk):
+    cle = _cle_version(portee, pk)
+    version = cache.get(cle)
+    if version is None:
+        cache.add(cle, time.time_ns(), None)
+        version = cache.get(cle)
+    return version
+
+
+class _PublicationVersions:
+    """Callback on_commit: nouvelles versions des clés accumulées pendant la transaction (une écriture de cache)."""
+
+    def __init__(self):
+        self.cles = {_cle_version(*VERSION_GLOBALE)}
+        self.publiee = False
+
+    def __call__(self):
+        version = time.time_ns()
+        cache.set_many({cle: version for cle in self.cles}, None)
+        self.publiee = True
+
+
+def _publication_en_attente():
+    for _, callback, _ in connection.run_on_commit:
+        if isinstance(callback, _PublicationVersions) and not callback.publiee:
+            return callback
+    return None
+
+
+def versions_en_attente():
+    """Vrai si la transaction en cours a changé des données dont la version n'est publiée qu'au commit:
+    ce qu'elle lit ne doit pas être mis en cache sous la version actuelle."""
+    return _publication_en_attente() is not None
+
+
+def invalider_panneaux(employes=(), modeles=()):
+    """Change, au commit, la version des données des employés et modèles IA donnés, et la version globale
+    (une seule écriture de cache par transaction)."""
+    cles = {_cle_version('employe', pk) for pk in employes} | {_cle_version('modele', pk) for pk in modeles}
+    if not cles:
+        return
+    publication = _publication_en_attente() if connection.in_atomic_block else None
+    if publication is None:
+        publication = _PublicationVersions()
+        publication.cles |= cles
+        transaction.on_commit(publication)  # Hors transaction: tout de suite
+    else:
+        publication.cles |= cles
+
+
+def panneau_en_cache(portee):
+    """Décorateur pour une méthode d'admin (self, obj) qui rend un panneau HTML de `obj`."""
+    def decorateur(methode):
+        @wraps(methode)
+        def wrapper(self, obj):
+            if obj is None or obj.pk is None:
+                return methode(self, obj)
+
+            cle = f'panneau:{methode.__name__}:{portee}:{obj.pk}:{version_donnees(portee, obj.pk)}'
+            html = cache.get(cle)
+            if html is None:
+                html = methode(self, obj)
+                if not versions_en_attente():
+                    cache.set(cle, html, settings.PANNEAUX_CACHE_TIMEOUT)
+            return html
+        return wrapper
+    return decorateur
@@ -0,0 +1,106 @@
+# changements.py
+import base64
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from .models import Alerte, Employe, Suppression
+
+#Flux de changements pour la synchronisation des systèmes en aval (BI, RH): les alertes ou employés créés ou
+#modifiés, et les suppressions (table Suppression), depuis un curseur opaque.
+#Le curseur garde deux positions (position_flux, id), dans la table et dans les suppressions: chaque lecture est
+#une plage d'index après la position, son coût suit le nombre de changements et non la taille de la table.
+#Une ligne modifiée plusieurs fois n'apparaît qu'une fois, à sa dernière modification.
+#position_flux suit l'ordre de validation des transactions (position_flux.py); seules les positions avant
+#l'horizon sont lues: une transaction encore en cours ne peut pas valider un changement derrière un curseur
+#déjà rendu, sans marge d'horloge.
+#L'archivage des partitions (rétention, partitions.py) n'écrit pas de suppressions: l'aval garde l'historique.
+
+SOURCES = {'alertes': (Alerte, 'alerte'), 'employes': (Employe, 'employe')}
+
+
+def encoder_curseur(position_lignes, position_suppressions):
+    morceaux = []
+    for position in (position_lignes, position_suppressions):
+        morceaux += [str(position[0]), str(position[1])] if position else ['', '']
+    return base64.urlsafe_b64encode('|'.join(morceaux).encode()).decode()
+
+
+def decoder_curseur(curseur):
+    """(position des lignes, position des suppressions), chacune (position_flux, id) ou None.
+    ValueError si invalide (dont les anciens curseurs par date: le consommateur repart du début)."""
+    if not curseur:
+        return None, None
+    try:
+        flux_ligne, pk_ligne, flux_suppression, pk_suppression = (
+            base64.urlsafe_b64decode(curseur.encode()).decode().split('|')
+        )
+        return tuple(
+            (int(flux), int(pk)) if flux else None
+            for flux, pk in ((flux_ligne, pk_ligne), (flux_suppression, pk_suppression))
+        )
+    except (TypeError, ValueError, UnicodeDecodeError):
+        raise ValueError("Curseur invalide")
+
+
+def avant_horizon(queryset):
+    """Lignes dont la transaction et toutes les précédentes sont terminées. PostgreSQL: positions inférieures
+    à la plus ancienne transaction en cours, lue dans l'instantané de la requête elle-même. SQLite: toutes."""
+    if connection.vendor != 'postgresql':
+        return queryset
+    return queryset.filter(position_flux__lt=RawSQL('txid_snapshot_xmin(txid_current_snapshot())', []))
+
+
+def apres(queryset, position):
+    """Lignes strictement après `position` (position_flux, id)."""
+    if position is None:
+        return queryset
+    flux, pk = position
+    # position_flux >= flux borne le parcours de l'index; le OU départage les égalités sur l'id
+    return queryset.filter(Q(position_flux__gt=flux) | Q(position_flux=flux, id__gt=pk), position_flux__gte=flux)
+
+
+def requete_lignes(queryset, position):
+    return apres(avant_horizon(queryset), position).order_by('position_flux', 'id')
+
+
+def requete_suppressions(type, position):
+    return apres(avant_horizon(Suppression.objects.filter(type=type)), position).order_by('position_flux', 'id')
+
+
+def changements(source, curseur=None, taille=None, queryset=None):
+    """Au plus `taille` changements de `source` ('alertes' ou 'employes') après `curseur`, dans l'ordre de validation.
+
+    Retourne {'lignes': [instances], 'suppressions': [(id, date)], 'curseur': curseur suivant, 'encore': bool}.
+    `queryset` (par défaut model.objects.all()) permet d'ajouter des select_related aux lignes.
+    """
+    model, type = SOURCES[source]
+    taille = taille or settings.CHANGEMENTS_TAILLE
+    position_lignes, position_suppressions = decoder_curseur(curseur)
+
+    base = model.objects.all() if queryset is None else queryset
+    lignes = list(requete_lignes(base, position_lignes)[:taille + 1])
+    suppressions = list(
+        requete_suppressions(type, position_suppressions)
+        .values_list('position_flux', 'id', 'objet_id', 'supprime_at')[:taille + 1]
+    )
+
+    # Fusion des deux flux par position: les `taille` premiers changements
+    evenements = sorted(
+        [(ligne.position_flux, ligne.pk, ligne, None) for ligne in lignes]
+        + [(flux, pk, None, (objet_id, date)) for flux, pk, objet_id, date in suppressions],
+        key=lambda evenement: evenement[:2],
+    )
+    encore = len(evenements) > taille
+    resultat = {'lignes': [], 'suppressions': []}
+    for flux, pk, ligne, suppression in evenements[:taille]:
+        if ligne is not None:
+            resultat['lignes'].append(ligne)
+            position_lignes = (flux, pk)
+        else:
+            resultat['suppressions'].append(suppression)
+            position_suppressions = (flux, pk)
+    resultat.update(curseur=encoder_curseur(position_lignes, position_suppressions), encore=encore)
+    return resultat
@@ -0,0 +1,117 @@
+# comparaison.py
+from datetime import timedelta
+
+from django.db.models import Avg, Count, DurationField, ExpressionWrapper, F, Q
+
+from .epi import compter_par_epi_groupe
+from .models import Alerte, HistoriqueStatutAlerte, ModeleIA
+
+#Comparaison hors ligne des versions de modèles IA sur les alertes historiques.
+#Toute l'agrégation est faite par la base (GROUP BY modèle): un nombre fixe de requêtes quel que soit le
+#nombre d'alertes ou de modèles, au lieu de boucles ORM par modèle.
+
+STATUTS_TRAITES = ('RESOLU', 'IGNORE')
+
+# Bornes supérieures des classes de l'histogramme des délais de traitement
+BORNES_DELAI = [
+    timedelta(minutes=5), timedelta(minutes=15), timedelta(hours=1), timedelta(hours=4), timedelta(hours=8),
+    timedelta(days=1), timedelta(days=3), timedelta(days=7), timedelta(days=30),
+]
+
+
+def _taux(nombre, total):
+    return nombre / total * 100 if total else None
+
+
+def percentile(cumuls, total, p):
+    """Estime le p-ième percentile (en secondes) depuis les effectifs cumulés de l'histogramme.
+
+    Interpolation linéaire dans la classe qui contient le rang; au-delà de la dernière borne, renvoie
+    cette borne (valeur minorée).
+    """
+    if not total:
+        return None
+    rang = total * p / 100
+    precedent, borne_basse = 0, 0.0
+    for borne, cumul in zip(BORNES_DELAI, cumuls):
+        borne_haute = borne.total_seconds()
+        if cumul >= rang:
+            if cumul == precedent:
+                return borne_basse
+            return borne_basse + (borne_haute - borne_basse) * (rang - precedent) / (cumul - precedent)
+        precedent, borne_basse = cumul, borne_haute
+    return borne_basse
+
+
+def delais_traitement(alertes):
+    """{modeleIA_id: (nombre, moyenne, cumuls par borne)} des délais entre la création d'une alerte et son
+    passage à RESOLU/IGNORE, lus dans l'historique des statuts (une requête)."""
+    transitions = HistoriqueStatutAlerte.objects.filter(
+        alerte__in=alertes.values('pk'), statut_apres__in=STATUTS_TRAITES,
+    ).exclude(statut_avant__in=STATUTS_TRAITES).annotate(
+        delai=ExpressionWrapper(F('created_at') - F('alerte__created_at'), output_field=DurationField()),
+    )
+    cumuls = {f'jusqu_a_{i}': Count('pk', filter=Q(delai__lte=borne)) for i, borne in enumerate(BORNES_DELAI)}
+    lignes = transitions.order_by().values('alerte__modeleIA').annotate(
+        nombre=Count('pk'), moyenne=Avg('delai'), **cumuls,
+    )
+    return {
+        ligne['alerte__modeleIA']: (
+            ligne['nombre'], ligne['moyenne'], [ligne[f'jusqu_a_{i}'] for i in range(len(BORNES_DELAI))],
+        )
+        for ligne in lignes
+    }
+
+
+def comparer_versions(modeles=None, alertes=None):
+    """Rapport par version de modèle: volumes, taux d'IGNORE et de résolution, distribution des délais de
+    traitement et répartition par type d'EPI.
+
+    `modeles`: ids ou queryset de ModeleIA (tous par défaut); `alertes`: queryset d'alertes rejouées
+    (ex. une même période pour toutes les versions).
+    """
+    if alertes is None:
+        alertes = Alerte.objects.all()
+    versions = ModeleIA.objects.order_by('name', 'version')
+    if modeles is not None:
+        versions = versions.filter(pk__in=modeles)
+        alertes = alertes.filter(modeleIA__in=modeles)
+
+    comptes = {'total': Count('pk')}
+    comptes.update({statut.lower(): Count('pk', filter=Q(statut=statut)) for statut, _ in Alerte.STATUT_CHOICES})
+    par_modele = {
+        ligne.pop('modeleIA'): ligne
+        for ligne in alertes.order_by().values('modeleIA').annotate(**comptes)
+    }
+    par_epi = compter_par_epi_groupe(alertes, 'modeleIA', ignore={'statut': 'IGNORE'})
+    delais = delais_traitement(alertes)
+
+    rapport = []
+    for modele in versions.values('id', 'name', 'version', 'sensibilite', 'active'):
+        statuts = par_modele.get(modele['id'], {'total': 0})
+        total = statuts['total']
+        nombre, moyenne, cumuls = delais.get(modele['id'], (0, None, [0] * len(BORNES_DELAI)))
+        rapport.append({
+            **modele,
+            'total': total,
+            'statuts': {statut: statuts.get(statut.lower(), 0) for statut, _ in Alerte.STATUT_CHOICES},
+            'taux_ignore': _taux(statuts.get('ignore', 0), total),
+            'taux_resolution': _taux(statuts.get('resolu', 0), total),
+            'delai_traitement': {
+                'nombre': nombre,
+                'moyenne_s': moyenne.total_seconds() if moyenne is not None else None,
+                'p50_s': percentile(cumuls, nombre, 50),
+                'p90_s': percentile(cumuls, nombre, 90),
+                'p99_s': percentile(cumuls, nombre, 99),
+                'histogramme': [
+                    {'jusqu_a_s': int(borne.total_seconds()), 'nombre': cumul - precedent}
+                    for borne, cumul, precedent in zip(BORNES_DELAI, cumuls, [0] + cumuls)
+                ] + [{'jusqu_a_s': None, 'nombre': nombre - (cumuls[-1] if cumuls else 0)}],
+            },
+            'par_epi': {
+                libelle: {**valeurs, 'taux_ignore': _taux(valeurs['ignore'], valeurs['total'])}
+                for libelle, valeurs in par_epi.get(modele['id'], {}).items()
+                if valeurs['total']
+            },
+        })
+    return rapport
@@ -0,0 +1,191 @@
+# delais.py
+import math
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q, Sum
+from django.utils import timezone
+
+from .models import Alerte, Employe, HistogrammeDelaiAlerte
+from .statistiques import TAILLE_LOT_UPSERT, incrementer
+
+#Délais de prise en charge et de traitement des alertes.
+#Chaque transition horodate l'alerte (pris_en_charge_at, traite_at). Les histogrammes par (modèle, étape,
+#département, niveau) décrivent les alertes telles qu'elles sont, comme les statistiques journalières: un
+#changement (transition, alerte rouverte, niveau, modèle, employé ou département, suppression) retire les
+#échantillons de l'état d'avant et ajoute ceux du nouvel état; reconstruire_delais() recalcule le même état.
+#Les classes sont logarithmiques: SOUS_CLASSES par puissance de 2 secondes, soit une erreur relative d'au plus
+#1/SOUS_CLASSES sur les percentiles.
+
+STATUTS_OUVERTS = ('NOUVEAU', 'EN_COURS')
+STATUTS_TRAITES = ('RESOLU', 'IGNORE')
+SOUS_CLASSES = 8
+
+
+def classe_delai(secondes):
+    """Classe de l'histogramme: 0 pour moins d'une seconde, puis SOUS_CLASSES classes par doublement."""
+    if secondes < 1:
+        return 0
+    mantisse, exposant = math.frexp(secondes)  # secondes = mantisse * 2**exposant, 0.5 <= mantisse < 1
+    return 1 + (exposant - 1) * SOUS_CLASSES + int((2 * mantisse - 1) * SOUS_CLASSES)
+
+
+def borne_basse(classe):
+    if classe <= 0:
+        return 0.0
+    exposant, sous_classe = divmod(classe - 1, SOUS_CLASSES)
+    return 2.0 ** exposant * (1 + sous_classe / SOUS_CLASSES)
+
+
+def horodater(statut_avant, statut_apres, pris_en_charge_at, traite_at, maintenant):
+    """Nouvelles valeurs de (pris_en_charge_at, traite_at) après le passage statut_avant -> statut_apres.
+
+    La prise en charge est la première sortie de NOUVEAU; traite_at est effacé si l'alerte est rouverte.
+    """
+    if statut_apres != 'NOUVEAU' and pris_en_charge_at is None:
+        pris_en_charge_at = maintenant
+    if statut_apres in STATUTS_TRAITES:
+        if traite_at is None or statut_avant not in STATUTS_TRAITES:
+            traite_at = maintenant
+    else:
+        traite_at = None
+    return pris_en_charge_at, traite_at
+
+
+def evenements(created_at, avant, apres):
+    """Étapes franchies entre deux horodatages (pris_en_charge_at, traite_at): [(étape, délai en secondes)]."""
+    resultat = []
+    for etape, valeur_avant, valeur_apres in zip(('PRISE_EN_CHARGE', 'TRAITEMENT'), avant, apres):
+        if valeur_apres is not None and valeur_apres != valeur_avant:
+            resultat.append((etape, max(0.0, (valeur_apres - (created_at or valeur_apres)).total_seconds())))
+    return resultat
+
+
+def echantillons(modele, department, niveau, created_at, pris_en_charge_at, traite_at):
+    """Échantillons d'une alerte dans les histogrammes: [(modeleIA_id, étape, département, niveau, classe)]."""
+    return [
+        (modele, etape, department, niveau, classe_delai(secondes))
+        for etape, secondes in evenements(created_at, (None, None), (pris_en_charge_at, traite_at))
+    ]
+
+
+def variation(avant, apres):
+    """Deltas {échantillon: +/-1} du passage de l'état `avant` à `apres` (arguments d'echantillons(), ou None)."""
+    deltas = Counter(echantillons(*apres) if apres else ())
+    deltas.subtract(echantillons(*avant) if avant else ())
+    return deltas
+
+
+def appliquer_delais(deltas):
+    """Ajoute les deltas {échantillon: +/-n} aux histogrammes (un upsert)."""
+    incrementer(
+        HistogrammeDelaiAlerte, ['modeleIA', 'etape', 'department', 'niveau', 'classe'], ['total'],
+        [(*cle, nombre) for cle, nombre in deltas.items() if nombre],
+    )
+
+
+def retirer_delais(alertes, departements=None):
+    """Retire les échantillons d'alertes supprimées [(employee_id, modeleIA_id, niveau, created_at,
+    pris_en_charge_at, traite_at)]. `departements` {employee_id: département} sert pour les employés déjà
+    supprimés; les autres sont lus en base (une requête)."""
+    departements = dict(departements or {})
+    manquants = {employe for employe, *_ in alertes} - departements.keys()
+    if manquants:
+        departements.update(Employe.objects.filter(pk__in=manquants).values_list('pk', 'department'))
+    deltas = Counter()
+    for employe, modele, niveau, *horodatage in alertes:
+        if employe in departements:
+            deltas.subtract(echantillons(modele, departements[employe], niveau, *horodatage))
+    appliquer_delais(deltas)
+
+
+def deplacer_delais(employe, avant, apres):
+    """Déplace les échantillons des alertes d'un employé de son ancien département vers le nouveau."""
+    lignes = (
+        Alerte.objects.filter(employee=employe, pris_en_charge_at__isnull=False).order_by()
+        .values_list('modeleIA_id', 'niveau', 'created_at', 'pris_en_charge_at', 'traite_at')
+    )
+    deltas = Counter()
+    for modele, niveau, *horodatage in lignes.iterator(chunk_size=TAILLE_LOT_UPSERT):
+        deltas.update(variation((modele, avant, niveau, *horodatage), (modele, apres, niveau, *horodatage)))
+    appliquer_delais(deltas)
+
+
+def reconstruire_delais():
+    """Recalcule les histogrammes depuis les horodatages des alertes."""
+    lignes = (
+        Alerte.objects.filter(pris_en_charge_at__isnull=False).order_by()
+        .values_list('modeleIA_id', 'employee__department', 'niveau', 'created_at', 'pris_en_charge_at', 'traite_at')
+    )
+    with transaction.atomic():
+        HistogrammeDelaiAlerte.objects.all().delete()
+        deltas = Counter()
+        for ligne in lignes.iterator(chunk_size=TAILLE_LOT_UPSERT):
+            deltas.update(echantillons(*ligne))
+        appliquer_delais(deltas)
+
+
+def percentiles(classes, quantiles=(50, 90, 99)):
+    """{p: secondes} estimés depuis {classe: nombre} (interpolation linéaire dans la classe)."""
+    total = sum(classes.values())
+    if not total:
+        return {p: None for p in quantiles}
+    resultat = {}
+    ordonnees = sorted(classes.items())
+    for p in quantiles:
+        rang, cumul = total * p / 100, 0
+        for classe, nombre in ordonnees:
+            if cumul + nombre >= rang:
+                bas, haut = borne_basse(classe), borne_basse(classe + 1)
+                resultat[p] = bas + (haut - bas) * (rang - cumul) / nombre
+                break
+            cumul += nombre
+    return resultat
+
+
+def sla(etape, niveau):
+    minutes = settings.ALERTES_SLA_PRISE_EN_CHARGE if etape == 'PRISE_EN_CHARGE' else settings.ALERTES_SLA_TRAITEMENT
+    return timedelta(minutes=minutes[niveau])
+
+
+def statistiques_delais(etape, par=None, **filtres):
+    """Par valeur de `par` (department, modeleIA, niveau ou None): nombre, p50/p90/p99 et part des délais
+    dans le SLA de leur niveau (estimée par classe). Une requête sur les histogrammes."""
+    groupe = [par] if par else []
+    lignes = (
+        HistogrammeDelaiAlerte.objects.filter(etape=etape, **filtres).exclude(total=0).order_by()
+        .values(*groupe, 'niveau', 'classe').annotate(nombre=Sum('total'))
+    )
+    classes = defaultdict(Counter)
+    dans_sla = Counter()
+    for ligne in lignes:
+        cle = ligne[par] if par else None
+        classes[cle][ligne['classe']] += ligne['nombre']
+        if borne_basse(ligne['classe'] + 1) <= sla(etape, ligne['niveau']).total_seconds():
+            dans_sla[cle] += ligne['nombre']
+
+    resultat = []
+    for cle, compte in sorted(classes.items(), key=lambda item: str(item[0])):
+        nombre = sum(compte.values())
+        valeurs = percentiles(compte)
+        resultat.append({
+            'groupe': cle,
+            'nombre': nombre,
+            'p50_s': valeurs[50],
+            'p90_s': valeurs[90],
+            'p99_s': valeurs[99],
+            'dans_sla_pct': dans_sla[cle] / nombre * 100 if nombre else None,
+        })
+    return resultat
+
+
+def hors_sla(maintenant=None):
+    """Condition "alerte ouverte au-delà de son SLA" (prise en charge ou traitement), pour filter()."""
+    maintenant = maintenant or timezone.now()
+    condition = Q()
+    for niveau, _ in Alerte.NIVEAU_CHOICES:
+        condition |= Q(niveau=niveau, statut='NOUVEAU', created_at__lt=maintenant - sla('PRISE_EN_CHARGE', niveau))
+        condition |= Q(niveau=niveau, statut__in=STATUTS_OUVERTS, created_at__lt=maintenant - sla('TRAITEMENT', niveau))
+    return condition
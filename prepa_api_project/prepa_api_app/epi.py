@@ -0,0 +1,194 @@
+# epi.py
+import re
+import threading
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Max, Q
+from django.db.models.lookups import GreaterThan
+from django.utils.text import slugify
+
+from .models import TypeEpi
+
+# Un BigIntegerField signé: les bits 0 à 62 sont utilisables
+NOMBRE_MAX_TYPES = 63
+
+_SEPARATEURS = re.compile(r'[,;/|]')
+
+
+#Représentation compacte des listes d'EPI: "Casque, Gants" <-> masque de bits (1 << TypeEpi.bit).
+#La correspondance code -> bit est gardée en mémoire; on ne va en base que pour un type jamais vu.
+#Les types sont créés par le catalogue (admin TypeEpi, types des modèles IA), jamais par les alertes: un texte
+#venu des caméras ne peut pas prendre de bit (63 au plus).
+
+_lock = threading.Lock()
+_bits = {}  # code -> bit
+_libelles = {}  # bit -> libellé
+
+
+def separer(texte):
+    """'Casque, gants ; Lunettes' -> ['Casque', 'gants', 'Lunettes']"""
+    return [morceau.strip() for morceau in _SEPARATEURS.split(texte or '') if morceau.strip()]
+
+
+def code_epi(libelle):
+    return slugify(libelle)[:50]
+
+
+def vider_cache():
+    with _lock:
+        _bits.clear()
+        _libelles.clear()
+
+
+def _charger():
+    types = list(TypeEpi.objects.values_list('code', 'bit', 'libelle'))
+    with _lock:
+        _bits.clear()
+        _libelles.clear()
+        for code, bit, libelle in types:
+            _bits[code] = bit
+            _libelles[bit] = libelle
+
+
+def _premier_bit_libre():
+    dernier = TypeEpi.objects.aggregate(bit=Max('bit'))['bit']
+    return 0 if dernier is None else dernier + 1
+
+
+def bits_libres():
+    """Nombre de types d'EPI que le catalogue peut encore recevoir."""
+    return max(0, NOMBRE_MAX_TYPES - _premier_bit_libre())
+
+
+def types_inconnus(libelles):
+    """Libellés (texte libre ou liste) dont le code n'est pas dans le catalogue, sans doublon."""
+    if isinstance(libelles, str):
+        libelles = separer(libelles)
+    _charger()
+    inconnus = {}
+    for libelle in libelles:
+        code = code_epi(libelle)
+        if code and code not in _bits:
+            inconnus.setdefault(code, libelle.strip())
+    return list(inconnus.values())
+
+
+def prochain_bit():
+    bit = _premier_bit_libre()
+    if bit >= NOMBRE_MAX_TYPES:
+        raise ValueError(f"Plus de {NOMBRE_MAX_TYPES} types d'EPI: le masque est plein.")
+    return bit
+
+
+def _creer_type(code, libelle):
+    for _ in range(3):
+        _charger()
+        if code in _bits:
+            return _bits[code]
+        bit = prochain_bit()
+        try:
+            with transaction.atomic():
+                TypeEpi.objects.create(code=code, libelle=libelle, bit=bit)
+        except IntegrityError:
+            continue  # Un autre worker a pris ce bit (ou ce code) entre-temps: on relit et on recommence
+        with _lock:
+            _bits[code] = bit
+            _libelles[bit] = libelle
+        return bit
+    raise IntegrityError(f"Impossible d'enregistrer le type d'EPI '{libelle}'.")
+
+
+def bit_pour(libelle, creer=False):
+    code = code_epi(libelle)
+    if not code:
+        return None
+    if code not in _bits:
+        _charger()
+    if code not in _bits:
+        return _creer_type(code, libelle.strip()) if creer else None
+    return _bits[code]
+
+
+def masque_pour(libelles, creer=False):
+    """Masque des EPI listés (texte libre ou liste); les types inconnus sont créés si `creer`, ignorés sinon."""
+    if isinstance(libelles, str):
+        libelles = separer(libelles)
+    masque = 0
+    for libelle in libelles:
+        bit = bit_pour(libelle, creer=creer)
+        if bit is not None:
+            masque |= 1 << bit
+    return masque
+
+
+def masques_pour(listes):
+    """[(masque, libellés inconnus)] pour chaque liste d'EPI (texte libre ou liste), sans créer de type.
+    Le catalogue est relu au plus une fois, quel que soit le nombre de libellés inconnus."""
+    listes = [separer(libelles) if isinstance(libelles, str) else libelles for libelles in listes]
+    codes = [[(libelle.strip(), code_epi(libelle)) for libelle in libelles] for libelles in listes]
+    if any(code and code not in _bits for paires in codes for _, code in paires):
+        _charger()
+    resultat = []
+    for paires in codes:
+        masque, inconnus = 0, []
+        for libelle, code in paires:
+            if code in _bits:
+                masque |= 1 << _bits[code]
+            elif code:
+                inconnus.append(libelle)
+        resultat.append((masque, inconnus))
+    return resultat
+
+
+def libelles_pour(masque):
+    """Libellés des EPI d'un masque, dans l'ordre des bits."""
+    if any(masque >> bit & 1 and bit not in _libelles for bit in range(NOMBRE_MAX_TYPES)):
+        _charger()
+    return [libelle for bit, libelle in sorted(_libelles.items()) if masque >> bit & 1]
+
+
+def contient_epi(champ, bit):
+    """Expression booléenne "le masque `champ` contient le bit", utilisable dans filter() et Count(filter=...)."""
+    return GreaterThan(F(champ).bitand(1 << bit), 0)
+
+
+def filtrer_par_epi(queryset, code, champ='epiManquantsMasque'):
+    bit = bit_pour(code, creer=False)
+    if bit is None:
+        return queryset.none()
+    return queryset.filter(contient_epi(champ, bit))
+
+
+def compter_par_epi(queryset, champ='epiManquantsMasque'):
+    """{libellé: nombre d'alertes} pour chaque type d'EPI, en une seule requête d'agrégat."""
+    _charger()
+    types = sorted(_libelles.items())
+    if not types:
+        return {}
+    valeurs = queryset.order_by().aggregate(**{
+        f'epi_{bit}': Count('pk', filter=contient_epi(champ, bit)) for bit, _ in types
+    })
+    return {libelle: valeurs[f'epi_{bit}'] for bit, libelle in types}
+
+
+def compter_par_epi_groupe(queryset, groupe, champ='epiManquantsMasque', **filtres):
+    """{valeur de `groupe`: {libellé: nombre}} en une requête (GROUP BY `groupe`).
+
+    Les `filtres` (ex. statut='IGNORE') restreignent les alertes comptées, à ajouter dans des clés suffixées.
+    """
+    _charger()
+    types = sorted(_libelles.items())
+    if not types:
+        return {}
+    comptes = {f'epi_{bit}': Count('pk', filter=contient_epi(champ, bit)) for bit, _ in types}
+    for nom, condition in filtres.items():
+        comptes.update({
+            f'epi_{bit}_{nom}': Count('pk', filter=Q(contient_epi(champ, bit), **condition)) for bit, _ in types
+        })
+    resultat = {}
+    for ligne in queryset.order_by().values(groupe).annotate(**comptes):
+        resultat[ligne[groupe]] = {
+            libelle: {'total': ligne[f'epi_{bit}'], **{nom: ligne[f'epi_{bit}_{nom}'] for nom in filtres}}
+            for bit, libelle in types
+        }
+    return resultat
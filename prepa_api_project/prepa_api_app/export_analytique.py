@@ -0,0 +1,254 @@
+# export_analytique.py
+import logging
+import os
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import OperationalError, connection, transaction
+from django.db.models import F, Max
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+from .annuaire import get_annuaire
+from .models import Alerte, ExportAnalytique, ModeleIA
+
+#Export analytique des alertes (avec employé et modèle IA) en Parquet ou Arrow IPC, pour les analyses hors ligne.
+#Valeurs brutes (codes de statut/niveau, dates UTC), colonnes catégorielles encodées en dictionnaire, écriture
+#par groupes de EXPORT_ANALYTIQUE_TAILLE_GROUPE lignes: mémoire bornée et fichier produit en flux.
+#Employés lus dans l'annuaire en mémoire, modèles IA une fois par export: pas de jointure par ligne.
+#Incrémental: chaque passage écrit un nouveau fichier avec les alertes créées depuis la marque (ExportAnalytique).
+#La marque n'avance que sur des ids validés: chaque passage attend d'abord la fin des écritures en cours
+#(borne_validee), une alerte d'id inférieur validée plus tard n'est jamais sautée.
+#pyarrow est importé à la demande: le reste de l'application n'en dépend pas.
+
+logger = logging.getLogger(__name__)
+
+FORMATS = {
+    'parquet': ('.parquet', 'application/vnd.apache.parquet'),
+    'arrow': ('.arrow', 'application/vnd.apache.arrow.file'),
+}
+
+CHAMPS = (
+    'id', 'created_at', 'updated_at', 'pris_en_charge_at', 'traite_at', 'statut', 'niveau', 'typeEpiManquants',
+    'epiManquantsMasque', 'image', 'commentaire', 'employee_id', 'modeleIA_id',
+)
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError:
+        raise ImproperlyConfigured("L'export Parquet/Arrow demande pyarrow (pip install pyarrow).")
+    return pyarrow
+
+
+def _schema(pa):
+    texte, entier, date = pa.string(), pa.int64(), pa.timestamp('us', tz='UTC')
+    categorie = pa.dictionary(pa.int32(), pa.string())
+    return pa.schema([
+        ('id', entier), ('created_at', date), ('updated_at', date), ('pris_en_charge_at', date), ('traite_at', date),
+        ('statut', categorie), ('niveau', categorie), ('typeEpiManquants', texte), ('epiManquantsMasque', entier),
+        ('image', texte), ('commentaire', texte),
+        ('employee_id', entier), ('employee_name', texte), ('employee_surname', texte), ('employee_poste', categorie),
+        ('employee_department', categorie), ('employee_status', categorie),
+        ('modeleIA_id', entier), ('modeleIA_name', categorie), ('modeleIA_version', categorie),
+    ])
+
+
+class Dictionnaire:
+    """Valeurs distinctes d'une colonne catégorielle, dans l'ordre d'apparition. Le dictionnaire d'un lot
+    prolonge celui du lot précédent: Arrow IPC n'écrit que les nouvelles valeurs (delta)."""
+
+    def __init__(self):
+        self.index = {}
+        self.valeurs = []
+
+    def tableau(self, pa, valeurs):
+        indices = []
+        for valeur in valeurs:
+            if valeur is not None and valeur not in self.index:
+                self.index[valeur] = len(self.valeurs)
+                self.valeurs.append(valeur)
+            indices.append(None if valeur is None else self.index[valeur])
+        return pa.DictionaryArray.from_arrays(pa.array(indices, pa.int32()), pa.array(self.valeurs, pa.string()))
+
+
+class Tampon:
+    """Fichier en écriture seule gardé en mémoire entre deux vidages (sortie en flux de pyarrow)."""
+
+    closed = False
+
+    def __init__(self):
+        self.morceaux = []
+        self.position = 0
+
+    def write(self, donnees):
+        donnees = bytes(donnees)
+        self.morceaux.append(donnees)
+        self.position += len(donnees)
+        return len(donnees)
+
+    def tell(self):
+        return self.position
+
+    def writable(self):
+        return True
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def vider(self):
+        donnees = b''.join(self.morceaux)
+        self.morceaux = []
+        return donnees
+
+
+def _verifier_format(format):
+    if format not in FORMATS:
+        raise ValueError(f"Format inconnu: {format} (parquet ou arrow)")
+
+
+def _ecrivain(pa, format, sortie, schema):
+    if format == 'parquet':
+        return pa.parquet.ParquetWriter(sortie, schema, compression=settings.EXPORT_ANALYTIQUE_COMPRESSION)
+    options = pa.ipc.IpcWriteOptions(compression=settings.EXPORT_ANALYTIQUE_COMPRESSION, emit_dictionary_deltas=True)
+    return pa.ipc.new_file(sortie, schema, options=options)
+
+
+def _par_lots(lignes, taille):
+    lot = []
+    for ligne in lignes:
+        lot.append(ligne)
+        if len(lot) >= taille:
+            yield lot
+            lot = []
+    if lot:
+        yield lot
+
+
+def _morceaux(pa, alertes, format, bilan):
+    schema = _schema(pa)
+    dictionnaires = {champ.name: Dictionnaire() for champ in schema if pa.types.is_dictionary(champ.type)}
+    tampon = Tampon()
+    ecrivain = _ecrivain(pa, format, tampon, schema)
+    annuaire = get_annuaire()
+    modeles = {}
+    bilan.update(lignes=0, premier_id=None, dernier_id=None)
+
+    lignes = alertes.order_by('id').values_list(*CHAMPS).iterator(chunk_size=settings.EXPORT_ANALYTIQUE_TAILLE_GROUPE)
+    for lot in _par_lots(lignes, settings.EXPORT_ANALYTIQUE_TAILLE_GROUPE):
+        colonnes = dict(zip(CHAMPS, map(list, zip(*lot))))
+        fiches = annuaire.fiches(set(colonnes['employee_id']))
+        inconnus = set(colonnes['modeleIA_id']) - modeles.keys()
+        if inconnus:
+            modeles.update(
+                (pk, (name, version))
+                for pk, name, version in ModeleIA.objects.filter(pk__in=inconnus).values_list('id', 'name', 'version')
+            )
+        employes = [fiches.get(pk) for pk in colonnes['employee_id']]
+        for champ in ('name', 'surname', 'poste', 'department', 'status'):
+            colonnes[f'employee_{champ}'] = [getattr(fiche, champ) if fiche else None for fiche in employes]
+        colonnes['modeleIA_name'], colonnes['modeleIA_version'] = zip(*(
+            modeles.get(pk, (None, None)) for pk in colonnes['modeleIA_id']
+        ))
+
+        ecrivain.write_batch(pa.record_batch([
+            dictionnaires[champ.name].tableau(pa, colonnes[champ.name]) if champ.name in dictionnaires
+            else pa.array(colonnes[champ.name], champ.type)
+            for champ in schema
+        ], schema=schema))
+        bilan['lignes'] += len(lot)
+        bilan['premier_id'] = bilan['premier_id'] or lot[0][0]
+        bilan['dernier_id'] = lot[-1][0]
+        yield tampon.vider()
+
+    ecrivain.close()
+    yield tampon.vider()
+
+
+def morceaux(alertes, format='parquet', bilan=None):
+    """Fichier Parquet ou Arrow IPC des alertes (ordre des ids), en morceaux de bytes: un par groupe de lignes.
+
+    `bilan` (dict), s'il est donné, reçoit lignes, premier_id et dernier_id une fois le fichier produit.
+    """
+    _verifier_format(format)
+    return _morceaux(_pyarrow(), alertes, format, {} if bilan is None else bilan)
+
+
+def reponse_export_streaming(nom_fichier, alertes, format='parquet'):
+    """StreamingHttpResponse d'un export Parquet/Arrow (l'extension est ajoutée à `nom_fichier`)."""
+    extension, type_mime = FORMATS[format]
+    response = StreamingHttpResponse(morceaux(alertes, format), content_type=type_mime)
+    response['Content-Disposition'] = f'attachment; filename="{nom_fichier}{extension}"'
+    return response
+
+
+def borne_validee():
+    """Plus grand id d'alerte validé, une fois terminées les transactions qui écrivaient dans les alertes:
+    tout id inférieur est alors validé ou abandonné pour de bon. None si les écritures en cours ne finissent pas
+    en EXPORT_ANALYTIQUE_ATTENTE_VERROU secondes."""
+    table = connection.ops.quote_name(Alerte._meta.db_table)
+    try:
+        with transaction.atomic(), connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                # SHARE attend les transactions qui ont écrit dans la table (partitions comprises) et bloque les
+                # nouvelles jusqu'au commit, juste après la lecture de la borne
+                cursor.execute("SELECT set_config('lock_timeout', %s, true)",
+                               [f'{settings.EXPORT_ANALYTIQUE_ATTENTE_VERROU * 1000:.0f}ms'])
+                cursor.execute(f'LOCK TABLE {table} IN SHARE MODE')
+            else:
+                # SQLite: un seul écrivain; une écriture (même sans ligne) attend la fin de celui en cours
+                cursor.execute(f'UPDATE {table} SET id = id WHERE id < 0')
+            return Alerte.objects.aggregate(borne=Max('pk'))['borne'] or 0
+    except OperationalError as e:
+        logger.warning("Export analytique reporté: écritures en cours sur les alertes (%s)", e)
+        return None
+
+
+def exporter_increment(dossier, format='parquet', nom='alertes'):
+    """Écrit dans `dossier` les alertes créées depuis la marque `nom`, dans un nouveau fichier
+    <nom>_<premier id>_<dernier id>.<ext>, et avance la marque. Les fichiers du dossier forment ensemble
+    le jeu de données (lecture par pyarrow.dataset, DuckDB, pandas...). Retourne (chemin, lignes).
+
+    Seules les alertes jusqu'à borne_validee() sont exportées: une transaction encore en cours ne peut plus
+    valider une alerte d'id inférieur à la marque. Écritures trop longues: rien n'est exporté, (None, 0).
+    """
+    _verifier_format(format)
+    pa = _pyarrow()
+    extension, _ = FORMATS[format]
+    os.makedirs(dossier, exist_ok=True)
+    borne = borne_validee()
+    if borne is None:
+        return None, 0
+
+    with transaction.atomic():
+        # Verrou sur la marque: deux exports simultanés du même nom ne se chevauchent pas
+        marque, _ = ExportAnalytique.objects.select_for_update().get_or_create(nom=nom)
+        bilan = {}
+        temporaire = os.path.join(dossier, f'.{nom}.{os.getpid()}{extension}.tmp')
+        try:
+            with open(temporaire, 'wb') as sortie:
+                alertes = Alerte.objects.filter(pk__gt=marque.dernier_id, pk__lte=borne)
+                for morceau in _morceaux(pa, alertes, format, bilan):
+                    sortie.write(morceau)
+                sortie.flush()
+                os.fsync(sortie.fileno())
+            if not bilan['lignes']:
+                return None, 0
+            # Nom tiré des ids: un passage rejoué après un échec du commit remplace le même fichier
+            chemin = os.path.join(dossier, f"{nom}_{bilan['premier_id']:012d}_{bilan['dernier_id']:012d}{extension}")
+            os.replace(temporaire, chemin)
+        finally:
+            if os.path.exists(temporaire):
+                os.remove(temporaire)
+
+        ExportAnalytique.objects.filter(pk=marque.pk).update(
+            dernier_id=bilan['dernier_id'], lignes=F('lignes') + bilan['lignes'], fichiers=F('fichiers') + 1,
+            updated_at=timezone.now(),
+        )
+    return chemin, bilan['lignes']
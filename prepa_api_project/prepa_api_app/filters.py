@@ -0,0 +1,32 @@
+# filters.py
+import django_filters
+
+from .delais import hors_sla
+from .epi import filtrer_par_epi
+from .models import Alerte
+
+
+#Filtres de la liste des alertes (?statut=NOUVEAU&statut=EN_COURS&niveau=CRITIQUE&depuis=2025-01-01T00:00&epi=casque
+#&hors_sla=true...)
+class AlerteFilter(django_filters.FilterSet):
+    statut = django_filters.MultipleChoiceFilter(choices=Alerte.STATUT_CHOICES)
+    niveau = django_filters.MultipleChoiceFilter(choices=Alerte.NIVEAU_CHOICES)
+    department = django_filters.CharFilter(field_name='employee__department')
+    depuis = django_filters.IsoDateTimeFilter(field_name='created_at', lookup_expr='gte')
+    jusqua = django_filters.IsoDateTimeFilter(field_name='created_at', lookup_expr='lt')
+    epi = django_filters.CharFilter(method='filtrer_epi')
+    hors_sla = django_filters.BooleanFilter(method='filtrer_hors_sla')
+
+    class Meta:
+        model = Alerte
+        fields = ['statut', 'niveau', 'employee', 'modeleIA', 'department', 'depuis', 'jusqua', 'epi', 'hors_sla']
+
+    def filtrer_epi(self, queryset, name, value):
+        # Code (ex. "casque") ou libellé d'un type d'EPI: test de bit sur le masque, pas de LIKE
+        return filtrer_par_epi(queryset, value)
+
+    def filtrer_hors_sla(self, queryset, name, value):
+        # Alertes ouvertes dont le délai de prise en charge ou de traitement (selon le niveau) est dépassé
+        if value is None:
+            return queryset
+        return queryset.filter(hors_sla()) if value else queryset.exclude(hors_sla())
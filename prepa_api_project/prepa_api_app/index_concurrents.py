@@ -0,0 +1,135 @@
+# index_concurrents.py
+from django.db import NotSupportedError, migrations
+from django.db.backends.utils import truncate_name
+from django.db.models import Index
+
+#Opérations de migration pour les index des grosses tables écrites en continu (alertes, employés).
+#Sur PostgreSQL, CREATE/DROP INDEX CONCURRENTLY: la table reste ouverte aux écritures pendant la construction.
+#Ailleurs (SQLite des tests), comme AddIndex/RemoveIndex/AlterField.
+#Les migrations qui les utilisent sont atomic = False (CONCURRENTLY est interdit dans une transaction).
+#Table partitionnée (partitions.py): PostgreSQL refuse CONCURRENTLY sur le parent. L'index est créé vide sur
+#le parent (ON ONLY), puis sur chaque partition en CONCURRENTLY, et chaque partition est attachée au parent.
+
+
+def _postgresql(schema_editor):
+    return schema_editor.connection.vendor == 'postgresql'
+
+
+def _hors_transaction(schema_editor, operation):
+    if schema_editor.connection.in_atomic_block:
+        raise NotSupportedError(f"{operation} demande une migration non atomique (atomic = False).")
+
+
+def _partitions(schema_editor, table):
+    """Partitions de `table` si elle est partitionnée, None sinon."""
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+            "WHERE c.relname = %s AND pg_table_is_visible(c.oid))",
+            [table],
+        )
+        if not cursor.fetchone()[0]:
+            return None
+        cursor.execute(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "JOIN pg_class p ON p.oid = i.inhparent WHERE p.relname = %s AND pg_table_is_visible(p.oid) "
+            "ORDER BY c.relname",
+            [table],
+        )
+        return [nom for nom, in cursor.fetchall()]
+
+
+def creer_index(schema_editor, model, index):
+    """CREATE INDEX CONCURRENTLY de `index`, partition par partition si la table est partitionnée."""
+    qn = schema_editor.quote_name
+    table = model._meta.db_table
+    partitions = _partitions(schema_editor, table)
+    if partitions is None:
+        schema_editor.execute(index.create_sql(model, schema_editor, concurrently=True), params=None)
+        return
+
+    parent = index.create_sql(model, schema_editor)
+    parent.parts['table'] = f'ONLY {qn(table)}'  # Index invalide tant que toutes les partitions ne sont pas attachées
+    schema_editor.execute(parent, params=None)
+    for partition in partitions:
+        nom = truncate_name(f'{partition}_{index.name}', schema_editor.connection.ops.max_name_length())
+        sql = index.create_sql(model, schema_editor, concurrently=True)
+        sql.parts.update(table=qn(partition), name=qn(nom))
+        schema_editor.execute(sql, params=None)
+        schema_editor.execute(f'ALTER INDEX {qn(index.name)} ATTACH PARTITION {qn(nom)}')
+
+
+def supprimer_index(schema_editor, model, nom):
+    if _partitions(schema_editor, model._meta.db_table) is None:
+        schema_editor.execute(schema_editor._delete_index_sql(model, nom, concurrently=True))
+    else:
+        # Pas de DROP INDEX CONCURRENTLY sur un index partitionné: suppression simple, sans construction
+        schema_editor.execute(schema_editor._delete_index_sql(model, nom))
+
+
+class AjouterIndexConcurremment(migrations.AddIndex):
+    """AddIndex sans bloquer les écritures sur PostgreSQL (CREATE INDEX CONCURRENTLY)."""
+
+    def describe(self):
+        return f"Concurrently create index {self.index.name} on {self.model_name}"
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if not _postgresql(schema_editor):
+            return super().database_forwards(app_label, schema_editor, from_state, to_state)
+        _hors_transaction(schema_editor, 'AjouterIndexConcurremment')
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            creer_index(schema_editor, model, self.index)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if not _postgresql(schema_editor):
+            return super().database_backwards(app_label, schema_editor, from_state, to_state)
+        _hors_transaction(schema_editor, 'AjouterIndexConcurremment')
+        model = from_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            supprimer_index(schema_editor, model, self.index.name)
+
+
+class RetirerIndexChampConcurremment(migrations.AlterField):
+    """AlterField qui ne fait que retirer l'index simple d'un champ (db_index=False), avec DROP INDEX CONCURRENTLY
+    sur PostgreSQL. Le champ lui-même ne doit pas changer: seul l'index est supprimé en base."""
+
+    def describe(self):
+        return f"Concurrently drop the index of {self.model_name}.{self.name}"
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if not _postgresql(schema_editor):
+            return super().database_forwards(app_label, schema_editor, from_state, to_state)
+        _hors_transaction(schema_editor, 'RetirerIndexChampConcurremment')
+        model = from_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            colonne = model._meta.get_field(self.name).column
+            noms = schema_editor._constraint_names(
+                model, [colonne], index=True, type_=Index.suffix,
+                exclude={index.name for index in model._meta.indexes},
+            )
+            for nom in noms:
+                supprimer_index(schema_editor, model, nom)
+
+
+class RetirerIndexConcurremment(migrations.RemoveIndex):
+    """RemoveIndex sans bloquer les écritures sur PostgreSQL (DROP INDEX CONCURRENTLY)."""
+
+    def describe(self):
+        return f"Concurrently remove index {self.name} from {self.model_name}"
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if not _postgresql(schema_editor):
+            return super().database_forwards(app_label, schema_editor, from_state, to_state)
+        _hors_transaction(schema_editor, 'RetirerIndexConcurremment')
+        model = from_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            supprimer_index(schema_editor, model, self.name)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if not _postgresql(schema_editor):
+            return super().database_backwards(app_label, schema_editor, from_state, to_state)
+        _hors_transaction(schema_editor, 'RetirerIndexConcurremment')
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            creer_index(schema_editor, model, to_state.models[app_label, self.model_name_lower].get_index_by_name(self.name))
@@ -0,0 +1,108 @@
+# ingestion.py
+from collections import Counter
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Value
+
+from .annuaire import get_annuaire
+from .epi import masques_pour
+from .miniatures import planifier_miniatures
+from .modeles_actifs import modeles_actifs, modeles_existants, vider_cache
+from .stockage import ajuster_references
+from .models import Alerte, Employe, ModeleIA
+from .serializers import DetectionSerializer
+from .statistiques import enregistrer_creations
+from .temps_reel import publier_alertes
+
+
+def _references_existantes(employes, modeles):
+    """(ids d'employés, ids de modèles IA) qui existent en base, parmi ceux donnés: une requête (UNION)."""
+    lignes = Employe.objects.filter(pk__in=employes).order_by().values_list('pk', Value('employe')).union(
+        ModeleIA.objects.filter(pk__in=modeles).order_by().values_list('pk', Value('modele')), all=True,
+    )
+    trouves = {'employe': set(), 'modele': set()}
+    for pk, table in lignes:
+        trouves[table].add(pk)
+    return trouves['employe'], trouves['modele']
+
+
+#Ingestion en lot des détections des caméras: une seule passe de validation et un bulk_create dans une seule
+#transaction, quel que soit la taille du lot. Employés et modèles IA viennent des caches en mémoire
+#(annuaire.py, modeles_actifs.py); leur existence est revérifiée dans la transaction, en une requête sur les
+#clés primaires (un employé ou un modèle supprimé par un autre processus peut encore être dans ces caches).
+def ingerer_detections(detections):
+    """Crée les alertes valides d'un lot et retourne (alertes créées, erreurs par index)."""
+    valides = []
+    erreurs = {}
+
+    for index, donnees in enumerate(detections):
+        serializer = DetectionSerializer(data=donnees)
+        if serializer.is_valid():
+            valides.append((index, serializer.validated_data))
+        else:
+            erreurs[index] = serializer.errors
+
+    if any('modeleIA' not in d for _, d in valides):
+        actifs = modeles_actifs()
+        for index, donnees in valides:
+            if 'modeleIA' not in donnees:
+                # Sans modèle précisé: le modèle actif, s'il est unique (sinon erreur sur la détection)
+                donnees['modeleIA'] = actifs[0] if len(actifs) == 1 else None
+
+    employes = get_annuaire().fiches({d['employee'] for _, d in valides})
+    modeles = modeles_existants(d['modeleIA'] for _, d in valides if d['modeleIA'] is not None)
+    masques = masques_pour([d['typeEpiManquants'] for _, d in valides])  # Types inconnus: erreur, pas de création
+
+    alertes, indices = [], []
+    for (index, donnees), (masque, inconnus) in zip(valides, masques):
+        if donnees['employee'] not in employes:
+            erreurs[index] = {'employee': ["Employé introuvable."]}
+            continue
+        if donnees['modeleIA'] is None:
+            erreurs[index] = {'modeleIA': ["Aucun modèle IA actif unique: modeleIA est requis."]}
+            continue
+        if donnees['modeleIA'] not in modeles:
+            erreurs[index] = {'modeleIA': ["Modèle IA introuvable."]}
+            continue
+        if inconnus:
+            erreurs[index] = {'typeEpiManquants': [f"Type(s) d'EPI inconnu(s): {', '.join(inconnus)}."]}
+            continue
+        alertes.append(Alerte(
+            employee_id=donnees['employee'],
+            modeleIA_id=donnees['modeleIA'],
+            typeEpiManquants=donnees['typeEpiManquants'],
+            epiManquantsMasque=masque,
+            niveau=donnees['niveau'],
+            image=donnees['image'],
+            commentaire=donnees['commentaire'],
+        ))
+        indices.append(index)
+
+    with transaction.atomic():
+        if alertes:
+            employes_en_base, modeles_en_base = _references_existantes(
+                {alerte.employee_id for alerte in alertes}, {alerte.modeleIA_id for alerte in alertes},
+            )
+            disparus = [
+                (index, alerte) for index, alerte in zip(indices, alertes)
+                if alerte.employee_id not in employes_en_base or alerte.modeleIA_id not in modeles_en_base
+            ]
+            if disparus:
+                # Supprimés depuis le dernier rafraîchissement des caches: erreur sur la détection, caches corrigés
+                for index, alerte in disparus:
+                    if alerte.employee_id not in employes_en_base:
+                        erreurs[index] = {'employee': ["Employé introuvable."]}
+                    else:
+                        erreurs[index] = {'modeleIA': ["Modèle IA introuvable."]}
+                get_annuaire().oublier(*({alerte.employee_id for alerte in alertes} - employes_en_base))
+                if {alerte.modeleIA_id for alerte in alertes} - modeles_en_base:
+                    vider_cache()
+                alertes = [alerte for index, alerte in zip(indices, alertes) if index not in erreurs]
+        creees = Alerte.objects.bulk_create(alertes, batch_size=settings.ALERTES_INGESTION_TAILLE_LOT)
+        enregistrer_creations(creees)  # bulk_create n'envoie pas post_save
+        ajuster_references(Counter(alerte.image.name for alerte in creees))
+        planifier_miniatures(alerte.pk for alerte in creees)
+        publier_alertes((alerte.pk for alerte in creees), 'creation')
+
+    return creees, erreurs
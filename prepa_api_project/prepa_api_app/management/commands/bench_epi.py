@@ -0,0 +1,74 @@
+import random
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from prepa_api_app.epi import compter_par_epi, filtrer_par_epi
+from prepa_api_app.ingestion import ingerer_detections
+from prepa_api_app.models import Alerte, Employe, ModeleIA
+
+TYPES_EPI = ['Casque', 'Gants', 'Gilet', 'Lunettes', 'Chaussures de sécurité', 'Masque', 'Harnais', 'Bouchons d\'oreilles']
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare le comptage des alertes par type d'EPI: LIKE sur le texte contre test de bit sur le masque "
+        "(les données générées sont annulées à la fin)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--alertes', type=int, default=50000, help="Nombre d'alertes générées")
+        parser.add_argument('--repetitions', type=int, default=5, help="Nombre de mesures par méthode")
+        parser.add_argument('--jours', type=int, default=7, help="Fenêtre de dates comptée")
+
+    def mesurer(self, fonction, repetitions):
+        durees = []
+        for _ in range(repetitions):
+            debut = time.perf_counter()
+            resultat = fonction()
+            durees.append(time.perf_counter() - debut)
+        return resultat, min(durees)
+
+    def handle(self, *args, **options):
+        aleatoire = random.Random(42)
+        with transaction.atomic():
+            employe = Employe.objects.create(name='Bench', surname='EPI', poste='Test', department='Test')
+            modele = ModeleIA.objects.create(name='Bench', version='0', sensibilite=50, typesEpi=', '.join(TYPES_EPI))
+            lot = [
+                {
+                    'employee': employe.id,
+                    'modeleIA': modele.id,
+                    'typeEpiManquants': aleatoire.sample(TYPES_EPI, aleatoire.randint(1, 3)),
+                    'image': f'alertes/bench/{i}.jpg',
+                }
+                for i in range(options['alertes'])
+            ]
+            for i in range(0, len(lot), 5000):
+                ingerer_detections(lot[i:i + 5000])
+
+            fenetre = Alerte.objects.filter(created_at__gte=timezone.now() - timedelta(days=options['jours']))
+
+            for libelle in TYPES_EPI[:3]:
+                like, duree_like = self.mesurer(
+                    lambda: fenetre.filter(typeEpiManquants__icontains=libelle).count(), options['repetitions'])
+                masque, duree_masque = self.mesurer(
+                    lambda: filtrer_par_epi(fenetre, libelle).count(), options['repetitions'])
+                self.stdout.write(
+                    f"{libelle:<25} LIKE: {like} en {duree_like * 1000:.1f} ms | "
+                    f"masque: {masque} en {duree_masque * 1000:.1f} ms"
+                )
+
+            _, duree_like = self.mesurer(
+                lambda: {libelle: fenetre.filter(typeEpiManquants__icontains=libelle).count() for libelle in TYPES_EPI},
+                options['repetitions'])
+            _, duree_masque = self.mesurer(lambda: compter_par_epi(fenetre), options['repetitions'])
+
+            transaction.set_rollback(True)  # Le benchmark ne laisse aucune donnée en base
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Tous les types ({len(TYPES_EPI)}): LIKE {duree_like * 1000:.1f} ms, "
+            f"masque {duree_masque * 1000:.1f} ms ({options['alertes']} alertes)"
+        ))
@@ -0,0 +1,44 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from prepa_api_app.ingestion import ingerer_detections
+from prepa_api_app.models import Employe, ModeleIA
+
+
+class Command(BaseCommand):
+    help = "Mesure le débit soutenu de l'ingestion en lot des détections (les données sont annulées à la fin)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lots', type=int, default=20, help="Nombre de lots envoyés")
+        parser.add_argument('--taille', type=int, default=1000, help="Nombre de détections par lot")
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            employe = Employe.objects.create(name='Bench', surname='Ingestion', poste='Test', department='Test')
+            modele = ModeleIA.objects.create(name='Bench', version='0', sensibilite=50, typesEpi='casque')
+            lot = [
+                {
+                    'employee': employe.id,
+                    'modeleIA': modele.id,
+                    'typeEpiManquants': ['casque', 'gants'],
+                    'niveau': 'ELEVE',
+                    'image': f'alertes/bench/{i}.jpg',
+                }
+                for i in range(options['taille'])
+            ]
+
+            total = 0
+            debut = time.perf_counter()
+            for _ in range(options['lots']):
+                creees, _erreurs = ingerer_detections(lot)
+                total += len(creees)
+            duree = time.perf_counter() - debut
+
+            transaction.set_rollback(True)  # Le benchmark ne laisse aucune donnée en base
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{total} alertes en {duree:.2f}s -> {total / duree:.0f} alertes/s "
+            f"({options['lots']} lots de {options['taille']})"
+        ))
@@ -0,0 +1,90 @@
+import asyncio
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+
+from prepa_api_app.temps_reel import BrokerLocal
+
+DEPARTEMENTS = ['Atelier', 'Peinture', 'Logistique', 'Maintenance']
+NIVEAUX = ['CRITIQUE', 'ELEVE', 'MOYEN', 'FAIBLE']
+
+
+class Command(BaseCommand):
+    help = (
+        "Mesure la latence de diffusion du broker temps réel: N abonnés dans une boucle asyncio, "
+        "messages publiés depuis un autre thread (comme une vue ou l'ingestion)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--abonnes', type=int, default=1000, help="Nombre d'abonnés simultanés")
+        parser.add_argument('--messages', type=int, default=200, help="Nombre d'alertes publiées")
+        parser.add_argument('--intervalle', type=float, default=0.02, help="Secondes entre deux publications")
+        parser.add_argument('--filtres', action='store_true',
+                            help="Abonnés filtrés par département (un sur quatre n'a pas de filtre)")
+
+    def handle(self, *args, **options):
+        latences, recus = asyncio.run(self.mesurer(options))
+        latences.sort()
+        if not latences:
+            self.stdout.write(self.style.ERROR("Aucun message reçu"))
+            return
+
+        def percentile(p):
+            return latences[min(len(latences) - 1, int(len(latences) * p / 100))] * 1000
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{options['abonnes']} abonnés, {options['messages']} alertes -> {recus} livraisons | "
+            f"p50 {percentile(50):.2f} ms, p99 {percentile(99):.2f} ms, max {latences[-1] * 1000:.2f} ms"
+        ))
+
+    async def mesurer(self, options):
+        broker = BrokerLocal()
+        abonnements = []
+        for i in range(options['abonnes']):
+            departements = [DEPARTEMENTS[i % len(DEPARTEMENTS)]] if options['filtres'] and i % 4 else None
+            abonnements.append(broker.abonner(departements))
+
+        # Livraisons attendues: chaque alerte va aux abonnés sans filtre et à ceux de son département
+        attendues = sum(
+            1 for i in range(options['messages']) for abonnement in abonnements
+            if not abonnement.departements or DEPARTEMENTS[i % len(DEPARTEMENTS)] in abonnement.departements
+        )
+        latences = []
+        toutes_recues = asyncio.Event()
+
+        async def consommer(abonnement):
+            while True:
+                message = await abonnement.file.get()
+                latences.append(time.perf_counter() - message['publie_a'])
+                if len(latences) >= attendues:
+                    toutes_recues.set()
+
+        def publier():
+            for i in range(options['messages']):
+                broker.publier([{
+                    'id': i,
+                    'department': DEPARTEMENTS[i % len(DEPARTEMENTS)],
+                    'niveau': NIVEAUX[i % len(NIVEAUX)],
+                    'evenement': 'creation',
+                    'publie_a': time.perf_counter(),
+                }])
+                time.sleep(options['intervalle'])
+
+        consommateurs = [asyncio.create_task(consommer(abonnement)) for abonnement in abonnements]
+        editeur = threading.Thread(target=publier)
+        editeur.start()
+        await asyncio.to_thread(editeur.join)
+        try:
+            await asyncio.wait_for(toutes_recues.wait(), 30)
+        except asyncio.TimeoutError:
+            self.stdout.write(self.style.WARNING(f"{len(latences)}/{attendues} livraisons après 30 s"))
+        for consommateur in consommateurs:
+            consommateur.cancel()
+        await asyncio.gather(*consommateurs, return_exceptions=True)
+        for abonnement in abonnements:
+            broker.desabonner(abonnement)
+        perdus = sum(abonnement.perdus for abonnement in abonnements)
+        if perdus:
+            self.stdout.write(self.style.WARNING(f"{perdus} message(s) jetés (files pleines)"))
+        return latences, len(latences)
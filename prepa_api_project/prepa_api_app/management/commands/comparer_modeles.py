@@ -0,0 +1,82 @@
+import json
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from prepa_api_app.comparaison import comparer_versions
+from prepa_api_app.models import Alerte
+
+
+def _duree(secondes):
+    if secondes is None:
+        return '-'
+    if secondes < 3600:
+        return f"{secondes / 60:.0f} min"
+    if secondes < 86400:
+        return f"{secondes / 3600:.1f} h"
+    return f"{secondes / 86400:.1f} j"
+
+
+def _pourcentage(taux):
+    return '-' if taux is None else f"{taux:.1f}%"
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare les versions de modèles IA sur les alertes historiques: taux d'IGNORE, délais de traitement "
+        "et répartition par type d'EPI."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--modeles', type=int, nargs='+', help="Ids des modèles comparés (tous par défaut)")
+        parser.add_argument('--depuis', help="Alertes créées à partir de ce jour (AAAA-MM-JJ)")
+        parser.add_argument('--jusqu-a', help="Alertes créées jusqu'à ce jour inclus (AAAA-MM-JJ)")
+        parser.add_argument('--department', help="Alertes des employés de ce département seulement")
+        parser.add_argument('--json', action='store_true', help="Rapport complet au format JSON")
+
+    def _date(self, options, nom):
+        if not options[nom]:
+            return None
+        try:
+            return date.fromisoformat(options[nom])
+        except ValueError:
+            raise CommandError(f"--{nom.replace('_', '-')} doit être une date au format AAAA-MM-JJ")
+
+    def handle(self, *args, **options):
+        alertes = Alerte.objects.all()
+        depuis, jusqu_a = self._date(options, 'depuis'), self._date(options, 'jusqu_a')
+        if depuis:
+            alertes = alertes.filter(created_at__date__gte=depuis)
+        if jusqu_a:
+            alertes = alertes.filter(created_at__date__lte=jusqu_a)
+        if options['department']:
+            alertes = alertes.filter(employee__department=options['department'])
+
+        debut = time.perf_counter()
+        rapport = comparer_versions(options['modeles'], alertes)
+        duree = time.perf_counter() - debut
+
+        if options['json']:
+            self.stdout.write(json.dumps(rapport, ensure_ascii=False, indent=2))
+            return
+
+        for version in rapport:
+            delai = version['delai_traitement']
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f"{version['name']} v{version['version']} (id {version['id']}, sensibilité {version['sensibilite']}"
+                f"{', actif' if version['active'] else ''})"
+            ))
+            self.stdout.write(
+                f"  {version['total']} alerte(s) | IGNORE {_pourcentage(version['taux_ignore'])} | "
+                f"résolues {_pourcentage(version['taux_resolution'])}"
+            )
+            self.stdout.write(
+                f"  Délai de traitement ({delai['nombre']}): moyenne {_duree(delai['moyenne_s'])}, "
+                f"p50 {_duree(delai['p50_s'])}, p90 {_duree(delai['p90_s'])}, p99 {_duree(delai['p99_s'])}"
+            )
+            for libelle, valeurs in sorted(version['par_epi'].items(), key=lambda item: -item[1]['total']):
+                self.stdout.write(
+                    f"    {libelle:<25} {valeurs['total']:>8} | IGNORE {_pourcentage(valeurs['taux_ignore'])}"
+                )
+        self.stdout.write(self.style.SUCCESS(f"{len(rapport)} version(s) comparée(s) en {duree * 1000:.0f} ms."))
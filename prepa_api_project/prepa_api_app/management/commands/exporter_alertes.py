@@ -0,0 +1,35 @@
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+
+from prepa_api_app.export_analytique import FORMATS, exporter_increment
+from prepa_api_app.models import ExportAnalytique
+
+
+class Command(BaseCommand):
+    help = (
+        "Export analytique incrémental des alertes (avec employé et modèle IA) en Parquet ou Arrow IPC: "
+        "un nouveau fichier par passage avec les alertes créées depuis la dernière marque. "
+        "À planifier (cron); demande pyarrow."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=sorted(FORMATS), default='parquet', help="Format des fichiers")
+        parser.add_argument('--dossier', default=settings.EXPORT_ANALYTIQUE_DIR, help="Dossier du jeu de données")
+        parser.add_argument('--nom', default='alertes', help="Nom de la marque (et préfixe des fichiers)")
+        parser.add_argument('--reinitialiser', action='store_true',
+                            help="Remet la marque à zéro: le passage réexporte toutes les alertes")
+
+    def handle(self, *args, **options):
+        if options['reinitialiser']:
+            ExportAnalytique.objects.filter(nom=options['nom']).update(dernier_id=0, lignes=0, fichiers=0)
+
+        try:
+            chemin, lignes = exporter_increment(options['dossier'], options['format'], options['nom'])
+        except ImproperlyConfigured as e:
+            raise CommandError(str(e))
+
+        if chemin is None:
+            self.stdout.write("Aucune nouvelle alerte à exporter.")
+        else:
+            self.stdout.write(self.style.SUCCESS(f"{lignes} alerte(s) exportée(s) dans {chemin}"))
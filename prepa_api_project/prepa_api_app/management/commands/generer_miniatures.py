@@ -0,0 +1,35 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from prepa_api_app.miniatures import generer_miniatures, get_executor, tache_miniatures
+from prepa_api_app.models import Alerte
+
+
+class Command(BaseCommand):
+    help = "Génère les miniatures manquantes des images d'alertes existantes (pool de threads MINIATURES_WORKERS)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tous', action='store_true', help="Régénère aussi les miniatures existantes")
+        parser.add_argument('--lot', type=int, default=200, help="Nombre d'alertes par tâche du pool")
+
+    def handle(self, *args, **options):
+        alertes = Alerte.objects.exclude(image='')
+        if not options['tous']:
+            alertes = alertes.filter(miniature='')
+        ids = list(alertes.order_by('pk').values_list('id', flat=True))
+
+        lots = [ids[i:i + options['lot']] for i in range(0, len(ids), options['lot'])]
+        debut = time.perf_counter()
+        if settings.MINIATURES_ASYNC:
+            executor = get_executor()
+            taches = [executor.submit(tache_miniatures, lot, options['tous']) for lot in lots]
+            creees = sum(tache.result() for tache in taches)
+        else:
+            creees = sum(generer_miniatures(lot, options['tous']) for lot in lots)
+        duree = time.perf_counter() - debut
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{creees} miniature(s) générée(s) sur {len(ids)} alerte(s) en {duree:.1f}s"
+        ))
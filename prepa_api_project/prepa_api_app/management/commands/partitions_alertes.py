@@ -0,0 +1,56 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from prepa_api_app import partitions
+
+
+class Command(BaseCommand):
+    help = (
+        "Partitionnement mensuel de la table des alertes (PostgreSQL): conversion initiale, création des "
+        "partitions à venir et rétention (détachement validé à part, puis archivage CSV gzip + images tar.gz "
+        "et suppression). À planifier chaque jour (cron)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--convertir', action='store_true',
+                            help="Transforme la table existante en table partitionnée (verrou exclusif pendant la copie)")
+        parser.add_argument('--avance', type=int, default=settings.ALERTES_PARTITIONS_AVANCE,
+                            help="Nombre de mois futurs dont la partition doit exister")
+        parser.add_argument('--archiver', action='store_true',
+                            help="Archive et supprime les partitions plus anciennes que --retention mois")
+        parser.add_argument('--retention', type=int, default=settings.ALERTES_RETENTION_MOIS,
+                            help="Nombre de mois complets conservés en base")
+        parser.add_argument('--dossier', default=settings.ALERTES_ARCHIVES_DIR, help="Dossier des archives")
+        parser.add_argument('--dry-run', action='store_true', help="Affiche les partitions à archiver sans rien faire")
+
+    def handle(self, *args, **options):
+        try:
+            partitions.verifier_postgresql()
+        except NotImplementedError as e:
+            raise CommandError(str(e))
+
+        if options['convertir']:
+            if partitions.est_partitionnee():
+                raise CommandError("La table des alertes est déjà partitionnée.")
+            partitions.convertir(options['avance'])
+            self.stdout.write(self.style.SUCCESS("Table des alertes convertie en table partitionnée par mois."))
+        elif not partitions.est_partitionnee():
+            raise CommandError("La table des alertes n'est pas partitionnée: lancer d'abord --convertir.")
+
+        for nom in partitions.creer_partitions_futures(options['avance']):
+            self.stdout.write(f"Partition créée: {nom}")
+
+        if options['archiver']:
+            if options['retention'] < 1:
+                raise CommandError("--retention doit être d'au moins 1 mois.")
+            # Partitions détachées par un archivage interrompu d'abord, puis les partitions expirées
+            for nom in partitions.partitions_detachees() + partitions.partitions_expirees(options['retention']):
+                if options['dry_run']:
+                    self.stdout.write(f"À archiver: {nom}")
+                    continue
+                fichiers = partitions.archiver_partition(nom, options['dossier'])
+                self.stdout.write(self.style.SUCCESS(f"Partition {nom} archivée: {', '.join(fichiers)}"))
+
+        liste = partitions.partitions()
+        if liste:
+            self.stdout.write(f"{len(liste)} partition(s), de {liste[0][0]} à {liste[-1][0]}")
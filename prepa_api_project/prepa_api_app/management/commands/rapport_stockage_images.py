@@ -0,0 +1,109 @@
+import hashlib
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import Count, F, Sum
+from django.utils import timezone
+from PIL import Image
+
+from prepa_api_app.models import ImageBlob
+from prepa_api_app.stockage import dhash, distance_hamming, liberer
+
+
+def taille_lisible(octets):
+    for unite in ('o', 'Ko', 'Mo', 'Go'):
+        if abs(octets) < 1024:
+            return f"{octets:.1f} {unite}"
+        octets /= 1024
+    return f"{octets:.1f} To"
+
+
+class Command(BaseCommand):
+    help = (
+        "Mesure l'espace gagné par le stockage par contenu: analyse d'un dossier de médias existant "
+        "(doublons exacts et, en option, quasi-doublons) et bilan de la table des images stockées."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dossier', default='alertes', help="Dossier analysé, relatif à MEDIA_ROOT")
+        parser.add_argument(
+            '--distance', type=int, default=0,
+            help="Distance de Hamming maximale (bits de dHash) pour compter les quasi-doublons; 0 = exacts seulement",
+        )
+        parser.add_argument('--voisins', type=int, default=50, help="Images précédentes comparées pour les quasi-doublons")
+        parser.add_argument(
+            '--purger-orphelins', action='store_true',
+            help="Supprime les images stockées depuis plus d'un jour qu'aucune alerte n'utilise",
+        )
+
+    def handle(self, *args, **options):
+        self.analyser_dossier(os.path.join(settings.MEDIA_ROOT, options['dossier']), options)
+        self.bilan_table()
+        if options['purger_orphelins']:
+            orphelins = ImageBlob.objects.filter(references__lte=0, created_at__lt=timezone.now() - timedelta(days=1))
+            self.stdout.write(f"{liberer(orphelins)} image(s) orpheline(s) supprimée(s)")
+
+    def analyser_dossier(self, racine, options):
+        fichiers = []
+        for dossier, _, noms in os.walk(racine):
+            for nom in noms:
+                if '.miniature.' not in nom:
+                    chemin = os.path.join(dossier, nom)
+                    fichiers.append((os.path.getmtime(chemin), chemin))
+        fichiers.sort()  # Ordre d'arrivée: les quasi-doublons d'une même caméra se suivent
+
+        total = uniques = quasi = 0
+        vus = set()
+        recents = []
+        for _, chemin in fichiers:
+            sha = hashlib.sha256()
+            with open(chemin, 'rb') as fichier:
+                for morceau in iter(lambda: fichier.read(1024 * 1024), b''):
+                    sha.update(morceau)
+            taille = os.path.getsize(chemin)
+            total += taille
+            if sha.hexdigest() in vus:
+                continue
+            vus.add(sha.hexdigest())
+
+            if options['distance']:
+                try:
+                    with Image.open(chemin) as image:
+                        empreinte = dhash(image)
+                except (OSError, ValueError):
+                    empreinte = None
+                if empreinte is not None:
+                    if any(distance_hamming(empreinte, autre) <= options['distance'] for autre in recents):
+                        quasi += taille
+                        continue
+                    recents = (recents + [empreinte])[-options['voisins']:]
+            uniques += taille
+
+        self.stdout.write(f"Dossier {racine}: {len(fichiers)} fichier(s), {taille_lisible(total)}")
+        self.stdout.write(f"  Doublons exacts: {taille_lisible(total - uniques - quasi)} gagnés")
+        if options['distance']:
+            self.stdout.write(f"  Quasi-doublons (distance <= {options['distance']}): {taille_lisible(quasi)} gagnés")
+        economie = (total - uniques) / total * 100 if total else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"  Espace nécessaire: {taille_lisible(uniques)} au lieu de {taille_lisible(total)} (-{economie:.1f}%)"
+        ))
+
+    def bilan_table(self):
+        valeurs = ImageBlob.objects.aggregate(
+            stocke=Sum('taille'),
+            reference=Sum(F('taille') * F('references')),
+        )
+        stocke = valeurs['stocke'] or 0
+        reference = valeurs['reference'] or 0
+        self.stdout.write(
+            f"Images stockées par contenu: {ImageBlob.objects.count()} fichier(s), {taille_lisible(stocke)} sur disque "
+            f"pour {taille_lisible(reference)} référencés ({taille_lisible(max(reference - stocke, 0))} gagnés)"
+        )
+        proches = ImageBlob.objects.exclude(proche='').aggregate(nombre=Count('id'), taille=Sum('taille'))
+        if proches['nombre']:
+            self.stdout.write(
+                f"  Quasi-doublons notés (hash perceptuel): {proches['nombre']} fichier(s), "
+                f"{taille_lisible(proches['taille'])}"
+            )
@@ -0,0 +1,30 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from prepa_api_app.delais import reconstruire_delais
+from prepa_api_app.statistiques import reconstruire
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcule la table des statistiques journalières d'alertes (et les histogrammes de délais de traitement) "
+        "à partir de la table des alertes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--depuis', help="Ne recalculer qu'à partir de ce jour (AAAA-MM-JJ)")
+
+    def handle(self, *args, **options):
+        depuis = None
+        if options['depuis']:
+            try:
+                depuis = date.fromisoformat(options['depuis'])
+            except ValueError:
+                raise CommandError("--depuis doit être une date au format AAAA-MM-JJ")
+
+        lignes = reconstruire(depuis)
+        self.stdout.write(self.style.SUCCESS(f"{lignes} ligne(s) de statistiques recalculée(s)."))
+        if depuis is None:
+            reconstruire_delais()
+            self.stdout.write(self.style.SUCCESS("Histogrammes des délais de traitement recalculés."))
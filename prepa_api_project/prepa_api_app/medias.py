@@ -0,0 +1,116 @@
+# medias.py
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.http import require_safe
+
+# Fichiers du stockage par contenu (stockage.py): le nom est le sha256 du contenu, il ne change jamais.
+# Une seule extension: '<sha256>.miniature.webp' est régénérée sur place (taille, format), elle n'est pas immuable.
+NOM_PAR_CONTENU = re.compile(r'(?:^|/)([0-9a-f]{64})\.[a-z0-9]+$')
+PLAGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+TAILLE_MORCEAU = 64 * 1024
+
+
+#Service des fichiers de MEDIA_ROOT en production (settings.MEDIA_SERVING, voir urls.py):
+#  'x-accel-redirect' / 'x-sendfile': Django vérifie le chemin et pose les en-têtes, nginx/Apache envoie le fichier;
+#  'sendfile': FileResponse, que le serveur WSGI (gunicorn, uWSGI) transmet par os.sendfile via wsgi.file_wrapper.
+#Dans tous les cas: ETag fort, Last-Modified, GET conditionnel (304) et, pour 'sendfile', requêtes Range (206).
+
+def etag_fichier(chemin, stat):
+    correspondance = NOM_PAR_CONTENU.search(chemin)
+    if correspondance:
+        return f'"{correspondance.group(1)}"'
+    return f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+
+def entetes_cache(response, chemin, stat, etag):
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    if NOM_PAR_CONTENU.search(chemin):
+        response['Cache-Control'] = 'private, max-age=31536000, immutable'
+    else:
+        response['Cache-Control'] = f'private, max-age={settings.MEDIA_CACHE_MAX_AGE}'
+    response['Accept-Ranges'] = 'bytes'
+    return response
+
+
+def plage_demandee(request, taille, etag, stat):
+    """(début, fin incluse) d'une requête Range simple et satisfaisable, sinon None (réponse complète)."""
+    correspondance = PLAGE.match(request.headers.get('Range', ''))
+    if not correspondance or taille == 0:
+        return None
+    if_range = request.headers.get('If-Range')
+    if if_range and if_range != etag and parse_http_date_safe(if_range) != int(stat.st_mtime):
+        return None  # Le fichier a changé depuis la première partie: on renvoie tout
+    debut, fin = correspondance.groups()
+    if debut:
+        debut, fin = int(debut), min(int(fin), taille - 1) if fin else taille - 1
+    elif fin:
+        debut, fin = max(taille - int(fin), 0), taille - 1  # bytes=-500: les 500 derniers octets
+    else:
+        return None
+    return (debut, fin) if debut <= fin else False
+
+
+def lire_plage(fichier, debut, longueur):
+    with fichier:
+        fichier.seek(debut)
+        while longueur > 0:
+            morceau = fichier.read(min(TAILLE_MORCEAU, longueur))
+            if not morceau:
+                break
+            longueur -= len(morceau)
+            yield morceau
+
+
+@require_safe
+def servir_media(request, chemin):
+    try:
+        complet = safe_join(settings.MEDIA_ROOT, chemin)
+        stat = os.stat(complet)
+    except (SuspiciousFileOperation, OSError, ValueError):
+        raise Http404("Fichier introuvable.")
+    if not os.path.isfile(complet):
+        raise Http404("Fichier introuvable.")
+
+    etag = etag_fichier(chemin, stat)
+    non_modifie = get_conditional_response(request, etag=etag, last_modified=int(stat.st_mtime))
+    if non_modifie is not None:
+        return entetes_cache(non_modifie, chemin, stat, etag)
+
+    type_contenu = mimetypes.guess_type(complet)[0] or 'application/octet-stream'
+    mode = settings.MEDIA_SERVING
+
+    if mode in ('x-accel-redirect', 'x-sendfile'):
+        # Le serveur web gère lui-même Range et l'envoi du fichier; Django n'a lu que les métadonnées
+        response = HttpResponse(content_type=type_contenu)
+        if mode == 'x-accel-redirect':
+            response['X-Accel-Redirect'] = settings.MEDIA_ACCEL_PREFIX + quote(chemin)
+        else:
+            response['X-Sendfile'] = complet
+        return entetes_cache(response, chemin, stat, etag)
+
+    plage = plage_demandee(request, stat.st_size, etag, stat)
+    if plage is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{stat.st_size}'
+        return response
+    if plage:
+        debut, fin = plage
+        response = StreamingHttpResponse(
+            lire_plage(open(complet, 'rb'), debut, fin - debut + 1), status=206, content_type=type_contenu,
+        )
+        response['Content-Length'] = str(fin - debut + 1)
+        response['Content-Range'] = f'bytes {debut}-{fin}/{stat.st_size}'
+        return entetes_cache(response, chemin, stat, etag)
+
+    response = FileResponse(open(complet, 'rb'), content_type=type_contenu)
+    return entetes_cache(response, chemin, stat, etag)
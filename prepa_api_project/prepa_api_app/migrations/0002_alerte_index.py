@@ -0,0 +1,49 @@
+# Generated by Django 5.2.7 on 2026-10-17 10:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from prepa_api_app.index_concurrents import AjouterIndexConcurremment, RetirerIndexChampConcurremment
+
+
+class Migration(migrations.Migration):
+    # Index construits sans bloquer les écritures sur alertes (voir index_concurrents.py)
+    atomic = False
+
+    dependencies = [
+        ('prepa_api_app', '0001_initial'),
+    ]
+
+    operations = [
+        AjouterIndexConcurremment(
+            model_name='alerte',
+            index=models.Index(fields=['employee', '-created_at'], name='alertes_employe_date_idx'),
+        ),
+        AjouterIndexConcurremment(
+            model_name='alerte',
+            index=models.Index(fields=['modeleIA', '-created_at'], name='alertes_modele_date_idx'),
+        ),
+        AjouterIndexConcurremment(
+            model_name='alerte',
+            index=models.Index(fields=['statut', '-created_at'], name='alertes_statut_date_idx'),
+        ),
+        AjouterIndexConcurremment(
+            model_name='alerte',
+            index=models.Index(fields=['niveau', '-created_at'], name='alertes_niveau_date_idx'),
+        ),
+        AjouterIndexConcurremment(
+            model_name='alerte',
+            index=models.Index(condition=models.Q(('statut__in', ['NOUVEAU', 'EN_COURS'])), fields=['-created_at'], name='alertes_ouvertes_idx'),
+        ),
+        # Index simples des FK retirés une fois les index composites (employee, created_at)/(modeleIA, created_at) en place
+        RetirerIndexChampConcurremment(
+            model_name='alerte',
+            name='employee',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='alertes', to='prepa_api_app.employe', verbose_name='Employé'),
+        ),
+        RetirerIndexChampConcurremment(
+            model_name='alerte',
+            name='modeleIA',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='alertes', to='prepa_api_app.modeleia', verbose_name='Modèle IA'),
+        ),
+    ]
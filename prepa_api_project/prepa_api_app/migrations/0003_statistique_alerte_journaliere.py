@@ -0,0 +1,34 @@
+# Generated by Django 5.2.7 on 2026-10-17 10:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prepa_api_app', '0002_alerte_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StatistiqueAlerteJournaliere',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('jour', models.DateField(verbose_name='Jour')),
+                ('statut', models.CharField(choices=[('NOUVEAU', 'Nouveau'), ('EN_COURS', 'En cours de traitement'), ('RESOLU', 'Résolu'), ('IGNORE', 'Ignoré')], max_length=20, verbose_name='Statut')),
+                ('niveau', models.CharField(choices=[('FAIBLE', 'Faible'), ('MOYEN', 'Moyen'), ('ELEVE', 'Élevé'), ('CRITIQUE', 'Critique')], max_length=20, verbose_name='Niveau de gravité')),
+                ('total', models.IntegerField(default=0, verbose_name="Nombre d'alertes")),
+                ('employee', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='statistiques_journalieres', to='prepa_api_app.employe', verbose_name='Employé')),
+                ('modeleIA', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='statistiques_journalieres', to='prepa_api_app.modeleia', verbose_name='Modèle IA')),
+            ],
+            options={
+                'verbose_name': "Statistique journalière d'alertes",
+                'verbose_name_plural': "Statistiques journalières d'alertes",
+                'db_table': 'statistiques_alertes_journalieres',
+                'ordering': ['-jour'],
+                'indexes': [models.Index(fields=['employee', 'jour'], name='statistique_employe_jour_idx'), models.Index(fields=['modeleIA', 'jour'], name='statistique_modele_jour_idx')],
+                'constraints': [models.UniqueConstraint(fields=('jour', 'employee', 'modeleIA', 'statut', 'niveau'), name='statistique_alerte_jour_unique')],
+            },
+        ),
+    ]
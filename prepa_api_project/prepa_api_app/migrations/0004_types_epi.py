@@ -0,0 +1,38 @@
+# Generated by Django 5.2.7 on 2026-10-17 10:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prepa_api_app', '0003_statistique_alerte_journaliere'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TypeEpi',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('code', models.SlugField(unique=True, verbose_name='Code')),
+                ('libelle', models.CharField(max_length=100, verbose_name='Libellé')),
+                ('bit', models.PositiveSmallIntegerField(unique=True, verbose_name='Bit')),
+            ],
+            options={
+                'verbose_name': "Type d'EPI",
+                'verbose_name_plural': "Types d'EPI",
+                'db_table': 'types_epi',
+                'ordering': ['bit'],
+            },
+        ),
+        migrations.AddField(
+            model_name='alerte',
+            name='epiManquantsMasque',
+            field=models.BigIntegerField(default=0, editable=False, verbose_name='EPI manquants (masque)'),
+        ),
+        migrations.AddField(
+            model_name='modeleia',
+            name='typesEpiMasque',
+            field=models.BigIntegerField(default=0, editable=False, verbose_name="Types d'EPI détectés (masque)"),
+        ),
+    ]
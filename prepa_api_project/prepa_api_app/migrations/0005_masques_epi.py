@@ -0,0 +1,41 @@
+import re
+
+from django.db import migrations
+from django.utils.text import slugify
+
+
+def remplir_masques(apps, schema_editor):
+    # Même découpage et mêmes codes que epi.py, recopiés pour que la migration ne dépende pas du code courant
+    TypeEpi = apps.get_model('prepa_api_app', 'TypeEpi')
+    Alerte = apps.get_model('prepa_api_app', 'Alerte')
+    ModeleIA = apps.get_model('prepa_api_app', 'ModeleIA')
+    bits = dict(TypeEpi.objects.values_list('code', 'bit'))
+
+    def masque(texte):
+        valeur = 0
+        for libelle in re.split(r'[,;/|]', texte or ''):
+            libelle = libelle.strip()
+            code = slugify(libelle)[:50]
+            if not code:
+                continue
+            if code not in bits:
+                bits[code] = TypeEpi.objects.create(code=code, libelle=libelle, bit=max(bits.values(), default=-1) + 1).bit
+            valeur |= 1 << bits[code]
+        return valeur
+
+    # Un UPDATE par texte distinct: peu de combinaisons d'EPI différentes, même sur une grosse table
+    for texte in Alerte.objects.order_by().values_list('typeEpiManquants', flat=True).distinct():
+        Alerte.objects.filter(typeEpiManquants=texte).update(epiManquantsMasque=masque(texte))
+    for texte in ModeleIA.objects.order_by().values_list('typesEpi', flat=True).distinct():
+        ModeleIA.objects.filter(typesEpi=texte).update(typesEpiMasque=masque(texte))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prepa_api_app', '0004_types_epi'),
+    ]
+
+    operations = [
+        migrations.RunPython(remplir_masques, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,20 @@
+from django.db import migrations, models
+
+from prepa_api_app.index_concurrents import AjouterIndexConcurremment
+
+
+class Migration(migrations.Migration):
+    # Index de la liste et du curseur (created_at, id), avec le masque d'EPI: construit après le remplissage
+    # des masques, sans bloquer les écritures sur alertes (voir index_concurrents.py)
+    atomic = False
+
+    dependencies = [
+        ('prepa_api_app', '0005_masques_epi'),
+    ]
+
+    operations = [
+        AjouterIndexConcurremment(
+            model_name='alerte',
+            index=models.Index(fields=['-created_at', '-id', 'epiManquantsMasque'], name='alertes_date_id_idx'),
+        ),
+    ]
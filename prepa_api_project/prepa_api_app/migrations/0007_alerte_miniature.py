@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-17 10:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prepa_api_app', '0006_alerte_index_curseur'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='alerte',
+            name='miniature',
+            field=models.ImageField(blank=True, editable=False, upload_to='alertes/%Y/%m/%d/', verbose_name='Miniature'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.7 on 2026-10-17 10:20
+
+import prepa_api_app.stockage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prepa_api_app', '0007_alerte_miniature'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nom', models.CharField(max_length=255, unique=True, verbose_name='Fichier')),
+                ('empreinte', models.CharField(db_index=True, max_length=64, verbose_name='SHA-256')),
+                ('taille', models.PositiveIntegerField(verbose_name='Taille (octets)')),
+                ('references', models.IntegerField(default=0, verbose_name='Références')),
+                ('dhash', models.BigIntegerField(blank=True, null=True, verbose_name='Hash perceptuel')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='Date de création')),
+            ],
+            options={
+                'verbose_name': 'Image stockée',
+                'verbose_name_plural': 'Images stockées',
+                'db_table': 'images_alertes',
+            },
+        ),
+        migrations.AlterField(
+            model_name='alerte',
+            name='image',
+            field=models.ImageField(storage=prepa_api_app.stockage.stockage_images, upload_to='alertes/%Y/%m/%d/', verbose_name='Image'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.7 on 2026-10-17 10:26
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prepa_api_app', '0008_stockage_images'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HistoriqueStatutAlerte',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('statut_avant', models.CharField(choices=[('NOUVEAU', 'Nouveau'), ('EN_COURS', 'En cours de traitement'), ('RESOLU', 'Résolu'), ('IGNORE', 'Ignoré')], max_length=20, verbose_name='Statut avant')),
+                ('statut_apres', models.CharField(choices=[('NOUVEAU', 'Nouveau'), ('EN_COURS', 'En cours de traitement'), ('RESOLU', 'Résolu'), ('IGNORE', 'Ignoré')], max_length=20, verbose_name='Statut après')),
+                ('niveau_avant', models.CharField(choices=[('FAIBLE', 'Faible'), ('MOYEN', 'Moyen'), ('ELEVE', 'Élevé'), ('CRITIQUE', 'Critique')], max_length=20, verbose_name='Niveau avant')),
+                ('niveau_apres', models.CharField(choices=[('FAIBLE', 'Faible'), ('MOYEN', 'Moyen'), ('ELEVE', 'Élevé'), ('CRITIQUE', 'Critique')], max_length=20, verbose_name='Niveau après')),
+                ('created_at', models.DateTimeField(verbose_name='Date')),
+                ('alerte', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='historique', to='prepa_api_app.alerte', verbose_name='Alerte')),
+                ('utilisateur', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Utilisateur')),
+            ],
+            options={
+                'verbose_name': 'Historique de statut',
+                'verbose_name_plural': 'Historique des statuts',
+                'db_table': 'historique_statuts_alertes',
+                'ordering': ['-created_at', '-id'],
+                'indexes': [models.Index(fields=['alerte', '-created_at'], name='historique_alerte_date_idx')],
+            },
+        ),
+    ]
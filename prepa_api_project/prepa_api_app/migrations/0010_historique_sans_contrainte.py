@@ -0,0 +1,19 @@
+# Generated by Django 5.2.7 on 2026-10-17 10:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prepa_api_app', '0009_historique_statuts'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='historiquestatutalerte',
+            name='alerte',
+            field=models.ForeignKey(db_constraint=False, db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='historique', to='prepa_api_app.alerte', verbose_name='Alerte'),
+        ),
+    ]
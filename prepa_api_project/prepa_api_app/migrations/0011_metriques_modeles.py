@@ -0,0 +1,84 @@
+# Generated by Django 5.2.7 on 2026-10-17 10:33
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Q, Sum
+
+
+def remplir_metriques(apps, schema_editor):
+    # Depuis les statistiques journalières (déjà agrégées); mêmes champs que statistiques.reconstruire_metriques
+    Statistique = apps.get_model('prepa_api_app', 'StatistiqueAlerteJournaliere')
+    MetriquesModeleIA = apps.get_model('prepa_api_app', 'MetriquesModeleIA')
+    MetriquesEmployeModele = apps.get_model('prepa_api_app', 'MetriquesEmployeModele')
+
+    sommes = {'somme': Sum('total')}
+    for statut in ('NOUVEAU', 'EN_COURS', 'RESOLU', 'IGNORE'):
+        sommes[f'statut_{statut.lower()}'] = Sum('total', filter=Q(statut=statut))
+    for niveau in ('CRITIQUE', 'ELEVE', 'MOYEN', 'FAIBLE'):
+        sommes[f'niveau_{niveau.lower()}'] = Sum('total', filter=Q(niveau=niveau))
+
+    MetriquesModeleIA.objects.bulk_create(
+        [
+            MetriquesModeleIA(
+                modeleIA_id=ligne.pop('modeleIA_id'), total=ligne.pop('somme') or 0,
+                **{champ: valeur or 0 for champ, valeur in ligne.items()},
+            )
+            for ligne in Statistique.objects.values('modeleIA_id').annotate(**sommes).order_by()
+        ],
+        batch_size=500,
+    )
+    MetriquesEmployeModele.objects.bulk_create(
+        (
+            MetriquesEmployeModele(modeleIA_id=ligne['modeleIA_id'], employee_id=ligne['employee_id'], total=ligne['somme'])
+            for ligne in Statistique.objects.values('modeleIA_id', 'employee_id')
+            .annotate(somme=Sum('total')).filter(somme__gt=0).order_by().iterator()
+        ),
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prepa_api_app', '0010_historique_sans_contrainte'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MetriquesModeleIA',
+            fields=[
+                ('modeleIA', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='metriques', serialize=False, to='prepa_api_app.modeleia', verbose_name='Modèle IA')),
+                ('total', models.IntegerField(default=0, verbose_name='Total')),
+                ('statut_nouveau', models.IntegerField(default=0, verbose_name='Nouvelles')),
+                ('statut_en_cours', models.IntegerField(default=0, verbose_name='En cours')),
+                ('statut_resolu', models.IntegerField(default=0, verbose_name='Résolues')),
+                ('statut_ignore', models.IntegerField(default=0, verbose_name='Ignorées')),
+                ('niveau_critique', models.IntegerField(default=0, verbose_name='Critiques')),
+                ('niveau_eleve', models.IntegerField(default=0, verbose_name='Élevées')),
+                ('niveau_moyen', models.IntegerField(default=0, verbose_name='Moyennes')),
+                ('niveau_faible', models.IntegerField(default=0, verbose_name='Faibles')),
+            ],
+            options={
+                'verbose_name': 'Métriques du modèle IA',
+                'verbose_name_plural': 'Métriques des modèles IA',
+                'db_table': 'metriques_modeles_ia',
+            },
+        ),
+        migrations.CreateModel(
+            name='MetriquesEmployeModele',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total', models.IntegerField(default=0, verbose_name='Total')),
+                ('employee', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='metriques_modeles', to='prepa_api_app.employe', verbose_name='Employé')),
+                ('modeleIA', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='metriques_employes', to='prepa_api_app.modeleia', verbose_name='Modèle IA')),
+            ],
+            options={
+                'verbose_name': 'Métriques employé / modèle',
+                'verbose_name_plural': 'Métriques employés / modèles',
+                'db_table': 'metriques_employes_modeles',
+                'indexes': [models.Index(fields=['modeleIA', '-total'], name='metriques_modele_total_idx'), models.Index(fields=['employee'], name='metriques_employe_idx')],
+                'constraints': [models.UniqueConstraint(fields=('modeleIA', 'employee'), name='metriques_employe_modele_unique')],
+            },
+        ),
+        migrations.RunPython(remplir_metriques, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 5.2.7 on 2026-10-17 10:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def horodater_alertes(apps, schema_editor):
+    # Depuis l'historique des statuts quand il existe, sinon updated_at (meilleure approximation disponible)
+    Alerte = apps.get_model('prepa_api_app', 'Alerte')
+    Historique = apps.get_model('prepa_api_app', 'HistoriqueStatutAlerte')
+    traites = ['RESOLU', 'IGNORE']
+
+    prise_en_charge = Historique.objects.filter(
+        alerte=OuterRef('pk'), statut_avant='NOUVEAU',
+    ).exclude(statut_apres='NOUVEAU').order_by('created_at').values('created_at')[:1]
+    traitement = Historique.objects.filter(
+        alerte=OuterRef('pk'), statut_apres__in=traites,
+    ).exclude(statut_avant__in=traites).order_by('-created_at').values('created_at')[:1]
+
+    Alerte.objects.exclude(statut='NOUVEAU').update(
+        pris_en_charge_at=Coalesce(Subquery(prise_en_charge), F('updated_at')),
+    )
+    Alerte.objects.filter(statut__in=traites).update(traite_at=Coalesce(Subquery(traitement), F('updated_at')))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prepa_api_app', '0011_metriques_modeles'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HistogrammeDelaiAlerte',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('etape', models.CharField(choices=[('PRISE_EN_CHARGE', 'Prise en charge'), ('TRAITEMENT', 'Traitement')], max_length=20, verbose_name='Étape')),
+                ('department', models.CharField(max_length=100, verbose_name='Département')),
+                ('niveau', models.CharField(choices=[('FAIBLE', 'Faible'), ('MOYEN', 'Moyen'), ('ELEVE', 'Élevé'), ('CRITIQUE', 'Critique')], max_length=20, verbose_name='Niveau de gravité')),
+                ('classe', models.SmallIntegerField(verbose_name='Classe de délai')),
+                ('total', models.IntegerField(default=0, verbose_name='Total')),
+            ],
+            options={
+                'verbose_name': 'Histogramme des délais',
+                'verbose_name_plural': 'Histogrammes des délais',
+                'db_table': 'histogrammes_delais_alertes',
+            },
+        ),
+        migrations.AddField(
+            model_name='alerte',
+            name='pris_en_charge_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Prise en charge'),
+        ),
+        migrations.AddField(
+            model_name='alerte',
+            name='traite_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Traitée le'),
+        ),
+        migrations.AddField(
+            model_name='histogrammedelaialerte',
+            name='modeleIA',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='prepa_api_app.modeleia', verbose_name='Modèle IA'),
+        ),
+        migrations.AddIndex(
+            model_name='histogrammedelaialerte',
+            index=models.Index(fields=['etape', 'department'], name='histogramme_etape_dept_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='histogrammedelaialerte',
+            constraint=models.UniqueConstraint(fields=('modeleIA', 'etape', 'department', 'niveau', 'classe'), name='histogramme_delai_unique'),
+        ),
+        migrations.RunPython(horodater_alertes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.7 on 2026-10-17 10:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prepa_api_app', '0012_delais_traitement'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExportAnalytique',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nom', models.CharField(max_length=50, unique=True, verbose_name='Nom')),
+                ('dernier_id', models.BigIntegerField(default=0, verbose_name='Dernier id exporté')),
+                ('lignes', models.BigIntegerField(default=0, verbose_name='Lignes exportées')),
+                ('fichiers', models.IntegerField(default=0, verbose_name='Fichiers écrits')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Dernier export')),
+            ],
+            options={
+                'verbose_name': 'Export analytique',
+                'verbose_name_plural': 'Exports analytiques',
+                'db_table': 'exports_analytiques',
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.7 on 2026-10-17 10:54
+
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prepa_api_app', '0013_export_analytique'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Suppression',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('type', models.CharField(choices=[('alerte', 'Alerte'), ('employe', 'Employé')], max_length=20, verbose_name='Type')),
+                ('objet_id', models.BigIntegerField(verbose_name='Id supprimé')),
+                ('supprime_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Supprimé le')),
+            ],
+            options={
+                'verbose_name': 'Suppression',
+                'verbose_name_plural': 'Suppressions',
+                'db_table': 'suppressions',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='suppression',
+            index=models.Index(fields=['type', 'supprime_at', 'id'], name='suppressions_type_date_idx'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.7 on 2026-10-17 10:39
+
+from django.db import migrations, models
+
+from prepa_api_app.index_concurrents import AjouterIndexConcurremment
+
+
+class Migration(migrations.Migration):
+    # Seule opération de la migration: CREATE INDEX CONCURRENTLY est interdit dans une transaction
+    # (voir index_concurrents.py); le reste du suivi des délais est dans 0012, atomique.
+    atomic = False
+
+    dependencies = [
+        ('prepa_api_app', '0014_flux_changements'),
+    ]
+
+    operations = [
+        AjouterIndexConcurremment(
+            model_name='alerte',
+            index=models.Index(condition=models.Q(('statut__in', ['NOUVEAU', 'EN_COURS'])), fields=['niveau', 'statut', 'created_at'], name='alertes_ouvertes_niveau_idx'),
+        ),
+    ]
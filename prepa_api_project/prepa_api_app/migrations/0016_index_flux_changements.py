@@ -0,0 +1,26 @@
+# Generated by Django 5.2.7 on 2026-10-17 10:54
+
+from django.db import migrations, models
+
+from prepa_api_app.index_concurrents import AjouterIndexConcurremment
+
+
+class Migration(migrations.Migration):
+    # Index seuls, construits sans bloquer les écritures (voir index_concurrents.py); le flux de changements
+    # lui-même (table des suppressions) est dans 0014, atomique.
+    atomic = False
+
+    dependencies = [
+        ('prepa_api_app', '0015_alerte_index_ouvertes_niveau'),
+    ]
+
+    operations = [
+        AjouterIndexConcurremment(
+            model_name='alerte',
+            index=models.Index(fields=['updated_at', 'id'], name='alertes_maj_id_idx'),
+        ),
+        AjouterIndexConcurremment(
+            model_name='employe',
+            index=models.Index(fields=['updated_at', 'id'], name='employes_maj_id_idx'),
+        ),
+    ]
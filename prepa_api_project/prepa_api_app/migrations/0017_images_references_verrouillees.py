@@ -0,0 +1,24 @@
+# Generated by Django 5.2.7 on 2026-10-17 11:40
+
+import prepa_api_app.stockage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prepa_api_app', '0016_index_flux_changements'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='imageblob',
+            name='proche',
+            field=models.CharField(blank=True, max_length=255, verbose_name='Image quasi identique'),
+        ),
+        migrations.AlterField(
+            model_name='alerte',
+            name='image',
+            field=prepa_api_app.stockage.ImageAlerteField(storage=prepa_api_app.stockage.stockage_images, upload_to='alertes/%Y/%m/%d/', verbose_name='Image'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.7 on 2026-10-17 15:20
+
+from django.db import migrations, models
+
+from prepa_api_app.position_flux import creer_declencheurs, supprimer_declencheurs
+
+
+def creer(apps, schema_editor):
+    creer_declencheurs(schema_editor.connection)
+
+
+def supprimer(apps, schema_editor):
+    supprimer_declencheurs(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+    # Les lignes existantes gardent la position 0: lues en premier par un nouveau consommateur du flux.
+    # Index de la nouvelle position dans 0019, non atomique.
+
+    dependencies = [
+        ('prepa_api_app', '0017_images_references_verrouillees'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='alerte',
+            name='position_flux',
+            field=models.BigIntegerField(default=0, editable=False, verbose_name='Position dans le flux'),
+        ),
+        migrations.AddField(
+            model_name='employe',
+            name='position_flux',
+            field=models.BigIntegerField(default=0, editable=False, verbose_name='Position dans le flux'),
+        ),
+        migrations.AddField(
+            model_name='suppression',
+            name='position_flux',
+            field=models.BigIntegerField(default=0, editable=False, verbose_name='Position dans le flux'),
+        ),
+        migrations.RunPython(creer, supprimer),
+    ]
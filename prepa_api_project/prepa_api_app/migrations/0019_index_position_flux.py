@@ -0,0 +1,38 @@
+# Generated by Django 5.2.7 on 2026-10-17 15:20
+
+from django.db import migrations, models
+
+from prepa_api_app.index_concurrents import AjouterIndexConcurremment, RetirerIndexConcurremment
+
+
+class Migration(migrations.Migration):
+    # Index seuls, construits sans bloquer les écritures (voir index_concurrents.py). Le flux de changements
+    # lit désormais (position_flux, id); (updated_at, id) des employés reste pour l'annuaire.
+    atomic = False
+
+    dependencies = [
+        ('prepa_api_app', '0018_position_flux'),
+    ]
+
+    operations = [
+        AjouterIndexConcurremment(
+            model_name='alerte',
+            index=models.Index(fields=['position_flux', 'id'], name='alertes_flux_id_idx'),
+        ),
+        AjouterIndexConcurremment(
+            model_name='employe',
+            index=models.Index(fields=['position_flux', 'id'], name='employes_flux_id_idx'),
+        ),
+        AjouterIndexConcurremment(
+            model_name='suppression',
+            index=models.Index(fields=['type', 'position_flux', 'id'], name='suppressions_type_flux_idx'),
+        ),
+        RetirerIndexConcurremment(
+            model_name='alerte',
+            name='alertes_maj_id_idx',
+        ),
+        RetirerIndexConcurremment(
+            model_name='suppression',
+            name='suppressions_type_date_idx',
+        ),
+    ]
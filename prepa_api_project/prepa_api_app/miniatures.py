@@ -0,0 +1,111 @@
+# miniatures.py
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connections, transaction
+from PIL import Image, ImageOps
+
+from .models import Alerte
+
+logger = logging.getLogger(__name__)
+
+EXTENSIONS = {'WEBP': 'webp', 'JPEG': 'jpg'}
+
+
+#Miniatures des images d'alertes: générées par un pool de threads hors de la requête (Pillow relâche le GIL
+#pendant le décodage et le redimensionnement), enregistrées à côté de l'original, lues par l'admin et l'API.
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=settings.MINIATURES_WORKERS, thread_name_prefix='miniatures')
+    return _executor
+
+
+def nom_miniature(nom_image):
+    """'alertes/2025/01/31/cam1.jpg' -> 'alertes/2025/01/31/cam1.miniature.webp'"""
+    racine, _ = os.path.splitext(nom_image)
+    return f"{racine}.miniature.{EXTENSIONS[settings.MINIATURES_FORMAT]}"
+
+
+def url_apercu(alerte):
+    """URL à afficher en petit: la miniature si elle existe, sinon l'original."""
+    if alerte.miniature:
+        return alerte.miniature.url
+    return alerte.image.url if alerte.image else None
+
+
+def generer_miniature(alerte, forcer=False):
+    storage = alerte.miniature.storage
+    nom = nom_miniature(alerte.image.name)
+    if storage.exists(nom) and not forcer:
+        # Image partagée par plusieurs alertes (stockage par contenu): la miniature existe déjà
+        Alerte.objects.filter(pk=alerte.pk).update(miniature=nom)
+        return nom
+
+    taille = settings.MINIATURES_TAILLE
+    with alerte.image.open('rb') as fichier, Image.open(fichier) as image:
+        # JPEG: décodage directement à une échelle réduite (1/2, 1/4, 1/8), bien plus rapide qu'en pleine résolution
+        image.draft('RGB', (taille[0] * 2, taille[1] * 2))
+        image = ImageOps.exif_transpose(image).convert('RGB')
+        miniature = ImageOps.fit(image, taille, method=Image.Resampling.LANCZOS)
+
+    tampon = BytesIO()
+    miniature.save(tampon, format=settings.MINIATURES_FORMAT, quality=settings.MINIATURES_QUALITE)
+
+    if storage.exists(nom):
+        storage.delete(nom)
+    nom = storage.save(nom, ContentFile(tampon.getvalue()))
+    # update(): pas de signaux, la miniature ne change ni les statistiques ni la date de modification
+    Alerte.objects.filter(pk=alerte.pk).update(miniature=nom)
+    return nom
+
+
+def generer_miniatures(ids, forcer=False):
+    """Génère les miniatures des alertes `ids`; retourne le nombre de miniatures créées."""
+    creees = 0
+    for alerte in Alerte.objects.filter(pk__in=ids).exclude(image='').only('id', 'image', 'miniature'):
+        try:
+            generer_miniature(alerte, forcer=forcer)
+            creees += 1
+        except (OSError, ValueError) as e:
+            # Fichier absent ou image illisible: l'admin et l'API retombent sur l'original
+            logger.warning("Miniature impossible pour l'alerte %s (%s): %s", alerte.pk, alerte.image.name, e)
+    return creees
+
+
+def tache_miniatures(ids, forcer=False):
+    try:
+        return generer_miniatures(ids, forcer=forcer)
+    except Exception:
+        logger.exception("Échec de la génération de miniatures")
+        raise
+    finally:
+        connections.close_all()  # Les threads du pool ne passent pas par request_finished
+
+
+def planifier_miniatures(ids, forcer=False):
+    """Génère les miniatures après le commit de la transaction courante, dans le pool (ou tout de suite
+    si MINIATURES_ASYNC est faux, ex. dans les tests)."""
+    ids = list(ids)
+    if not ids or not settings.MINIATURES_ACTIVES:
+        return
+
+    def lancer():
+        if settings.MINIATURES_ASYNC:
+            get_executor().submit(tache_miniatures, ids, forcer)
+        else:
+            generer_miniatures(ids, forcer)
+
+    transaction.on_commit(lancer)
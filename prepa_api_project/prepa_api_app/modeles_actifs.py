@@ -0,0 +1,89 @@
+# modeles_actifs.py
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+from .models import ModeleIA
+
+#Cache en mémoire (par processus) des modèles IA, pour l'ingestion: aucune requête pour résoudre le modèle
+#d'une détection. Un compteur de version partagé (cache Django) est changé à chaque activation,
+#désactivation, duplication, création ou suppression de modèle; chaque processus le relit au plus toutes
+#les MODELES_IA_CACHE_VERIFICATION secondes, et recharge de toute façon après MODELES_IA_CACHE_TTL secondes
+#(cache local par processus, écriture perdue): un changement est vu partout en un temps borné.
+#Entre-temps un modèle supprimé peut y rester: l'ingestion revérifie les ids en base avant d'écrire.
+
+CLE_VERSION = 'modeles_ia:version'
+
+_lock = threading.Lock()
+_etat = {'version': None, 'charge_a': None, 'verifie_a': 0.0, 'modeles': {}}
+
+
+def _version_partagee():
+    version = cache.get(CLE_VERSION)
+    if version is None:
+        cache.add(CLE_VERSION, time.time_ns(), None)
+        version = cache.get(CLE_VERSION)
+    return version
+
+
+def vider_cache():
+    with _lock:
+        _etat['charge_a'] = None
+
+
+def invalider_modeles():
+    """Nouvelle version des modèles IA: ce processus recharge tout de suite, les autres à leur prochaine vérification."""
+    cache.set(CLE_VERSION, time.time_ns(), None)
+    vider_cache()
+
+
+def _a_jour(maintenant):
+    if _etat['charge_a'] is None or maintenant - _etat['charge_a'] >= settings.MODELES_IA_CACHE_TTL:
+        return False
+    if maintenant - _etat['verifie_a'] < settings.MODELES_IA_CACHE_VERIFICATION:
+        return True
+    _etat['verifie_a'] = maintenant
+    return _version_partagee() == _etat['version']
+
+
+def _modeles():
+    maintenant = time.monotonic()
+    with _lock:
+        if _a_jour(maintenant):
+            return _etat['modeles']
+    # Version lue avant la requête: un changement pendant le chargement provoque un nouveau chargement
+    version = _version_partagee()
+    modeles = dict(ModeleIA.objects.order_by().values_list('id', 'active'))
+    with _lock:
+        _etat.update(version=version, charge_a=maintenant, verifie_a=maintenant, modeles=modeles)
+    return modeles
+
+
+def modeles_actifs():
+    """Ids des modèles IA actifs (triés)."""
+    return sorted(pk for pk, actif in _modeles().items() if actif)
+
+
+def modeles_existants(ids):
+    """Sous-ensemble des ids qui désignent un modèle IA. Les ids inconnus du cache (modèle créé par un autre
+    processus depuis le dernier chargement) sont vérifiés en base, en une requête."""
+    ids = set(ids)
+    connus = ids & _modeles().keys()
+    inconnus = ids - connus
+    if inconnus:
+        trouves = set(ModeleIA.objects.filter(pk__in=inconnus).values_list('pk', flat=True))
+        if trouves:
+            vider_cache()
+        connus |= trouves
+    return connus
+
+
+@receiver(setting_changed)
+def _reglages_modifies(setting, **kwargs):
+    # Le compteur de version vit dans le cache Django: un autre cache ne le connaît pas
+    if setting == 'CACHES':
+        vider_cache()
@@ -1,9 +1,14 @@
 # models.py
 from django.db import models
 from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.utils import timezone
 
+from .stockage import ImageAlerteField, stockage_images
+from .suppressions import SuppressionEnLot, SuppressionEnLotQuerySet
 
-class Employe(models.Model):
+
+class Employe(SuppressionEnLot, models.Model):
     STATUS_CHOICES = [
         ('ACTIF', 'Actif'),
         ('INACTIF', 'Inactif'),
@@ -19,6 +24,10 @@ class Employe(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='ACTIF', verbose_name="Statut")
     created_at = models.DateTimeField(auto_now_add=True) # pour le suivi en BD
     updated_at = models.DateTimeField(auto_now=True)
+    # Ordre de validation pour le flux de changements, écrit par un déclencheur (position_flux.py)
+    position_flux = models.BigIntegerField(default=0, editable=False, verbose_name="Position dans le flux")
+
+    objects = SuppressionEnLotQuerySet.as_manager()
 
     def __str__(self):
         return f"{self.name} {self.surname} - {self.poste}"
@@ -28,6 +37,12 @@ class Employe(models.Model):
         ordering = ['name', 'surname']
         verbose_name = "Employé"
         verbose_name_plural = "Employés"
+        indexes = [
+            # Rafraîchissement de l'annuaire: plage sur (updated_at, id)
+            models.Index(fields=['updated_at', 'id'], name='employes_maj_id_idx'),
+            # Flux de changements (changements.py): chaque lecture est une plage après le curseur (position_flux, id)
+            models.Index(fields=['position_flux', 'id'], name='employes_flux_id_idx'),
+        ]
 
 
 class Technicien(models.Model):
@@ -51,17 +66,55 @@ class Technicien(models.Model):
         verbose_name = "Technicien"
         verbose_name_plural = "Techniciens"
 
-class ModeleIA(models.Model):
+class TypeEpi(models.Model):
+    # Table de référence des types d'EPI: chaque type a un bit dans les masques
+    # Alerte.epiManquantsMasque et ModeleIA.typesEpiMasque (voir epi.py).
+    code = models.SlugField(max_length=50, unique=True, verbose_name="Code")
+    libelle = models.CharField(max_length=100, verbose_name="Libellé")
+    bit = models.PositiveSmallIntegerField(unique=True, verbose_name="Bit")
+
+    def __str__(self):
+        return self.libelle
+
+    def clean(self):
+        from .epi import NOMBRE_MAX_TYPES, bits_libres  # epi importe ce module
+
+        if self._state.adding and not bits_libres():
+            raise ValidationError(f"Le catalogue d'EPI est plein ({NOMBRE_MAX_TYPES} types au plus).")
+
+    class Meta:
+        db_table = 'types_epi'
+        ordering = ['bit']
+        verbose_name = "Type d'EPI"
+        verbose_name_plural = "Types d'EPI"
+
+
+class ModeleIA(SuppressionEnLot, models.Model):
     name = models.CharField(max_length=100, verbose_name="Nom du modèle")
     version = models.CharField(max_length=100, verbose_name="Version")
     sensibilite = models.IntegerField(verbose_name="Sensibilité")
     typesEpi = models.CharField(max_length=100, verbose_name="Types d'EPI détectés")
+    typesEpiMasque = models.BigIntegerField(default=0, editable=False, verbose_name="Types d'EPI détectés (masque)")
     active = models.BooleanField(default=False, verbose_name="Actif")
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = SuppressionEnLotQuerySet.as_manager()
+
     def __str__(self):
         return f"{self.name} v{self.version}"
 
+    def clean(self):
+        # Les types inconnus sont ajoutés au catalogue à l'enregistrement (signals.masque_epi_modele):
+        # refusés ici plutôt qu'une erreur 500 quand le masque est plein
+        from .epi import NOMBRE_MAX_TYPES, bits_libres, types_inconnus  # epi importe ce module
+
+        inconnus = types_inconnus(self.typesEpi)
+        if len(inconnus) > bits_libres():
+            raise ValidationError({'typesEpi': (
+                f"Le catalogue d'EPI est plein ({NOMBRE_MAX_TYPES} types au plus): "
+                f"impossible d'ajouter {', '.join(inconnus)}."
+            )})
+
     class Meta:
         db_table = 'modeles_ia'
         ordering = ['name', '-version']  # Ordre décroissant pour version
@@ -69,7 +122,7 @@ class ModeleIA(models.Model):
         verbose_name_plural = "Modèles IA"
 
 
-class Alerte(models.Model):
+class Alerte(SuppressionEnLot, models.Model):
 
     STATUT_CHOICES = [
         ('NOUVEAU', 'Nouveau'),
@@ -85,16 +138,46 @@ class Alerte(models.Model):
         ('CRITIQUE', 'Critique'),
     ]
 
-    employee = models.ForeignKey(Employe,on_delete=models.CASCADE,related_name='alertes',verbose_name="Employé")
-    modeleIA = models.ForeignKey(ModeleIA,on_delete=models.CASCADE,related_name='alertes',verbose_name="Modèle IA")
+    # Pas d'index simple sur les FK: les index composites (employee, created_at) et (modeleIA, created_at) les couvrent.
+    employee = models.ForeignKey(Employe,on_delete=models.CASCADE,related_name='alertes',verbose_name="Employé",db_index=False)
+    modeleIA = models.ForeignKey(ModeleIA,on_delete=models.CASCADE,related_name='alertes',verbose_name="Modèle IA",db_index=False)
     typeEpiManquants = models.CharField(max_length=500, verbose_name="EPI manquants")
-    image = models.ImageField(upload_to='alertes/%Y/%m/%d/', verbose_name="Image")
+    epiManquantsMasque = models.BigIntegerField(default=0, editable=False, verbose_name="EPI manquants (masque)")
+    image = ImageAlerteField(upload_to='alertes/%Y/%m/%d/', storage=stockage_images, verbose_name="Image")
+    miniature = models.ImageField(upload_to='alertes/%Y/%m/%d/', blank=True, editable=False, verbose_name="Miniature")
     statut = models.CharField(max_length=20, choices=STATUT_CHOICES, default='NOUVEAU', verbose_name="Statut")
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Date de création")
     updated_at = models.DateTimeField(auto_now=True, verbose_name="Dernière modification")
+    # Ordre de validation pour le flux de changements, écrit par un déclencheur (position_flux.py)
+    position_flux = models.BigIntegerField(default=0, editable=False, verbose_name="Position dans le flux")
+    # Horodatage des transitions (voir delais.py): première sortie de NOUVEAU, passage à RESOLU/IGNORE
+    pris_en_charge_at = models.DateTimeField(null=True, blank=True, editable=False, verbose_name="Prise en charge")
+    traite_at = models.DateTimeField(null=True, blank=True, editable=False, verbose_name="Traitée le")
     niveau = models.CharField(max_length=20,choices=NIVEAU_CHOICES,default='MOYEN',verbose_name="Niveau de gravité")
     commentaire = models.TextField(blank=True,verbose_name="Commentaire")
 
+    objects = SuppressionEnLotQuerySet.as_manager()
+
+    # Valeurs lues en base {attname: valeur}, comparées au save() par les signaux (compteurs, délais, références
+    # d'images). Posées par from_db et après chaque save(): rien à faire pour les alertes seulement lues.
+    CHAMPS_INITIAUX = (
+        'created_at', 'employee_id', 'modeleIA_id', 'statut', 'niveau', 'image', 'pris_en_charge_at', 'traite_at',
+    )
+    _initial = {}
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._initial = dict(zip(field_names, values))
+        return instance
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        differes = self.get_deferred_fields()
+        self._initial = {champ: getattr(self, champ) for champ in self.CHAMPS_INITIAUX if champ not in differes}
+        if 'image' in self._initial:
+            self._initial['image'] = self.image.name
+
     def __str__(self):
         return f"Alerte {self.id} - {self.employee.name} - {self.created_at.strftime('%d/%m/%Y %H:%M')}"
 
@@ -103,3 +186,249 @@ class Alerte(models.Model):
         ordering = ['-created_at']
         verbose_name = "Alerte"
         verbose_name_plural = "Alertes"
+        indexes = [
+            # Liste par défaut (ordering = ['-created_at']), fenêtres de dates et pagination par curseur (created_at, id);
+            # le masque d'EPI en dernière colonne permet de compter par type d'EPI sans lire la table
+            models.Index(fields=['-created_at', '-id', 'epiManquantsMasque'], name='alertes_date_id_idx'),
+            # Historique d'un employé et fenêtres par modèle IA
+            models.Index(fields=['employee', '-created_at'], name='alertes_employe_date_idx'),
+            models.Index(fields=['modeleIA', '-created_at'], name='alertes_modele_date_idx'),
+            # Filtres statut / niveau de l'admin (et prédicat "urgent": statut='NOUVEAU' AND created_at < limite)
+            models.Index(fields=['statut', '-created_at'], name='alertes_statut_date_idx'),
+            models.Index(fields=['niveau', '-created_at'], name='alertes_niveau_date_idx'),
+            # Alertes ouvertes: petit index partiel, seules les alertes à traiter y sont
+            models.Index(
+                fields=['-created_at'],
+                name='alertes_ouvertes_idx',
+                condition=models.Q(statut__in=['NOUVEAU', 'EN_COURS']),
+            ),
+            # Alertes ouvertes hors SLA: une plage (niveau, created_at < limite) par niveau de gravité
+            models.Index(
+                fields=['niveau', 'statut', 'created_at'],
+                name='alertes_ouvertes_niveau_idx',
+                condition=models.Q(statut__in=['NOUVEAU', 'EN_COURS']),
+            ),
+            # Flux de changements (changements.py): chaque lecture est une plage après le curseur (position_flux, id)
+            models.Index(fields=['position_flux', 'id'], name='alertes_flux_id_idx'),
+        ]
+
+
+class HistoriqueStatutAlerte(models.Model):
+    # Une ligne par alerte et par transition (statut et/ou niveau), écrite en lot par transitions.py.
+    # Pas de contrainte en base: une fois `alertes` partitionnée (partitions.py), la clé primaire est
+    # (id, created_at) et id seul ne peut plus être référencé. La suppression en cascade reste faite par Django.
+    alerte = models.ForeignKey(
+        Alerte, on_delete=models.CASCADE, db_constraint=False, db_index=False,  # Couvert par historique_alerte_date_idx
+        related_name='historique', verbose_name="Alerte",
+    )
+    utilisateur = models.ForeignKey(
+        User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+', verbose_name="Utilisateur",
+    )
+    statut_avant = models.CharField(max_length=20, choices=Alerte.STATUT_CHOICES, verbose_name="Statut avant")
+    statut_apres = models.CharField(max_length=20, choices=Alerte.STATUT_CHOICES, verbose_name="Statut après")
+    niveau_avant = models.CharField(max_length=20, choices=Alerte.NIVEAU_CHOICES, verbose_name="Niveau avant")
+    niveau_apres = models.CharField(max_length=20, choices=Alerte.NIVEAU_CHOICES, verbose_name="Niveau après")
+    created_at = models.DateTimeField(verbose_name="Date")
+
+    def __str__(self):
+        return f"Alerte {self.alerte_id}: {self.statut_avant} -> {self.statut_apres}"
+
+    class Meta:
+        db_table = 'historique_statuts_alertes'
+        ordering = ['-created_at', '-id']
+        verbose_name = "Historique de statut"
+        verbose_name_plural = "Historique des statuts"
+        indexes = [
+            models.Index(fields=['alerte', '-created_at'], name='historique_alerte_date_idx'),
+        ]
+
+
+class StatistiqueAlerteJournaliere(models.Model):
+    # Agrégat (jour, employé, modèle IA, statut, niveau) -> nombre d'alertes, maintenu au fil des
+    # modifications d'alertes (voir statistiques.py) et lu par tous les graphiques de l'admin.
+    jour = models.DateField(verbose_name="Jour")
+    employee = models.ForeignKey(Employe,on_delete=models.CASCADE,related_name='statistiques_journalieres',verbose_name="Employé",db_index=False)
+    modeleIA = models.ForeignKey(ModeleIA,on_delete=models.CASCADE,related_name='statistiques_journalieres',verbose_name="Modèle IA",db_index=False)
+    statut = models.CharField(max_length=20, choices=Alerte.STATUT_CHOICES, verbose_name="Statut")
+    niveau = models.CharField(max_length=20, choices=Alerte.NIVEAU_CHOICES, verbose_name="Niveau de gravité")
+    total = models.IntegerField(default=0, verbose_name="Nombre d'alertes")
+
+    def __str__(self):
+        return f"{self.jour} - {self.employee_id}/{self.modeleIA_id} - {self.statut}/{self.niveau}: {self.total}"
+
+    class Meta:
+        db_table = 'statistiques_alertes_journalieres'
+        ordering = ['-jour']
+        verbose_name = "Statistique journalière d'alertes"
+        verbose_name_plural = "Statistiques journalières d'alertes"
+        constraints = [
+            # Sert aussi de cible au "ON CONFLICT" des mises à jour incrémentales et aux fenêtres de jours
+            models.UniqueConstraint(
+                fields=['jour', 'employee', 'modeleIA', 'statut', 'niveau'],
+                name='statistique_alerte_jour_unique',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['employee', 'jour'], name='statistique_employe_jour_idx'),
+            models.Index(fields=['modeleIA', 'jour'], name='statistique_modele_jour_idx'),
+        ]
+
+
+class ImageBlob(models.Model):
+    # Un fichier image stocké par contenu (voir stockage.py) et le nombre d'alertes qui l'utilisent
+    nom = models.CharField(max_length=255, unique=True, verbose_name="Fichier")
+    empreinte = models.CharField(max_length=64, db_index=True, verbose_name="SHA-256")
+    taille = models.PositiveIntegerField(verbose_name="Taille (octets)")
+    references = models.IntegerField(default=0, verbose_name="Références")
+    dhash = models.BigIntegerField(null=True, blank=True, verbose_name="Hash perceptuel")
+    proche = models.CharField(max_length=255, blank=True, verbose_name="Image quasi identique")  # Voir image_proche
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True, verbose_name="Date de création")
+
+    def __str__(self):
+        return f"{self.nom} ({self.references})"
+
+    class Meta:
+        db_table = 'images_alertes'
+        verbose_name = "Image stockée"
+        verbose_name_plural = "Images stockées"
+
+
+class MetriquesModeleIA(models.Model):
+    # Compteurs par modèle, tenus à jour avec les statistiques journalières (statistiques.appliquer_deltas)
+    modeleIA = models.OneToOneField(
+        ModeleIA, on_delete=models.CASCADE, primary_key=True, related_name='metriques', verbose_name="Modèle IA",
+    )
+    total = models.IntegerField(default=0, verbose_name="Total")
+    statut_nouveau = models.IntegerField(default=0, verbose_name="Nouvelles")
+    statut_en_cours = models.IntegerField(default=0, verbose_name="En cours")
+    statut_resolu = models.IntegerField(default=0, verbose_name="Résolues")
+    statut_ignore = models.IntegerField(default=0, verbose_name="Ignorées")
+    niveau_critique = models.IntegerField(default=0, verbose_name="Critiques")
+    niveau_eleve = models.IntegerField(default=0, verbose_name="Élevées")
+    niveau_moyen = models.IntegerField(default=0, verbose_name="Moyennes")
+    niveau_faible = models.IntegerField(default=0, verbose_name="Faibles")
+
+    def _taux(self, nombre):
+        return nombre / self.total * 100 if self.total else None
+
+    @property
+    def taux_resolution(self):
+        return self._taux(self.statut_resolu)
+
+    @property
+    def taux_faux_positifs(self):
+        return self._taux(self.statut_ignore)
+
+    @property
+    def taux_traitement(self):
+        return self._taux(self.statut_resolu + self.statut_ignore)
+
+    def __str__(self):
+        return f"Métriques {self.modeleIA_id}"
+
+    class Meta:
+        db_table = 'metriques_modeles_ia'
+        verbose_name = "Métriques du modèle IA"
+        verbose_name_plural = "Métriques des modèles IA"
+
+
+class MetriquesEmployeModele(models.Model):
+    # Nombre d'alertes par (modèle, employé): le top des employés alertés est une lecture d'index
+    modeleIA = models.ForeignKey(
+        ModeleIA, on_delete=models.CASCADE, db_index=False, related_name='metriques_employes', verbose_name="Modèle IA",
+    )
+    employee = models.ForeignKey(
+        Employe, on_delete=models.CASCADE, db_index=False, related_name='metriques_modeles', verbose_name="Employé",
+    )
+    total = models.IntegerField(default=0, verbose_name="Total")
+
+    class Meta:
+        db_table = 'metriques_employes_modeles'
+        verbose_name = "Métriques employé / modèle"
+        verbose_name_plural = "Métriques employés / modèles"
+        constraints = [
+            models.UniqueConstraint(fields=['modeleIA', 'employee'], name='metriques_employe_modele_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['modeleIA', '-total'], name='metriques_modele_total_idx'),
+            models.Index(fields=['employee'], name='metriques_employe_idx'),
+        ]
+
+
+class HistogrammeDelaiAlerte(models.Model):
+    # Histogramme à classes logarithmiques (type HDR) des délais de prise en charge et de traitement,
+    # tenu à jour à chaque transition (delais.py); les percentiles se lisent sans parcourir les alertes.
+    ETAPE_CHOICES = [
+        ('PRISE_EN_CHARGE', 'Prise en charge'),
+        ('TRAITEMENT', 'Traitement'),
+    ]
+
+    modeleIA = models.ForeignKey(
+        ModeleIA, on_delete=models.CASCADE, db_index=False,  # Couvert par la contrainte unique
+        related_name='+', verbose_name="Modèle IA",
+    )
+    etape = models.CharField(max_length=20, choices=ETAPE_CHOICES, verbose_name="Étape")
+    department = models.CharField(max_length=100, verbose_name="Département")
+    niveau = models.CharField(max_length=20, choices=Alerte.NIVEAU_CHOICES, verbose_name="Niveau de gravité")
+    classe = models.SmallIntegerField(verbose_name="Classe de délai")
+    total = models.IntegerField(default=0, verbose_name="Total")
+
+    def __str__(self):
+        return f"{self.etape} {self.department} {self.niveau} classe {self.classe}: {self.total}"
+
+    class Meta:
+        db_table = 'histogrammes_delais_alertes'
+        verbose_name = "Histogramme des délais"
+        verbose_name_plural = "Histogrammes des délais"
+        constraints = [
+            models.UniqueConstraint(
+                fields=['modeleIA', 'etape', 'department', 'niveau', 'classe'], name='histogramme_delai_unique',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['etape', 'department'], name='histogramme_etape_dept_idx'),
+        ]
+
+
+class ExportAnalytique(models.Model):
+    # Marque d'un export analytique incrémental (export_analytique.py): les alertes d'id <= dernier_id
+    # sont déjà dans les fichiers du dossier d'export.
+    nom = models.CharField(max_length=50, unique=True, verbose_name="Nom")
+    dernier_id = models.BigIntegerField(default=0, verbose_name="Dernier id exporté")
+    lignes = models.BigIntegerField(default=0, verbose_name="Lignes exportées")
+    fichiers = models.IntegerField(default=0, verbose_name="Fichiers écrits")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Dernier export")
+
+    def __str__(self):
+        return f"{self.nom}: jusqu'à l'alerte {self.dernier_id}"
+
+    class Meta:
+        db_table = 'exports_analytiques'
+        verbose_name = "Export analytique"
+        verbose_name_plural = "Exports analytiques"
+
+
+class Suppression(models.Model):
+    # Trace d'une alerte ou d'un employé supprimé, pour le flux de changements (changements.py): les systèmes
+    # en aval apprennent les suppressions comme les modifications, dans l'ordre (position_flux, id).
+    TYPE_CHOICES = [
+        ('alerte', 'Alerte'),
+        ('employe', 'Employé'),
+    ]
+
+    type = models.CharField(max_length=20, choices=TYPE_CHOICES, verbose_name="Type")
+    objet_id = models.BigIntegerField(verbose_name="Id supprimé")
+    supprime_at = models.DateTimeField(default=timezone.now, verbose_name="Supprimé le")
+    # Ordre de validation pour le flux de changements, écrit par un déclencheur (position_flux.py)
+    position_flux = models.BigIntegerField(default=0, editable=False, verbose_name="Position dans le flux")
+
+    def __str__(self):
+        return f"{self.type} {self.objet_id} supprimé le {self.supprime_at}"
+
+    class Meta:
+        db_table = 'suppressions'
+        verbose_name = "Suppression"
+        verbose_name_plural = "Suppressions"
+        indexes = [
+            models.Index(fields=['type', 'position_flux', 'id'], name='suppressions_type_flux_idx'),
+        ]
@@ -0,0 +1,85 @@
+# pagination.py
+import base64
+from datetime import datetime
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+#Pagination "keyset" sur (created_at, id), du plus récent au plus ancien.
+#Au lieu d'un OFFSET (qui relit toutes les lignes des pages précédentes), le curseur mémorise la dernière
+#ligne vue et la page suivante commence juste après, via l'index (created_at DESC, id DESC):
+#la 10 000e page coûte le même prix que la première.
+class KeysetPagination(BasePagination):
+    page_size = 50
+    max_page_size = 500
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    invalid_cursor_message = 'Curseur invalide'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.taille = self.get_page_size(request)
+
+        queryset = queryset.order_by('-created_at', '-id')
+        curseur = self.decode_cursor(request.query_params.get(self.cursor_query_param))
+        if curseur is not None:
+            date, pk = curseur
+            # created_at <= date borne le parcours de l'index; le OU départage les égalités sur l'id
+            queryset = queryset.filter(
+                Q(created_at__lt=date) | Q(created_at=date, id__lt=pk), created_at__lte=date
+            )
+
+        lignes = list(queryset[:self.taille + 1])
+        self.a_suivant = len(lignes) > self.taille
+        lignes = lignes[:self.taille]
+        self.derniere = lignes[-1] if lignes else None
+        return lignes
+
+    def get_page_size(self, request):
+        try:
+            taille = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(taille, self.max_page_size))
+
+    def get_next_link(self):
+        if not self.a_suivant:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.derniere))
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'first': remove_query_param(self.request.build_absolute_uri(), self.cursor_query_param),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'first': {'type': 'string', 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    @staticmethod
+    def encode_cursor(alerte):
+        brut = f'{alerte.created_at.isoformat()}|{alerte.pk}'
+        return base64.urlsafe_b64encode(brut.encode()).decode()
+
+    def decode_cursor(self, curseur):
+        if not curseur:
+            return None
+        try:
+            date, pk = base64.urlsafe_b64decode(curseur.encode()).decode().split('|')
+            return datetime.fromisoformat(date), int(pk)
+        except (TypeError, ValueError, UnicodeDecodeError):
+            raise NotFound(self.invalid_cursor_message)
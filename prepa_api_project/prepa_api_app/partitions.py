@@ -0,0 +1,269 @@
+# partitions.py
+import gzip
+import os
+import tarfile
+from collections import Counter, defaultdict
+from datetime import datetime
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .miniatures import nom_miniature
+from .models import Alerte, HistoriqueStatutAlerte
+from .position_flux import creer_declencheurs
+from .stockage import ajuster_references, stockage_images
+
+# Partition pour les dates hors des mois créés (évite un échec d'INSERT si la maintenance a du retard)
+SUFFIXE_DEFAUT = 'defaut'
+
+
+#Partitionnement mensuel de la table des alertes (PostgreSQL, partitionnement déclaratif par created_at).
+#Les mois suivent TIME_ZONE, comme les filtres par date de l'admin. Voir la commande partitions_alertes.
+
+def debut_mois(date):
+    date = timezone.localtime(date)  # MIN(created_at) et timezone.now() sont en UTC
+    return timezone.make_aware(datetime(date.year, date.month, 1))
+
+
+def decaler_mois(debut, mois):
+    annee, index = divmod(debut.year * 12 + debut.month - 1 + mois, 12)
+    return timezone.make_aware(datetime(annee, index + 1, 1))
+
+
+def nom_partition(debut, table=None):
+    return f"{table or Alerte._meta.db_table}_p{debut:%Y_%m}"
+
+
+def mois_couverts(premier, dernier):
+    """Débuts de mois de `premier` à `dernier` inclus."""
+    debut = debut_mois(premier)
+    while debut <= dernier:
+        yield debut
+        debut = decaler_mois(debut, 1)
+
+
+def verifier_postgresql():
+    if connection.vendor != 'postgresql':
+        raise NotImplementedError(
+            f"Le partitionnement demande PostgreSQL (base actuelle: {connection.vendor})."
+        )
+
+
+def _litteral(date):
+    # Les bornes de partition ne peuvent pas être des paramètres liés: littéral construit par nous, jamais par l'utilisateur
+    return f"'{date.isoformat()}'::timestamptz"
+
+
+def est_partitionnee():
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+            "WHERE c.relname = %s AND pg_table_is_visible(c.oid))",
+            [Alerte._meta.db_table],
+        )
+        return cursor.fetchone()[0]
+
+
+def partitions():
+    """[(nom, début, fin)] des partitions mensuelles, triées (la partition par défaut est exclue)."""
+    table = Alerte._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = %s::regclass ORDER BY c.relname",
+            [connection.ops.quote_name(table)],
+        )
+        noms = [nom for (nom,) in cursor.fetchall()]
+    resultat = []
+    for nom in noms:
+        if nom == f"{table}_{SUFFIXE_DEFAUT}":
+            continue
+        debut = timezone.make_aware(datetime.strptime(nom.rsplit('_p', 1)[-1], '%Y_%m'))
+        resultat.append((nom, debut, decaler_mois(debut, 1)))
+    return resultat
+
+
+def partitions_detachees():
+    """Partitions mensuelles détachées mais pas encore archivées (archivage interrompu), triées."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname FROM pg_class c WHERE c.relkind = 'r' AND c.relname ~ %s "
+            "AND pg_table_is_visible(c.oid) AND NOT c.relispartition ORDER BY c.relname",
+            [f"^{Alerte._meta.db_table}_p[0-9]{{4}}_[0-9]{{2}}$"],
+        )
+        return [nom for (nom,) in cursor.fetchall()]
+
+
+def _creer_index_et_cles():
+    """Index (partitionnés: chaque partition a le sien) et clés étrangères du modèle Alerte."""
+    table = Alerte._meta.db_table
+    qn = connection.ops.quote_name
+    with connection.schema_editor(atomic=False) as editor:
+        for index in Alerte._meta.indexes:
+            editor.add_index(Alerte, index)
+        for champ in ('employee', 'modeleIA'):
+            field = Alerte._meta.get_field(champ)
+            cible = field.remote_field.model._meta
+            editor.execute(
+                f"ALTER TABLE {qn(table)} ADD CONSTRAINT {qn(f'{table}_{field.column}_fk')} "
+                f"FOREIGN KEY ({qn(field.column)}) REFERENCES {qn(cible.db_table)} ({qn(cible.pk.column)}) "
+                f"DEFERRABLE INITIALLY DEFERRED"
+            )
+
+
+def convertir(mois_avance):
+    """Transforme la table `alertes` existante en table partitionnée par mois (données copiées)."""
+    verifier_postgresql()
+    table = Alerte._meta.db_table
+    ancienne = f"{table}_avant_partitionnement"
+    qn = connection.ops.quote_name
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f"LOCK TABLE {qn(table)} IN ACCESS EXCLUSIVE MODE")
+        # Clés étrangères différées encore à vérifier sur l'ancienne table: elles bloqueraient le DROP final
+        cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+        cursor.execute(f"SELECT MIN(created_at), MAX(created_at) FROM {qn(table)}")
+        premier, dernier = cursor.fetchone()
+        maintenant = timezone.now()
+
+        cursor.execute(f"ALTER TABLE {qn(table)} RENAME TO {qn(ancienne)}")
+        # Les noms d'index sont uniques par schéma: on libère ceux du modèle avant de les recréer
+        for index in Alerte._meta.indexes:
+            cursor.execute(f"ALTER INDEX IF EXISTS {qn(index.name)} RENAME TO {qn(index.name[:50] + '_avant')}")
+        cursor.execute(
+            f"CREATE TABLE {qn(table)} (LIKE {qn(ancienne)} INCLUDING DEFAULTS INCLUDING IDENTITY "
+            f"INCLUDING CONSTRAINTS INCLUDING STORAGE) PARTITION BY RANGE (created_at)"
+        )
+        # La clé primaire d'une table partitionnée doit contenir la clé de partition
+        cursor.execute(f"ALTER TABLE {qn(table)} ADD PRIMARY KEY (id, created_at)")
+        cursor.execute(
+            f"CREATE TABLE {qn(table + '_' + SUFFIXE_DEFAUT)} PARTITION OF {qn(table)} DEFAULT"
+        )
+        for debut in mois_couverts(premier or maintenant, decaler_mois(debut_mois(maintenant), mois_avance)):
+            creer_partition(debut)
+        _creer_index_et_cles()
+
+        cursor.execute(f"INSERT INTO {qn(table)} SELECT * FROM {qn(ancienne)}")
+        # Après la copie: les lignes gardent leur position dans le flux de changements
+        creer_declencheurs(connection, [table])
+        cursor.execute(
+            f"SELECT setval(pg_get_serial_sequence(%s, 'id'), COALESCE((SELECT MAX(id) FROM {qn(table)}), 1))",
+            [table],
+        )
+        cursor.execute(f"DROP TABLE {qn(ancienne)}")
+
+
+def creer_partition(debut):
+    """Crée la partition du mois `debut` si elle n'existe pas; les lignes déjà rangées dans la partition
+    par défaut pour ce mois y sont déplacées. Retourne le nom de la partition créée, ou None."""
+    table = Alerte._meta.db_table
+    nom = nom_partition(debut)
+    fin = decaler_mois(debut, 1)
+    qn = connection.ops.quote_name
+
+    with transaction.atomic(), connection.cursor() as curseur:
+        curseur.execute("SELECT to_regclass(%s)", [nom])
+        if curseur.fetchone()[0] is not None:
+            return None
+        bornes = f"created_at >= {_litteral(debut)} AND created_at < {_litteral(fin)}"
+        curseur.execute(f"CREATE TABLE {qn(nom)} (LIKE {qn(table)} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)")
+        curseur.execute(
+            f"WITH deplacees AS (DELETE FROM {qn(table + '_' + SUFFIXE_DEFAUT)} WHERE {bornes} RETURNING *) "
+            f"INSERT INTO {qn(nom)} SELECT * FROM deplacees"
+        )
+        curseur.execute(
+            f"ALTER TABLE {qn(table)} ATTACH PARTITION {qn(nom)} "
+            f"FOR VALUES FROM ({_litteral(debut)}) TO ({_litteral(fin)})"
+        )
+    return nom
+
+
+def creer_partitions_futures(mois_avance):
+    verifier_postgresql()
+    debut = debut_mois(timezone.now())
+    return [nom for nom in (creer_partition(decaler_mois(debut, i)) for i in range(mois_avance + 1)) if nom]
+
+
+def _copier_vers_gzip(requete, chemin):
+    """COPY (requete) TO STDOUT en CSV, compressé à la volée dans `chemin` (psycopg 2 ou 3)."""
+    from django.db.backends.postgresql.psycopg_any import is_psycopg3
+
+    sql = f"COPY ({requete}) TO STDOUT WITH (FORMAT csv, HEADER)"
+    with gzip.open(chemin, 'wb') as sortie, connection.cursor() as cursor:
+        if is_psycopg3:
+            with cursor.cursor.copy(sql) as copie:
+                for bloc in copie:
+                    sortie.write(bloc)
+        else:
+            cursor.cursor.copy_expert(sql, sortie)
+
+
+def detacher_partition(nom):
+    """Détache la partition `nom` dans une transaction courte, validée avant l'archivage: le verrou exclusif
+    sur `alertes` n'est tenu que le temps du DETACH. (DETACH ... CONCURRENTLY est refusé par PostgreSQL
+    quand la table a une partition par défaut.)"""
+    verifier_postgresql()
+    qn = connection.ops.quote_name
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f"ALTER TABLE {qn(Alerte._meta.db_table)} DETACH PARTITION {qn(nom)}")
+
+
+def archiver_partition(nom, dossier):
+    """Archive la partition `nom` (détachée d'abord si besoin) dans `dossier`: lignes, historique et images
+    (CSV gzip et tar.gz). Puis libère les images et supprime la table. Retourne les fichiers écrits.
+    Les lignes ne sont plus visibles dans `alertes` dès le détachement; l'archivage lit une table que
+    personne d'autre n'utilise, sans verrou sur `alertes`."""
+    verifier_postgresql()
+    historique = HistoriqueStatutAlerte._meta.db_table
+    qn = connection.ops.quote_name
+    if nom not in partitions_detachees():
+        detacher_partition(nom)
+    os.makedirs(dossier, exist_ok=True)
+    fichiers = [os.path.join(dossier, f"{nom}.csv.gz"), os.path.join(dossier, f"{nom}_historique.csv.gz"),
+                os.path.join(dossier, f"{nom}_images.tar.gz")]
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT image, miniature, COUNT(*) FROM {qn(nom)} GROUP BY image, miniature")
+        images, miniatures = Counter(), defaultdict(set)
+        for image, miniature, nombre in cursor.fetchall():
+            images[image] += nombre
+            if miniature:
+                miniatures[image].add(miniature)
+
+    _copier_vers_gzip(f"SELECT * FROM {qn(nom)} ORDER BY created_at, id", fichiers[0])
+    _copier_vers_gzip(
+        f"SELECT * FROM {qn(historique)} WHERE alerte_id IN (SELECT id FROM {qn(nom)}) ORDER BY id", fichiers[1],
+    )
+
+    stockage = stockage_images()
+    with tarfile.open(fichiers[2], 'w:gz') as archive:
+        for image in sorted(images):
+            if image and stockage.exists(image):
+                archive.add(stockage.path(image), arcname=image)
+
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {qn(historique)} WHERE alerte_id IN (SELECT id FROM {qn(nom)})")
+            cursor.execute(f"DROP TABLE {qn(nom)}")
+
+        # Images stockées par contenu: références décrémentées (fichier et miniature supprimés s'ils ne sont
+        # plus utilisés). Anciens chemins: image et miniatures supprimées si aucune alerte restante ne les utilise.
+        ajuster_references({image: -nombre for image, nombre in images.items()})
+        encore_utilisees = set(Alerte.objects.filter(image__in=list(images)).values_list('image', flat=True))
+        anciennes = {image: miniatures[image] | {nom_miniature(image)} for image in images
+                     if image and not image.startswith(stockage.dossier + '/') and image not in encore_utilisees}
+        stockage_miniatures = Alerte._meta.get_field('miniature').storage
+
+        def supprimer_fichiers():
+            for image, noms in anciennes.items():
+                stockage.delete(image)
+                for miniature in noms:
+                    stockage_miniatures.delete(miniature)
+        transaction.on_commit(supprimer_fichiers)
+    return fichiers
+
+
+def partitions_expirees(retention_mois):
+    """Partitions dont tout le mois est plus ancien que `retention_mois` mois complets."""
+    limite = decaler_mois(debut_mois(timezone.now()), -retention_mois)
+    return [nom for nom, _, fin in partitions() if fin <= limite]
@@ -0,0 +1,60 @@
+# position_flux.py
+
+#Position des lignes dans le flux de changements (changements.py), dans l'ordre de validation des transactions.
+#PostgreSQL: un déclencheur écrit txid_current() (id de la transaction, 64 bits, croissant) dans position_flux à
+#chaque INSERT/UPDATE. Le flux ne lit que les positions inférieures à la plus ancienne transaction encore en
+#cours (changements.avant_horizon): une transaction qui valide plus tard a une position au moins égale, rien n'est
+#sauté derrière un curseur, quelle que soit la durée des transactions. Une transaction longue (ou restée
+#ouverte) retarde le flux jusqu'à sa fin.
+#SQLite (tests, développement): un seul écrivain à la fois; le déclencheur prend la valeur suivante d'un
+#compteur global, déjà dans l'ordre de validation. Une migration qui reconstruit une de ces tables sous SQLite
+#(AlterField...) perd ses déclencheurs: la faire suivre de creer_declencheurs.
+#Sans import des modèles: utilisé par les migrations et par partitions.convertir.
+
+TABLES = ('alertes', 'employes', 'suppressions')
+COMPTEUR_SQLITE = 'position_flux_compteur'
+
+
+def creer_declencheurs(connection, tables=TABLES):
+    qn = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(
+                "CREATE OR REPLACE FUNCTION position_flux() RETURNS trigger AS $$ "
+                "BEGIN NEW.position_flux := txid_current(); RETURN NEW; END $$ LANGUAGE plpgsql"
+            )
+            for table in tables:
+                # Déclencheur d'une table partitionnée: recopié sur chaque partition, présente et future
+                cursor.execute(
+                    f"CREATE TRIGGER {qn(f'{table}_position_flux')} BEFORE INSERT OR UPDATE ON {qn(table)} "
+                    f"FOR EACH ROW EXECUTE FUNCTION position_flux()"
+                )
+            return
+
+        cursor.execute(f"CREATE TABLE IF NOT EXISTS {qn(COMPTEUR_SQLITE)} (valeur integer NOT NULL)")
+        cursor.execute(f"INSERT INTO {qn(COMPTEUR_SQLITE)} SELECT 0 WHERE NOT EXISTS (SELECT 1 FROM {qn(COMPTEUR_SQLITE)})")
+        for table in tables:
+            # AFTER: l'UPDATE du déclencheur ne le relance pas (recursive_triggers désactivé par défaut)
+            for evenement in ('INSERT', 'UPDATE'):
+                cursor.execute(
+                    f"CREATE TRIGGER {qn(f'{table}_position_flux_{evenement.lower()}')} AFTER {evenement} ON {qn(table)} "
+                    f"BEGIN "
+                    f"UPDATE {qn(COMPTEUR_SQLITE)} SET valeur = valeur + 1; "
+                    f"UPDATE {qn(table)} SET position_flux = (SELECT valeur FROM {qn(COMPTEUR_SQLITE)}) WHERE id = NEW.id; "
+                    f"END"
+                )
+
+
+def supprimer_declencheurs(connection, tables=TABLES):
+    qn = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            for table in tables:
+                cursor.execute(f"DROP TRIGGER IF EXISTS {qn(f'{table}_position_flux')} ON {qn(table)}")
+            cursor.execute("DROP FUNCTION IF EXISTS position_flux()")
+            return
+
+        for table in tables:
+            for evenement in ('insert', 'update'):
+                cursor.execute(f"DROP TRIGGER IF EXISTS {qn(f'{table}_position_flux_{evenement}')}")
+        cursor.execute(f"DROP TABLE IF EXISTS {qn(COMPTEUR_SQLITE)}")
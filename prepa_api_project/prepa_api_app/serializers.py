@@ -7,3 +7,90 @@ from rest_framework import serializers
 
 from decimal import Decimal
 
+from .miniatures import url_apercu
+from .models import Alerte, Employe, HistoriqueStatutAlerte
+from .stockage import stockage_images
+
+
+#Ce serializer valide UNE détection envoyée par une caméra (utilisé en lot par l'endpoint d'ingestion).
+#Les clés étrangères sont de simples entiers: elles sont résolues en lot (in_bulk) par le service
+#d'ingestion, pour ne pas faire une requête par détection.
+class DetectionSerializer(serializers.Serializer):
+    employee = serializers.IntegerField(min_value=1)
+    modeleIA = serializers.IntegerField(min_value=1, required=False)  # Par défaut: le modèle IA actif
+    typeEpiManquants = serializers.ListField(child=serializers.CharField(max_length=100), allow_empty=False)
+    niveau = serializers.ChoiceField(choices=Alerte.NIVEAU_CHOICES, default='MOYEN')
+    image = serializers.CharField(max_length=100)  # Chemin de l'image déjà déposée dans MEDIA_ROOT
+    commentaire = serializers.CharField(required=False, allow_blank=True, default='')
+
+    def validate_image(self, value):
+        # Chemin relatif au stockage des images, sans remontée: servi et supprimé plus tard sous ce nom
+        parties = value.replace('\\', '/').split('/')
+        if value.startswith(('/', '\\')) or ':' in parties[0] or '..' in parties or not parties[-1]:
+            raise serializers.ValidationError("Chemin d'image relatif attendu, sans '..'.")
+        if not stockage_images().exists(value):
+            raise serializers.ValidationError("Image introuvable dans le stockage.")
+        return value
+
+    def validate_typeEpiManquants(self, value):
+        epis = ', '.join(epi.strip() for epi in value if epi.strip())
+        if not epis:
+            raise serializers.ValidationError("Au moins un EPI manquant est requis.")
+        if len(epis) > Alerte._meta.get_field('typeEpiManquants').max_length:
+            raise serializers.ValidationError("Liste d'EPI manquants trop longue.")
+        return epis
+
+
+#Ce serializer sert à la lecture des alertes (liste paginée du tableau de bord React).
+#Les champs de l'employé et du modèle IA viennent du select_related de la view: aucune requête par alerte.
+class AlerteSerializer(serializers.ModelSerializer):
+    employe_nom = serializers.CharField(source='employee.name', read_only=True)
+    employe_prenom = serializers.CharField(source='employee.surname', read_only=True)
+    department = serializers.CharField(source='employee.department', read_only=True)
+    modele_nom = serializers.CharField(source='modeleIA.name', read_only=True)
+    modele_version = serializers.CharField(source='modeleIA.version', read_only=True)
+    miniature = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Alerte
+        fields = [
+            'id', 'employee', 'employe_nom', 'employe_prenom', 'department',
+            'modeleIA', 'modele_nom', 'modele_version',
+            'typeEpiManquants', 'image', 'miniature', 'statut', 'niveau', 'commentaire', 'created_at', 'updated_at',
+            'pris_en_charge_at', 'traite_at',
+        ]
+        read_only_fields = fields
+
+    def get_miniature(self, obj):
+        url = url_apercu(obj)
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if url and request else url
+
+
+#Ce serializer sert au flux de changements des employés (synchronisation des systèmes RH / BI).
+class EmployeSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Employe
+        fields = ['id', 'name', 'surname', 'poste', 'department', 'status', 'created_at', 'updated_at']
+        read_only_fields = fields
+
+
+#Ce serializer valide une transition en lot: {"ids": [...], "statut": "RESOLU"} et/ou "niveau".
+class TransitionSerializer(serializers.Serializer):
+    ids = serializers.ListField(child=serializers.IntegerField(min_value=1), allow_empty=False)
+    statut = serializers.ChoiceField(choices=Alerte.STATUT_CHOICES, required=False)
+    niveau = serializers.ChoiceField(choices=Alerte.NIVEAU_CHOICES, required=False)
+
+    def validate(self, attrs):
+        if 'statut' not in attrs and 'niveau' not in attrs:
+            raise serializers.ValidationError("Un statut ou un niveau est requis.")
+        return attrs
+
+
+class HistoriqueStatutSerializer(serializers.ModelSerializer):
+    utilisateur = serializers.CharField(source='utilisateur.username', read_only=True, default=None)
+
+    class Meta:
+        model = HistoriqueStatutAlerte
+        fields = ['id', 'utilisateur', 'statut_avant', 'statut_apres', 'niveau_avant', 'niveau_apres', 'created_at']
+        read_only_fields = fields
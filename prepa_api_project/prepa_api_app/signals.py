@@ -0,0 +1,234 @@
+# signals.py
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .annuaire import fiche_employe, get_annuaire
+from .cache import invalider_panneaux
+from .delais import appliquer_delais, deplacer_delais, horodater, variation
+from .epi import masque_pour, vider_cache
+from .miniatures import nom_miniature, planifier_miniatures
+from .modeles_actifs import invalider_modeles
+from .stockage import ajuster_references
+from .temps_reel import publier_alertes
+from .models import Alerte, Employe, ModeleIA, TypeEpi
+from .statistiques import appliquer_deltas, cle_statistique
+from .suppressions import suppression_en_lot
+
+CHAMPS_STATISTIQUE = {'created_at', 'employee_id', 'modeleIA_id', 'statut', 'niveau'}
+CHAMPS_DELAIS = ('modeleIA_id', 'niveau', 'created_at', 'pris_en_charge_at', 'traite_at')
+
+
+#Les masques d'EPI suivent le texte saisi (admin, API, shell); l'ingestion en lot les calcule elle-même.
+#Les types d'EPI d'un modèle IA complètent le catalogue; ceux d'une alerte inconnus du catalogue sont ignorés.
+@receiver(pre_save, sender=Alerte)
+def masque_epi_alerte(sender, instance, raw=False, **kwargs):
+    if not raw:
+        instance.epiManquantsMasque = masque_pour(instance.typeEpiManquants)
+
+
+@receiver(pre_save, sender=ModeleIA)
+def masque_epi_modele(sender, instance, raw=False, **kwargs):
+    if not raw:
+        instance.typesEpiMasque = masque_pour(instance.typesEpi, creer=True)
+
+
+@receiver(post_save, sender=TypeEpi)
+@receiver(post_delete, sender=TypeEpi)
+def types_epi_modifies(sender, **kwargs):
+    vider_cache()
+
+
+#Annuaire des employés en mémoire: ce processus voit ses propres modifications dès le commit.
+#Les panneaux et tendances (regroupées par département/poste) de l'employé changent de version.
+@receiver(post_save, sender=Employe)
+def employe_enregistre(sender, instance, raw=False, **kwargs):
+    if not raw:
+        fiche = fiche_employe(instance)
+
+        def appliquer():
+            get_annuaire().enregistrer(fiche)
+            invalider_panneaux(employes=[fiche.id])
+        transaction.on_commit(appliquer)
+
+
+@receiver(post_delete, sender=Employe)
+def employe_supprime(sender, instance, **kwargs):
+    with suppression_en_lot() as lot:
+        lot.suppressions.append(('employe', instance.pk))  # Flux de changements (changements.py)
+        lot.employes.append(instance.pk)
+        lot.departements[instance.pk] = instance.department  # Délais de ses alertes, supprimées avec lui
+
+
+#Changement de département: les échantillons des histogrammes de délais de ses alertes changent de groupe.
+@receiver(pre_save, sender=Employe)
+def departement_avant(sender, instance, raw=False, update_fields=None, **kwargs):
+    instance._departement_avant = None
+    if not raw and not instance._state.adding and (update_fields is None or 'department' in update_fields):
+        instance._departement_avant = Employe.objects.filter(pk=instance.pk).values_list('department', flat=True).first()
+
+
+@receiver(post_save, sender=Employe)
+def delais_employe_enregistre(sender, instance, raw=False, **kwargs):
+    avant = instance.__dict__.pop('_departement_avant', None)
+    if not raw and avant is not None and avant != instance.department:
+        deplacer_delais(instance.pk, avant, instance.department)
+
+
+#Cache des modèles IA de l'ingestion: nouvelle version une fois la transaction validée (un autre processus
+#qui rechargerait avant le commit garderait sinon l'ancien état sous la nouvelle version).
+@receiver(post_save, sender=ModeleIA)
+@receiver(post_delete, sender=ModeleIA)
+def modeles_ia_modifies(sender, raw=False, **kwargs):
+    if not raw:
+        transaction.on_commit(invalider_modeles)
+
+
+#Clé statistique d'une alerte telle que lue en base (Alerte._initial), pour savoir quel compteur décrémenter.
+def cle_initiale(instance):
+    valeurs = instance._initial
+    if not CHAMPS_STATISTIQUE <= valeurs.keys():
+        return None  # Alerte pas encore lue en base, ou instance partielle
+    return (
+        timezone.localdate(valeurs['created_at']),
+        valeurs['employee_id'],
+        valeurs['modeleIA_id'],
+        valeurs['statut'],
+        valeurs['niveau'],
+    )
+
+
+#Horodatage des transitions de statut faites par save() (admin, shell); changer_statut() fait de même en lot.
+@receiver(pre_save, sender=Alerte)
+def horodatage_alerte(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    if instance._state.adding:
+        statut_avant = 'NOUVEAU'
+    elif 'statut' in instance._initial:
+        statut_avant = instance._initial['statut']
+    else:
+        return  # Instance partielle: statut d'origine inconnu
+    if instance.statut == statut_avant and not instance._state.adding:
+        return
+
+    instance.pris_en_charge_at, instance.traite_at = horodater(
+        statut_avant, instance.statut, instance.pris_en_charge_at, instance.traite_at, timezone.now()
+    )
+
+
+def etat_delais(valeurs, department):
+    """Arguments de delais.echantillons() pour les valeurs CHAMPS_DELAIS d'une alerte."""
+    return (valeurs['modeleIA_id'], department, valeurs['niveau'], *(valeurs[champ] for champ in CHAMPS_DELAIS[2:]))
+
+
+#Histogrammes de délais (delais.py): les échantillons de l'état lu en base (Alerte._initial) sont retirés,
+#ceux du nouvel état ajoutés. Instance partielle: les champs non lus sont supposés inchangés.
+@receiver(post_save, sender=Alerte)
+def delais_alerte_enregistree(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    apres = {champ: getattr(instance, champ) for champ in CHAMPS_DELAIS}
+    avant = None if created else {champ: instance._initial.get(champ, valeur) for champ, valeur in apres.items()}
+    employe_avant = instance._initial.get('employee_id', instance.employee_id)
+    if apres['pris_en_charge_at'] is None and (avant is None or avant['pris_en_charge_at'] is None):
+        return  # Aucun échantillon, ni avant ni après
+    if avant == apres and employe_avant == instance.employee_id:
+        return
+
+    department = instance.employee.department
+    department_avant = department
+    if avant is not None and employe_avant != instance.employee_id:
+        department_avant = Employe.objects.filter(pk=employe_avant).values_list('department', flat=True).first()
+    appliquer_delais(variation(avant and etat_delais(avant, department_avant), etat_delais(apres, department)))
+
+
+@receiver(post_save, sender=Alerte)
+def statistiques_alerte_enregistree(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+
+    nouvelle = cle_statistique(instance)
+    deltas = Counter({nouvelle: 1})
+    if not created:
+        # Instance partielle (.only()/.defer()): l'état d'origine est inconnu, on suppose la clé inchangée
+        # (`reconstruire_statistiques` corrige au besoin).
+        deltas[cle_initiale(instance) or nouvelle] -= 1
+    appliquer_deltas(deltas)
+
+
+#Références des images stockées par contenu: +1 à la création, -1/+1 si l'image change, -1 à la suppression.
+@receiver(post_save, sender=Alerte)
+def references_image_enregistree(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    nouvelle = instance.image.name
+    ancienne = None if created else instance._initial.get('image')
+    deltas = Counter()
+    if created or (ancienne is not None and ancienne != nouvelle):
+        deltas[nouvelle] += 1
+        if ancienne:
+            deltas[ancienne] -= 1
+    # Référence déjà prise à l'enregistrement du fichier (ImageAlerteFieldFile, stockage.py)
+    prise = instance.__dict__.pop('_reference_image', None)
+    if prise:
+        deltas[prise] -= 1
+    if any(deltas.values()):
+        ajuster_references(deltas)
+
+
+@receiver(post_delete, sender=Alerte)
+def references_image_supprimee(sender, instance, **kwargs):
+    with suppression_en_lot() as lot:
+        lot.images[instance.image.name] -= 1
+
+
+@receiver(post_save, sender=Alerte)
+def alerte_publiee(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        publier_alertes([instance.pk], 'creation' if created else 'modification')
+
+
+@receiver(post_save, sender=Alerte)
+def miniature_alerte_enregistree(sender, instance, raw=False, **kwargs):
+    # Nouvelle alerte ou image remplacée: la miniature ne correspond plus à l'original
+    if not raw and instance.image and instance.miniature.name != nom_miniature(instance.image.name):
+        planifier_miniatures([instance.pk])
+
+
+#Suppressions: les effets s'ajoutent au lot du delete() (suppressions.py), écrit en quelques requêtes groupées.
+@receiver(post_delete, sender=Alerte)
+def statistiques_alerte_supprimee(sender, instance, origin=None, **kwargs):
+    # Suppression en cascade d'un employé ou d'un modèle IA: ses compteurs sont déjà supprimés avec lui,
+    # un upsert les recréerait sur une clé étrangère disparue
+    origine = origin.model if isinstance(origin, QuerySet) else type(origin)
+    with suppression_en_lot() as lot:
+        if origine is ModeleIA:
+            lot.panneaux.add(instance.employee_id)
+            return
+        cle = cle_initiale(instance) or cle_statistique(instance)
+        (lot.statistiques_modele if origine is Employe else lot.statistiques)[cle] -= 1
+
+
+@receiver(post_delete, sender=Alerte)
+def delais_alerte_supprimee(sender, instance, origin=None, **kwargs):
+    valeurs = {champ: instance._initial.get(champ, getattr(instance, champ)) for champ in CHAMPS_DELAIS}
+    origine = origin.model if isinstance(origin, QuerySet) else type(origin)
+    if valeurs['pris_en_charge_at'] is None or origine is ModeleIA:
+        return  # Aucun échantillon, ou histogrammes du modèle IA supprimés en cascade avec lui
+    with suppression_en_lot() as lot:
+        lot.delais.append((
+            instance._initial.get('employee_id', instance.employee_id), valeurs['modeleIA_id'], valeurs['niveau'],
+            *(valeurs[champ] for champ in CHAMPS_DELAIS[2:]),
+        ))
+
+
+#Flux de changements (changements.py): la suppression est écrite dans la même transaction que le DELETE.
+@receiver(post_delete, sender=Alerte)
+def alerte_supprimee(sender, instance, **kwargs):
+    with suppression_en_lot() as lot:
+        lot.suppressions.append(('alerte', instance.pk))
@@ -0,0 +1,237 @@
+# statistiques.py
+from collections import Counter, defaultdict
+
+from django.db import connection, transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .cache import invalider_panneaux
+from .models import Alerte, MetriquesEmployeModele, MetriquesModeleIA, ModeleIA, StatistiqueAlerteJournaliere
+
+# Lignes par INSERT ... ON CONFLICT (reste sous la limite de paramètres de SQLite)
+TAILLE_LOT_UPSERT = 500
+
+
+#Maintenance incrémentale de la table StatistiqueAlerteJournaliere.
+#Une "clé" est le tuple (jour, employee_id, modeleIA_id, statut, niveau); le jour est la date locale
+#(TIME_ZONE) de created_at, comme pour les filtres created_at__date de l'admin.
+
+def cle_statistique(alerte):
+    return (
+        timezone.localdate(alerte.created_at),
+        alerte.employee_id,
+        alerte.modeleIA_id,
+        alerte.statut,
+        alerte.niveau,
+    )
+
+
+def champ_statut(statut):
+    return f'statut_{statut.lower()}'
+
+
+def champ_niveau(niveau):
+    return f'niveau_{niveau.lower()}'
+
+
+CHAMPS_METRIQUES = ['total'] + [champ_statut(s) for s, _ in Alerte.STATUT_CHOICES] + [
+    champ_niveau(n) for n, _ in Alerte.NIVEAU_CHOICES
+]
+
+
+def incrementer(model, cles, valeurs, lignes):
+    """INSERT ... ON CONFLICT (cles) DO UPDATE SET v = v + EXCLUDED.v, par lots.
+
+    `lignes` contient les valeurs des champs `cles` puis celles des champs `valeurs` (des incréments).
+    Les lignes sont écrites triées par clé: deux transactions qui touchent les mêmes compteurs prennent
+    leurs verrous dans le même ordre (pas d'interblocage).
+    """
+    if not lignes:
+        return
+    lignes = sorted(lignes, key=lambda ligne: [(valeur is None, valeur) for valeur in ligne[:len(cles)]])
+    qn = connection.ops.quote_name
+    table = qn(model._meta.db_table)
+    colonnes_cles = [qn(model._meta.get_field(nom).column) for nom in cles]
+    colonnes_valeurs = [qn(model._meta.get_field(nom).column) for nom in valeurs]
+    ligne_sql = f"({', '.join(['%s'] * (len(cles) + len(valeurs)))})"
+    increments = ', '.join(f"{colonne} = {table}.{colonne} + EXCLUDED.{colonne}" for colonne in colonnes_valeurs)
+
+    with connection.cursor() as cursor:
+        for i in range(0, len(lignes), TAILLE_LOT_UPSERT):
+            lot = lignes[i:i + TAILLE_LOT_UPSERT]
+            cursor.execute(
+                f"INSERT INTO {table} ({', '.join(colonnes_cles + colonnes_valeurs)}) "
+                f"VALUES {', '.join([ligne_sql] * len(lot))} "
+                f"ON CONFLICT ({', '.join(colonnes_cles)}) DO UPDATE SET {increments}",
+                [valeur for ligne in lot for valeur in ligne],
+            )
+
+
+def appliquer_deltas(deltas, par_employe=True):
+    """Ajoute les deltas {clé: +/-n} aux compteurs journaliers et aux métriques des modèles
+    (un INSERT ... ON CONFLICT par table et par lot de clés).
+
+    Toutes les modifications d'alertes passent par ici (signaux, actions en lot, ingestion): les panneaux
+    en cache des employés et modèles touchés sont invalidés, même pour un delta nul (ex. commentaire modifié).
+    par_employe=False laisse les compteurs par employé (supprimés en cascade avec l'employé).
+    """
+    invalider_panneaux(
+        employes=(employe for _, employe, _, _, _ in deltas),
+        modeles=(modele for _, _, modele, _, _ in deltas),
+    )
+
+    par_modele = defaultdict(Counter)
+    par_employe_modele = Counter()
+    lignes = []
+    for (jour, employe, modele, statut, niveau), delta in deltas.items():
+        if not delta:
+            continue
+        lignes.append((jour, employe, modele, statut, niveau, delta))
+        compteurs = par_modele[modele]
+        compteurs['total'] += delta
+        compteurs[champ_statut(statut)] += delta
+        compteurs[champ_niveau(niveau)] += delta
+        par_employe_modele[(modele, employe)] += delta
+
+    if not par_employe:
+        lignes, par_employe_modele = [], {}
+    incrementer(StatistiqueAlerteJournaliere, ['jour', 'employee', 'modeleIA', 'statut', 'niveau'], ['total'], lignes)
+    incrementer(
+        MetriquesModeleIA, ['modeleIA'], CHAMPS_METRIQUES,
+        [(modele, *(compteurs[champ] for champ in CHAMPS_METRIQUES)) for modele, compteurs in par_modele.items()
+         if any(compteurs.values())],
+    )
+    incrementer(
+        MetriquesEmployeModele, ['modeleIA', 'employee'], ['total'],
+        [(modele, employe, delta) for (modele, employe), delta in par_employe_modele.items() if delta],
+    )
+
+
+def enregistrer_creations(alertes):
+    """Compte des alertes qui viennent d'être créées (ex. après un bulk_create)."""
+    appliquer_deltas(Counter(cle_statistique(alerte) for alerte in alertes))
+
+
+def mettre_a_jour_en_lot(queryset, **changements):
+    """queryset.update(**changements) (statut et/ou niveau) en gardant les statistiques à jour.
+
+    Passe par transitions.changer_statut: historique, horodatage des transitions et compteurs compris.
+    Retourne le nombre d'alertes modifiées.
+    """
+    from .transitions import changer_statut  # transitions importe ce module
+
+    return len(changer_statut(queryset, statut=changements.get('statut'), niveau=changements.get('niveau')))
+
+
+def reconstruire(depuis=None):
+    """Recalcule les statistiques depuis la table des alertes (toutes, ou à partir du jour `depuis`)."""
+    alertes = Alerte.objects.all()
+    statistiques = StatistiqueAlerteJournaliere.objects.all()
+    if depuis is not None:
+        alertes = alertes.filter(created_at__date__gte=depuis)
+        statistiques = statistiques.filter(jour__gte=depuis)
+
+    groupes = (
+        alertes.annotate(jour=TruncDate('created_at'))
+        .values_list('jour', 'employee_id', 'modeleIA_id', 'statut', 'niveau')
+        .annotate(nombre=Count('id'))
+        .order_by()
+    )
+    with transaction.atomic():
+        statistiques.delete()
+        lignes = StatistiqueAlerteJournaliere.objects.bulk_create(
+            (
+                StatistiqueAlerteJournaliere(
+                    jour=jour, employee_id=employe, modeleIA_id=modele, statut=statut, niveau=niveau, total=nombre
+                )
+                for jour, employe, modele, statut, niveau, nombre in groupes.iterator(chunk_size=TAILLE_LOT_UPSERT)
+            ),
+            batch_size=TAILLE_LOT_UPSERT,
+        )
+        reconstruire_metriques()
+    return len(lignes)
+
+
+def reconstruire_metriques():
+    """Recalcule les métriques des modèles depuis les statistiques journalières (déjà agrégées: rapide)."""
+    sommes = {'somme': Sum('total')}
+    for statut, _ in Alerte.STATUT_CHOICES:
+        sommes[champ_statut(statut)] = Sum('total', filter=Q(statut=statut))
+    for niveau, _ in Alerte.NIVEAU_CHOICES:
+        sommes[champ_niveau(niveau)] = Sum('total', filter=Q(niveau=niveau))
+
+    par_modele = StatistiqueAlerteJournaliere.objects.values('modeleIA_id').annotate(**sommes).order_by()
+    par_employe = (
+        StatistiqueAlerteJournaliere.objects.values('modeleIA_id', 'employee_id')
+        .annotate(somme=Sum('total')).filter(somme__gt=0).order_by()
+    )
+    with transaction.atomic():
+        MetriquesModeleIA.objects.all().delete()
+        MetriquesEmployeModele.objects.all().delete()
+        MetriquesModeleIA.objects.bulk_create(
+            [
+                MetriquesModeleIA(
+                    modeleIA_id=ligne['modeleIA_id'], total=ligne['somme'] or 0,
+                    **{champ: ligne[champ] or 0 for champ in CHAMPS_METRIQUES[1:]},
+                )
+                for ligne in par_modele
+            ],
+            batch_size=TAILLE_LOT_UPSERT,
+        )
+        MetriquesEmployeModele.objects.bulk_create(
+            (
+                MetriquesEmployeModele(modeleIA_id=ligne['modeleIA_id'], employee_id=ligne['employee_id'], total=ligne['somme'])
+                for ligne in par_employe.iterator(chunk_size=TAILLE_LOT_UPSERT)
+            ),
+            batch_size=TAILLE_LOT_UPSERT,
+        )
+
+
+#Lectures: chaque panneau de l'admin fait une seule requête sur la table agrégée.
+
+def resume(**filtres):
+    """Totaux par statut et par niveau (une requête), ex. resume(employee=employe)."""
+    sommes = {'somme': Sum('total')}
+    for statut, _ in Alerte.STATUT_CHOICES:
+        sommes[f'statut_{statut}'] = Sum('total', filter=Q(statut=statut))
+    for niveau, _ in Alerte.NIVEAU_CHOICES:
+        sommes[f'niveau_{niveau}'] = Sum('total', filter=Q(niveau=niveau))
+
+    valeurs = StatistiqueAlerteJournaliere.objects.filter(**filtres).aggregate(**sommes)
+    return {
+        'total': valeurs['somme'] or 0,
+        'statut': {statut: valeurs[f'statut_{statut}'] or 0 for statut, _ in Alerte.STATUT_CHOICES},
+        'niveau': {niveau: valeurs[f'niveau_{niveau}'] or 0 for niveau, _ in Alerte.NIVEAU_CHOICES},
+    }
+
+
+def totaux_par_periodes(periodes, **filtres):
+    """Total global et total de chaque période [(premier_jour, dernier_jour), ...] en une requête."""
+    sommes = {'somme': Sum('total')}
+    for i, (debut, fin) in enumerate(periodes):
+        sommes[f'periode_{i}'] = Sum('total', filter=Q(jour__gte=debut, jour__lte=fin))
+
+    valeurs = StatistiqueAlerteJournaliere.objects.filter(**filtres).aggregate(**sommes)
+    return valeurs['somme'] or 0, [valeurs[f'periode_{i}'] or 0 for i in range(len(periodes))]
+
+
+def comparer_modeles(ids=None):
+    """Métriques de plusieurs modèles IA côte à côte, en une requête (LEFT JOIN sur la table des métriques)."""
+    modeles = ModeleIA.objects.order_by('name', 'version')
+    if ids is not None:
+        modeles = modeles.filter(pk__in=ids)
+    lignes = modeles.values('id', 'name', 'version', 'active', *(f'metriques__{champ}' for champ in CHAMPS_METRIQUES))
+
+    resultat = []
+    for ligne in lignes:
+        compteurs = {champ: ligne.pop(f'metriques__{champ}') or 0 for champ in CHAMPS_METRIQUES}
+        metriques = MetriquesModeleIA(**compteurs)
+        resultat.append({
+            **ligne,
+            **compteurs,
+            'taux_resolution': metriques.taux_resolution,
+            'taux_faux_positifs': metriques.taux_faux_positifs,
+            'taux_traitement': metriques.taux_traitement,
+        })
+    return resultat
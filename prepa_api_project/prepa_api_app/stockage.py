@@ -0,0 +1,167 @@
+# stockage.py
+import hashlib
+import os
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage, storages
+from django.db import models, transaction
+from django.db.models import F
+from django.db.models.fields.files import ImageFieldFile
+from django.utils import timezone
+from PIL import Image
+
+MASQUE_64_BITS = (1 << 64) - 1
+
+
+#Stockage des images d'alertes par contenu: le nom du fichier est le sha256 de ses octets, une image déjà
+#reçue n'est pas réécrite. ImageBlob compte les alertes qui pointent vers chaque fichier; le fichier (et sa
+#miniature) est supprimé quand la dernière alerte disparaît.
+#La ligne ImageBlob sert de verrou: _save la verrouille, l'alerte y prend sa référence dans la même transaction
+#(ImageAlerteFieldFile), et la suppression (liberer) revérifie le compteur sous ce verrou.
+
+def stockage_images():
+    # Callable pour ImageField(storage=...): le backend se choisit dans settings.STORAGES['images_alertes']
+    return storages['images_alertes']
+
+
+def dhash(image, taille=8):
+    """Hash perceptuel (différences de luminosité entre pixels voisins), 64 bits en entier signé."""
+    gris = image.convert('L').resize((taille + 1, taille), Image.Resampling.BILINEAR)
+    pixels = list(gris.getdata())
+    valeur = 0
+    for ligne in range(taille):
+        for colonne in range(taille):
+            gauche = pixels[ligne * (taille + 1) + colonne]
+            valeur = valeur << 1 | (gauche > pixels[ligne * (taille + 1) + colonne + 1])
+    return valeur - (1 << 64) if valeur >> 63 else valeur  # BigIntegerField est signé
+
+
+def distance_hamming(a, b):
+    return bin((a ^ b) & MASQUE_64_BITS).count('1')
+
+
+class StockageParContenu(FileSystemStorage):
+    def __init__(self, dossier='alertes/cas', **kwargs):
+        super().__init__(**kwargs)
+        self.dossier = dossier
+
+    def nom_pour(self, empreinte, extension):
+        return f"{self.dossier}/{empreinte[:2]}/{empreinte[2:4]}/{empreinte}{extension.lower()}"
+
+    def _save(self, name, content):
+        from .models import ImageBlob
+
+        sha = hashlib.sha256()
+        taille = 0
+        for morceau in content.chunks():
+            sha.update(morceau)
+            taille += len(morceau)
+        content.seek(0)
+        empreinte = sha.hexdigest()
+
+        empreinte_perceptuelle = None
+        if settings.IMAGES_DHASH_DISTANCE:
+            try:
+                with Image.open(content) as image:
+                    empreinte_perceptuelle = dhash(image)
+            except (OSError, ValueError):
+                pass  # Pas une image lisible: seul le sha256 compte
+            content.seek(0)
+
+        nom = self.nom_pour(empreinte, os.path.splitext(name)[1])
+        with transaction.atomic():
+            # Verrou jusqu'à la fin de la transaction englobante. Une suppression en cours (liberer) finit d'abord:
+            # ligne et fichier ont alors disparu, et le fichier est réécrit ici.
+            if not ImageBlob.objects.select_for_update().filter(nom=nom).values_list('pk', flat=True):
+                if not self.exists(nom):
+                    nom = super()._save(nom, content)
+                proche = self.image_proche(empreinte_perceptuelle) if empreinte_perceptuelle is not None else None
+                ImageBlob.objects.get_or_create(nom=nom, defaults={
+                    'empreinte': empreinte, 'taille': taille, 'dhash': empreinte_perceptuelle, 'proche': proche or '',
+                })
+        return nom
+
+    def image_proche(self, empreinte_perceptuelle):
+        """Nom d'une image récente quasi identique, ou None. Seulement noté (ImageBlob.proche): l'image récente
+        peut venir d'un autre employé ou d'une autre caméra, elle ne remplace pas celle reçue."""
+        from .models import ImageBlob
+
+        recentes = (
+            ImageBlob.objects.filter(
+                dhash__isnull=False,
+                created_at__gte=timezone.now() - timedelta(seconds=settings.IMAGES_DHASH_FENETRE),
+            )
+            .order_by('-created_at')
+            .values_list('nom', 'dhash')[:settings.IMAGES_DHASH_CANDIDATS]
+        )
+        for nom, autre in recentes:
+            if distance_hamming(empreinte_perceptuelle, autre) <= settings.IMAGES_DHASH_DISTANCE:
+                return nom
+        return None
+
+
+class ImageAlerteFieldFile(ImageFieldFile):
+    def save(self, name, content, save=True):
+        from .models import ImageBlob
+
+        with transaction.atomic():
+            super().save(name, content, save=False)
+            # Référence prise sous le verrou de _save: l'image ne peut pas être libérée avant l'enregistrement
+            # de l'alerte. Le post_save de l'alerte la décompte (si l'alerte n'est jamais enregistrée, le
+            # fichier est gardé: référence en trop, jamais en moins).
+            if ImageBlob.objects.filter(nom=self.name).update(references=F('references') + 1):
+                self.instance._reference_image = self.name
+        if save:
+            self.instance.save()
+
+
+class ImageAlerteField(models.ImageField):
+    """ImageField des alertes: la référence à l'image stockée par contenu est prise avec le fichier."""
+    attr_class = ImageAlerteFieldFile
+
+
+def ajuster_references(deltas):
+    """Ajoute les deltas {nom de fichier: +/-n} aux compteurs de références (une requête par valeur de delta)
+    et libère les images qui ne sont plus référencées. Les noms sans ImageBlob (anciens chemins) sont ignorés."""
+    from .models import ImageBlob
+
+    par_delta = defaultdict(list)
+    for nom, delta in deltas.items():
+        if nom and delta:
+            par_delta[delta].append(nom)
+    for delta, noms in par_delta.items():
+        ImageBlob.objects.filter(nom__in=noms).update(references=F('references') + delta)
+
+    liberes = [nom for nom, delta in deltas.items() if nom and delta < 0]
+    if liberes:
+        liberer(ImageBlob.objects.filter(nom__in=liberes, references__lte=0))
+
+
+def liberer(blobs):
+    """Libère les ImageBlob donnés après le commit: chaque ligne est verrouillée et revérifiée (references <= 0,
+    une image reprise entre-temps est gardée), puis supprimée avec son fichier et sa miniature.
+    Retourne le nombre d'images candidates."""
+    noms = list(blobs.values_list('nom', flat=True))
+    if noms:
+        transaction.on_commit(lambda: _supprimer_non_referencees(noms))
+    return len(noms)
+
+
+def _supprimer_non_referencees(noms):
+    from .miniatures import nom_miniature
+    from .models import Alerte, ImageBlob
+
+    stockage = stockage_images()
+    stockage_miniatures = Alerte._meta.get_field('miniature').storage
+    with transaction.atomic():
+        # Fichiers supprimés sous le verrou: un _save concurrent attend, puis réécrit le fichier
+        liberes = list(
+            ImageBlob.objects.select_for_update().filter(nom__in=noms, references__lte=0)
+            .order_by('nom').values_list('nom', flat=True)
+        )
+        for nom in liberes:
+            stockage.delete(nom)
+            stockage_miniatures.delete(nom_miniature(nom))
+        ImageBlob.objects.filter(nom__in=liberes).delete()
@@ -0,0 +1,90 @@
+# suppressions.py
+import threading
+from collections import Counter
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import models, transaction
+
+#Suppressions en lot: les receivers post_delete (signals.py) ajoutent leurs effets (compteurs, références
+#d'images, flux de changements, annuaire) au lot en cours au lieu de les écrire ligne par ligne. Le lot est écrit
+#une fois, à la fin du delete(), dans la même transaction: supprimer un employé et ses 100 000 alertes coûte
+#quelques requêtes groupées, pas trois par alerte.
+#delete() des alertes, employés et modèles IA (instance ou queryset, donc aussi l'admin) ouvre un lot; une
+#suppression venue d'ailleurs (cascade depuis un User) écrit ses effets ligne par ligne, comme un lot d'une ligne.
+
+_local = threading.local()
+
+
+class LotSuppression:
+    def __init__(self):
+        self.statistiques = Counter()  # Deltas des compteurs, par_employe=True
+        self.statistiques_modele = Counter()  # Deltas sans les compteurs par employé (cascade d'un employé)
+        self.panneaux = set()  # Employés dont les panneaux changent sans compteur à corriger (cascade d'un modèle)
+        self.images = Counter()
+        self.suppressions = []  # (type, id) pour le flux de changements
+        self.employes = []  # Employés à retirer de l'annuaire après le commit
+        self.delais = []  # Alertes à retirer des histogrammes de délais (delais.retirer_delais)
+        self.departements = {}  # Département des employés supprimés dans le lot
+
+    def ecrire(self):
+        from .annuaire import get_annuaire
+        from .cache import invalider_panneaux
+        from .delais import retirer_delais
+        from .models import Suppression
+        from .statistiques import appliquer_deltas
+        from .stockage import ajuster_references
+
+        if self.statistiques:
+            appliquer_deltas(self.statistiques)
+        if self.statistiques_modele:
+            appliquer_deltas(self.statistiques_modele, par_employe=False)
+        if self.panneaux:
+            invalider_panneaux(employes=self.panneaux)
+        if self.delais:
+            retirer_delais(self.delais, self.departements)
+        if self.images:
+            ajuster_references(self.images)
+        Suppression.objects.bulk_create(
+            [Suppression(type=type, objet_id=pk) for type, pk in self.suppressions],
+            batch_size=settings.ALERTES_INGESTION_TAILLE_LOT,
+        )
+        if self.employes:
+            employes = self.employes
+
+            def appliquer():
+                get_annuaire().oublier(*employes)
+                invalider_panneaux(employes=employes)
+            transaction.on_commit(appliquer)
+
+
+@contextmanager
+def suppression_en_lot():
+    """Lot des effets des suppressions faites dans le bloc, écrit à sa sortie dans la même transaction.
+    Dans un lot déjà ouvert (cascade), rend ce lot: c'est le bloc englobant qui écrit."""
+    lot = getattr(_local, 'lot', None)
+    if lot is not None:
+        yield lot
+        return
+    lot = _local.lot = LotSuppression()
+    try:
+        with transaction.atomic():
+            yield lot
+            _local.lot = None
+            lot.ecrire()
+    finally:
+        _local.lot = None
+
+
+class SuppressionEnLotQuerySet(models.QuerySet):
+    def delete(self):
+        with suppression_en_lot():
+            return super().delete()
+
+
+class SuppressionEnLot:
+    """Mixin de modèle: delete() d'une instance ouvre un lot (voir SuppressionEnLotQuerySet pour les querysets)."""
+
+    def delete(self, *args, **kwargs):
+        with suppression_en_lot():
+            return super().delete(*args, **kwargs)
@@ -0,0 +1,127 @@
+# temps_reel.py
+import asyncio
+import json
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.core.signals import setting_changed
+from django.db import transaction
+from django.db.models import F
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+from .models import Alerte
+
+
+#Diffusion des alertes créées/modifiées aux tableaux de bord connectés (flux SSE, voir async_views.py).
+#Le broker est choisi par settings.TEMPS_REEL_BROKER; BrokerLocal distribue dans le processus courant.
+
+class Abonnement:
+    def __init__(self, departements=None, niveaux=None, taille_file=100):
+        self.departements = set(departements or ())
+        self.niveaux = set(niveaux or ())
+        self.loop = asyncio.get_running_loop()
+        self.file = asyncio.Queue(maxsize=taille_file)
+        self.perdus = 0
+
+    def accepte(self, message):
+        return not self.niveaux or message['niveau'] in self.niveaux
+
+    def deposer(self, message):
+        # Exécuté dans la boucle de l'abonné. Client trop lent: on jette le plus ancien plutôt que de bloquer
+        if self.file.full():
+            self.file.get_nowait()
+            self.perdus += 1
+        self.file.put_nowait(message)
+
+
+class BrokerLocal:
+    """Broker en mémoire: publier() peut être appelé depuis n'importe quel thread; chaque abonné reçoit
+    les messages dans sa boucle asyncio (un seul call_soon_threadsafe par boucle et par lot)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # Index par département (None: abonnés à tous les départements), pour ne pas tester chaque abonné
+        self._par_departement = defaultdict(set)
+
+    def abonner(self, departements=None, niveaux=None):
+        abonnement = Abonnement(departements, niveaux, settings.TEMPS_REEL_TAILLE_FILE)
+        with self._lock:
+            for departement in abonnement.departements or [None]:
+                self._par_departement[departement].add(abonnement)
+        return abonnement
+
+    def desabonner(self, abonnement):
+        with self._lock:
+            for departement in abonnement.departements or [None]:
+                self._par_departement[departement].discard(abonnement)
+                if not self._par_departement[departement]:
+                    del self._par_departement[departement]
+
+    def a_des_abonnes(self):
+        return bool(self._par_departement)
+
+    def publier(self, messages):
+        par_boucle = defaultdict(list)
+        with self._lock:
+            tous = tuple(self._par_departement.get(None, ()))
+            for message in messages:
+                for abonnement in tous + tuple(self._par_departement.get(message['department'], ())):
+                    if abonnement.accepte(message):
+                        par_boucle[abonnement.loop].append((abonnement, message))
+
+        for loop, livraisons in par_boucle.items():
+            try:
+                loop.call_soon_threadsafe(_livrer, livraisons)
+            except RuntimeError:
+                pass  # Boucle fermée: l'abonné est en train de se déconnecter
+
+
+def _livrer(livraisons):
+    for abonnement, message in livraisons:
+        abonnement.deposer(message)
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                _broker = import_string(settings.TEMPS_REEL_BROKER)()
+    return _broker
+
+
+@receiver(setting_changed)
+def _reset_broker(setting, **kwargs):
+    global _broker
+    if setting == 'TEMPS_REEL_BROKER':
+        _broker = None
+
+
+CHAMPS_MESSAGE = ('id', 'employee_id', 'modeleIA_id', 'statut', 'niveau', 'typeEpiManquants', 'created_at', 'updated_at')
+
+
+def messages_alertes(ids, evenement):
+    alertes = Alerte.objects.filter(pk__in=ids).values(*CHAMPS_MESSAGE, department=F('employee__department'))
+    return [dict(alerte, evenement=evenement) for alerte in alertes]
+
+
+def publier_alertes(ids, evenement):
+    """Publie les alertes `ids` ('creation' ou 'modification') après le commit de la transaction courante.
+    Rien n'est lu en base si personne n'écoute."""
+    broker = get_broker()
+    if not broker.a_des_abonnes():
+        return
+    ids = list(ids)
+    transaction.on_commit(lambda: broker.publier(messages_alertes(ids, evenement)))
+
+
+def evenement_sse(message):
+    donnees = json.dumps(message, cls=DjangoJSONEncoder)
+    return f"id: {message['id']}\nevent: {message['evenement']}\ndata: {donnees}\n\n"
@@ -0,0 +1,108 @@
+# tendances.py
+import hashlib
+import json
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncHour, TruncWeek
+from django.utils import timezone
+
+from .cache import VERSION_GLOBALE, version_donnees
+from .models import Alerte, StatistiqueAlerteJournaliere
+
+#Tendances des alertes par département ou poste et par intervalle (heure, jour, semaine), pour les graphiques
+#du front. Jours et semaines sont lus dans les compteurs journaliers (StatistiqueAlerteJournaliere), les heures
+#dans les alertes (TruncHour): une requête, l'agrégation est faite par la base.
+#Réponse en colonnes: les intervalles une seule fois, puis une série de nombres par groupe alignée sur eux
+#(zéros compris), au lieu d'un objet {groupe, intervalle, nombre} par point.
+
+PAS = {'hour': timedelta(hours=1), 'day': timedelta(days=1), 'week': timedelta(weeks=1)}
+GROUPES = {'department': 'employee__department', 'poste': 'employee__poste'}
+FILTRES = ('department', 'poste', 'modeleIA', 'statut', 'niveau')
+
+
+def aligner(pas, debut):
+    """Premier jour du premier intervalle qui contient `debut` (le lundi pour les semaines)."""
+    return debut - timedelta(days=debut.weekday()) if pas == 'week' else debut
+
+
+def nombre_intervalles(pas, debut, fin):
+    jours = (fin - aligner(pas, debut)).days + 1
+    if pas == 'hour':
+        return jours * 24
+    return jours if pas == 'day' else -(-jours // 7)
+
+
+def intervalles(pas, debut, fin):
+    """Débuts des intervalles qui couvrent les jours locaux [debut, fin]."""
+    if pas != 'hour':
+        courant = aligner(pas, debut)
+        while courant <= fin:
+            yield courant
+            courant += PAS[pas]
+        return
+    # Heures parcourues en UTC: une heure de plus ou de moins aux changements d'heure
+    fuseau = timezone.get_current_timezone()
+    courant = datetime.combine(debut, time(), fuseau).astimezone(dt_timezone.utc)
+    limite = datetime.combine(fin + timedelta(days=1), time(), fuseau).astimezone(dt_timezone.utc)
+    while courant < limite:
+        yield courant.astimezone(fuseau)
+        courant += PAS['hour']
+
+
+def _comptes(pas, par, debut, fin, filtres):
+    conditions = {GROUPES.get(nom, nom): valeur for nom, valeur in filtres.items()}
+    if pas == 'hour':
+        fuseau = timezone.get_current_timezone()
+        lignes = Alerte.objects.filter(
+            created_at__gte=datetime.combine(debut, time(), fuseau),
+            created_at__lt=datetime.combine(fin + timedelta(days=1), time(), fuseau),
+            **conditions,
+        ).annotate(
+            intervalle=TruncHour('created_at', tzinfo=dt_timezone.utc),  # Sans ambiguïté au changement d'heure
+        ).values_list(GROUPES[par], 'intervalle').annotate(nombre=Count('pk'))
+    else:
+        lignes = StatistiqueAlerteJournaliere.objects.filter(
+            jour__range=(aligner(pas, debut), fin), **conditions,
+        ).annotate(
+            intervalle=TruncWeek('jour') if pas == 'week' else F('jour'),
+        ).values_list(GROUPES[par], 'intervalle').annotate(nombre=Sum('total'))
+    return lignes.order_by()
+
+
+def tendances(pas, par, debut, fin, **filtres):
+    """Nombre d'alertes par groupe (`par`: department ou poste) et par intervalle (`pas`: hour, day ou week)
+    sur les jours [debut, fin], en colonnes: {'intervalles': [...], 'groupes': [...], 'series': [[...], ...]}."""
+    debuts = list(intervalles(pas, debut, fin))
+    index = {intervalle: i for i, intervalle in enumerate(debuts)}
+    series = {}
+    for groupe, intervalle, nombre in _comptes(pas, par, debut, fin, filtres):
+        if not nombre or intervalle not in index:
+            continue
+        series.setdefault(groupe, [0] * len(debuts))[index[intervalle]] += nombre
+    groupes = sorted(series)
+    return {
+        'pas': pas,
+        'par': par,
+        'debut': debut.isoformat(),
+        'fin': fin.isoformat(),
+        'intervalles': [intervalle.isoformat() for intervalle in debuts],
+        'groupes': groupes,
+        'series': [series[groupe] for groupe in groupes],
+    }
+
+
+def empreinte(pas, par, debut, fin, **filtres):
+    """ETag des tendances demandées: paramètres et version globale des données (voir cache.py)."""
+    cle = json.dumps(
+        [pas, par, debut.isoformat(), fin.isoformat(), sorted(filtres.items()), version_donnees(*VERSION_GLOBALE)],
+        default=str,
+    )
+    return f'"{hashlib.sha1(cle.encode()).hexdigest()}"'
+
+
+def fenetre_par_defaut(pas):
+    """(debut, fin) par défaut: les TENDANCES_FENETRES[pas] derniers jours, aujourd'hui compris."""
+    fin = timezone.localdate()
+    return fin - timedelta(days=settings.TENDANCES_FENETRES[pas] - 1), fin
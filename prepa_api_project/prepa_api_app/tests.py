@@ -1,3 +1,1926 @@
-from django.test import TestCase
+import asyncio
+import gzip
+import importlib.util
+import os
+import sys
+from collections import Counter
+import shutil
+import tarfile
+import tempfile
+from datetime import datetime, timedelta
+from io import BytesIO, StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.contrib.admin import site
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.management import CommandError, call_command
+from django.http import Http404
+from django.db import connection, connections
+from django.db.models.signals import post_init
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+import zlib
+
+from . import cache as cache_panneaux, changements, comparaison, delais, epi, export_analytique, miniatures, modeles_actifs, partitions, tendances
+from .annuaire import COULEURS_AVATAR, couleur_avatar, get_annuaire
+from .admin import AlerteNonTraiteeFilter
+from .medias import servir_media
+from .ingestion import ingerer_detections
+from .models import (
+    Employe, ExportAnalytique, ModeleIA, Alerte, HistogrammeDelaiAlerte, HistoriqueStatutAlerte, ImageBlob, MetriquesEmployeModele, MetriquesModeleIA,
+    StatistiqueAlerteJournaliere, Suppression, TypeEpi,
+)
+from .stockage import stockage_images
+from .statistiques import appliquer_deltas, enregistrer_creations, mettre_a_jour_en_lot, reconstruire
+from .temps_reel import BrokerLocal, get_broker
+from .transitions import changer_statut
+
+
+def creer_employe(nom='Tremblay', **kwargs):
+    valeurs = {'surname': 'Jean', 'poste': 'Soudeur', 'department': 'Atelier'}
+    valeurs.update(kwargs)
+    return Employe.objects.create(name=nom, **valeurs)
+
+
+def creer_modele(**kwargs):
+    valeurs = {'name': 'YOLO-EPI', 'version': '1.0', 'sensibilite': 50, 'typesEpi': 'casque, gants'}
+    valeurs.update(kwargs)
+    return ModeleIA.objects.create(**valeurs)
+
+
+def creer_alerte(employe, modele, **kwargs):
+    valeurs = {'typeEpiManquants': 'casque', 'image': 'alertes/test.jpg'}
+    valeurs.update(kwargs)
+    return Alerte.objects.create(employee=employe, modeleIA=modele, **valeurs)
+
+
+def image_jpeg(largeur=1920, hauteur=1080, couleur=(200, 30, 30)):
+    tampon = BytesIO()
+    Image.new('RGB', (largeur, hauteur), couleur).save(tampon, format='JPEG')
+    return ContentFile(tampon.getvalue(), name='camera.jpg')
+
+
+class MediaTemporaireMixin:
+    """MEDIA_ROOT temporaire, supprimé après le test; `reglages_media` complète les réglages surchargés."""
+    reglages_media = {'MINIATURES_ASYNC': False}
+
+    def setUp(self):
+        super().setUp()
+        self.media = tempfile.mkdtemp()
+        reglages = override_settings(MEDIA_ROOT=self.media, **self.reglages_media)
+        reglages.enable()
+        self.addCleanup(reglages.disable)
+        self.addCleanup(shutil.rmtree, self.media, ignore_errors=True)
+
+    def creer_alerte_avec_image(self, contenu=None, **kwargs):
+        """Alerte de self.employe et self.modele avec une image enregistrée; miniature générée au commit."""
+        alerte = Alerte(employee=self.employe, modeleIA=self.modele, typeEpiManquants='casque', **kwargs)
+        alerte.image.save('camera.jpg', contenu or image_jpeg(), save=False)
+        with self.captureOnCommitCallbacks(execute=True):
+            alerte.save()
+        alerte.refresh_from_db()
+        return alerte
+
+    def deposer_image(self, nom, contenu=b'jpeg'):
+        """Fichier déposé par une caméra dans le stockage des images, hors stockage par contenu."""
+        chemin = stockage_images().path(nom)
+        os.makedirs(os.path.dirname(chemin), exist_ok=True)
+        with open(chemin, 'wb') as fichier:
+            fichier.write(contenu)
+
+
+class EmployeAdminChangelistTests(TestCase):
+    """La liste des employés doit coûter un nombre constant de requêtes."""
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', 'motdepasse')
+        self.client.force_login(self.admin)
+        self.modele = creer_modele()
+
+    def ajouter_employes(self, nombre):
+        for i in range(nombre):
+            employe = creer_employe(nom=f'Employe{i}')
+            creer_alerte(employe, self.modele, niveau='CRITIQUE')
+            creer_alerte(employe, self.modele, statut='EN_COURS')
+
+    def compter_requetes_changelist(self):
+        with CaptureQueriesContext(connection) as contexte:
+            response = self.client.get('/admin/prepa_api_app/employe/')
+        self.assertEqual(response.status_code, 200)
+        return len(contexte.captured_queries)
+
+    def test_nombre_de_requetes_constant(self):
+        self.ajouter_employes(2)
+        requetes_petite_page = self.compter_requetes_changelist()
+
+        self.ajouter_employes(20)
+        requetes_grande_page = self.compter_requetes_changelist()
+
+        self.assertEqual(requetes_petite_page, requetes_grande_page)
+
+    def test_badges_lisent_les_annotations(self):
+        employe = creer_employe()
+        creer_alerte(employe, self.modele, niveau='CRITIQUE')
+        creer_alerte(employe, self.modele, niveau='FAIBLE', statut='NOUVEAU')
+
+        response = self.client.get('/admin/prepa_api_app/employe/')
+
+        self.assertContains(response, '⚠ 1 critique(s)')
+        self.assertContains(response, '⚠ 2 nouveau(x)')
+
+
+class AlerteIngestionTests(MediaTemporaireMixin, TestCase):
+    """Ingestion en lot des détections des caméras."""
+
+    def setUp(self):
+        super().setUp()
+        self.deposer_image('alertes/2025/01/01/frame.jpg')
+        self.user = User.objects.create_user('camera', 'camera@example.com', 'motdepasse')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.employe = creer_employe()
+        self.modele = creer_modele()
+
+    def detection(self, **kwargs):
+        donnees = {
+            'employee': self.employe.id,
+            'modeleIA': self.modele.id,
+            'typeEpiManquants': ['casque', 'gants'],
+            'niveau': 'ELEVE',
+            'image': 'alertes/2025/01/01/frame.jpg',
+        }
+        donnees.update(kwargs)
+        return donnees
+
+    def poster(self, detections):
+        return self.client.post('/alertes/ingestion/', detections, format='json')
+
+    def test_lot_valide(self):
+        response = self.poster([self.detection(), self.detection(niveau='CRITIQUE')])
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['crees'], 2)
+        alerte = Alerte.objects.get(niveau='CRITIQUE')
+        self.assertEqual(alerte.typeEpiManquants, 'casque, gants')
+        self.assertEqual(alerte.employee, self.employe)
+
+    def test_erreurs_par_detection(self):
+        response = self.poster([
+            self.detection(),
+            self.detection(employee=999999),
+            self.detection(niveau='INCONNU'),
+        ])
+
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual(response.json()['crees'], 1)
+        self.assertEqual([e['index'] for e in response.json()['erreurs']], [1, 2])
+        self.assertEqual(Alerte.objects.count(), 1)
+
+    def test_chemin_d_image_valide(self):
+        invalides = [
+            '../secret.jpg', 'alertes/../../secret.jpg', '/etc/passwd', '\\\\serveur\\image.jpg', 'C:/image.jpg',
+            'alertes/', 'alertes/absente.jpg',
+        ]
+
+        response = self.poster([self.detection(image=chemin) for chemin in invalides] + [self.detection()])
+
+        self.assertEqual(response.status_code, 207)
+        erreurs = response.json()['erreurs']
+        self.assertEqual([e['index'] for e in erreurs], list(range(len(invalides))))
+        self.assertTrue(all('image' in e['details'] for e in erreurs))
+        self.assertEqual(list(Alerte.objects.values_list('image', flat=True)), ['alertes/2025/01/01/frame.jpg'])
+
+    def test_nombre_de_requetes_independant_de_la_taille(self):
+        modeles_actifs.vider_cache()  # Chargé par un test précédent, sans self.modele: rechargé au deuxième lot
+        self.poster([self.detection()])  # Caches (annuaire, modèles, types d'EPI) chargés
+        with CaptureQueriesContext(connection) as petit_lot:
+            self.poster([self.detection()] * 2)
+        with CaptureQueriesContext(connection) as grand_lot:
+            self.poster([self.detection()] * 50)
+
+        self.assertEqual(Alerte.objects.count(), 53)
+        self.assertEqual(len(petit_lot.captured_queries), len(grand_lot.captured_queries))
+
+    def test_references_supprimees_par_un_autre_processus(self):
+        autre_employe, autre_modele = creer_employe(nom='Gagnon'), creer_modele(version='2.0')
+        get_annuaire().fiches([autre_employe.pk])  # Dans les caches
+        modeles_actifs.modeles_existants([autre_modele.pk])
+        # Suppressions d'un autre processus: ni signal ni on_commit ici, caches périmés
+        Employe.objects.filter(pk=autre_employe.pk)._raw_delete(connection.alias)
+        ModeleIA.objects.filter(pk=autre_modele.pk)._raw_delete(connection.alias)
+
+        response = self.poster([
+            self.detection(), self.detection(employee=autre_employe.pk), self.detection(modeleIA=autre_modele.pk),
+        ])
+
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual(
+            response.json()['erreurs'],
+            [{'index': 1, 'details': {'employee': ["Employé introuvable."]}},
+             {'index': 2, 'details': {'modeleIA': ["Modèle IA introuvable."]}}],
+        )
+        self.assertEqual(Alerte.objects.count(), 1)
+        self.assertIsNone(get_annuaire().fiche(autre_employe.pk))
+
+
+class ExportCsvTests(TestCase):
+    """Les exports CSV de l'admin sont produits en streaming."""
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', 'motdepasse')
+        self.client.force_login(self.admin)
+        self.modele = creer_modele()
+        self.employe = creer_employe()
+        creer_alerte(self.employe, self.modele, niveau='CRITIQUE')
+        creer_alerte(self.employe, self.modele, statut='RESOLU')
+        get_annuaire().recharger()
+
+    def executer_action(self, url, action, pks):
+        response = self.client.post(url, {'action': action, '_selected_action': pks})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode('utf-8-sig').splitlines()
+
+    def test_export_alertes(self):
+        lignes = self.executer_action(
+            '/admin/prepa_api_app/alerte/', 'exporter_alertes_csv',
+            list(Alerte.objects.values_list('pk', flat=True))
+        )
+
+        self.assertEqual(len(lignes), 3)
+        self.assertIn('Tremblay Jean;Soudeur;Atelier;Critique;Nouveau;casque;YOLO-EPI v1.0', lignes[1] + lignes[2])
+
+    def test_export_employes(self):
+        lignes = self.executer_action('/admin/prepa_api_app/employe/', 'exporter_rapport_csv', [self.employe.pk])
+
+        self.assertEqual(lignes[1], f'{self.employe.pk};Tremblay;Jean;Soudeur;Atelier;Actif;2;1;1')
+
+
+class AlerteIndexExplainTests(TestCase):
+    """Vérifie avec EXPLAIN que les requêtes chaudes sur les alertes utilisent les bons index."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.employes = [creer_employe(nom=f'Employe{i}') for i in range(20)]
+        cls.modeles = [creer_modele(version=str(i)) for i in range(5)]
+        statuts = ['RESOLU'] * 18 + ['IGNORE'] + ['NOUVEAU']
+        niveaux = ['FAIBLE', 'MOYEN', 'MOYEN', 'ELEVE', 'FAIBLE', 'MOYEN', 'ELEVE', 'CRITIQUE']
+
+        alertes = Alerte.objects.bulk_create([
+            Alerte(
+                employee=cls.employes[i % len(cls.employes)],
+                modeleIA=cls.modeles[i % len(cls.modeles)],
+                typeEpiManquants='casque',
+                image='alertes/test.jpg',
+                statut=statuts[i % len(statuts)],
+                niveau=niveaux[i % len(niveaux)],
+            )
+            for i in range(4000)
+        ])
+        maintenant = timezone.now()
+        for i, alerte in enumerate(alertes):
+            alerte.created_at = maintenant - timedelta(minutes=17 * i)
+        Alerte.objects.bulk_update(alertes, ['created_at'], batch_size=500)
+
+        with connection.cursor() as cursor:
+            cursor.execute(f'ANALYZE {Alerte._meta.db_table}')
+
+    def plan(self, queryset):
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                # Sur un petit jeu de données, PostgreSQL préfère un parcours séquentiel
+                cursor.execute('SET enable_seqscan = off')
+            try:
+                return queryset.explain()
+            finally:
+                if connection.vendor == 'postgresql':
+                    cursor.execute('RESET enable_seqscan')
+
+    def assertUtiliseIndex(self, queryset, *noms_index):
+        plan = self.plan(queryset)
+        self.assertTrue(any(nom in plan for nom in noms_index), f'{noms_index} absent du plan:\n{plan}')
+
+    def test_liste_par_defaut(self):
+        self.assertUtiliseIndex(Alerte.objects.all()[:30], 'alertes_date_id_idx')
+
+    # SQLite ne fait pas correspondre des paramètres liés (%s) au prédicat d'un index partiel: les tests des
+    # index partiels n'ont de sens que sur PostgreSQL
+    @skipUnless(connection.vendor == 'postgresql', "index partiels vérifiés sur PostgreSQL seulement")
+    def test_alertes_ouvertes(self):
+        self.assertUtiliseIndex(
+            Alerte.objects.filter(statut__in=['NOUVEAU', 'EN_COURS'])[:30], 'alertes_ouvertes_idx'
+        )
+
+    def test_historique_employe(self):
+        self.assertUtiliseIndex(
+            Alerte.objects.filter(employee=self.employes[0])[:15], 'alertes_employe_date_idx'
+        )
+
+    def test_fenetre_modele(self):
+        self.assertUtiliseIndex(
+            Alerte.objects.filter(modeleIA=self.modeles[0], created_at__gte=timezone.now() - timedelta(days=30)),
+            'alertes_modele_date_idx'
+        )
+
+    def test_filtre_urgent(self):
+        index_attendus = ['alertes_statut_date_idx']
+        if connection.vendor == 'postgresql':
+            index_attendus += ['alertes_ouvertes_idx']  # Partiel, plus petit: aussi valable pour statut='NOUVEAU'
+        self.assertUtiliseIndex(
+            Alerte.objects.filter(statut='NOUVEAU', created_at__lt=timezone.now() - timedelta(hours=24)),
+            *index_attendus
+        )
+
+    def test_filtre_niveau(self):
+        self.assertUtiliseIndex(Alerte.objects.filter(niveau='CRITIQUE')[:30], 'alertes_niveau_date_idx')
+
+    @skipUnless(connection.vendor == 'postgresql', "index partiels vérifiés sur PostgreSQL seulement")
+    def test_filtre_hors_sla(self):
+        self.assertUtiliseIndex(Alerte.objects.filter(delais.hors_sla()).order_by(), 'alertes_ouvertes_niveau_idx')
+
+    def test_flux_changements(self):
+        self.assertUtiliseIndex(changements.requete_lignes(Alerte.objects.all(), (1000, 0))[:500], 'alertes_flux_id_idx')
+
+
+class StatistiquesJournalieresTests(TestCase):
+    """La table agrégée suit les créations, modifications, actions en lot et suppressions d'alertes."""
+
+    def setUp(self):
+        cache.clear()
+        self.modele = creer_modele()
+        self.employe = creer_employe()
+
+    def compteurs(self):
+        return {
+            (s.statut, s.niveau): s.total
+            for s in StatistiqueAlerteJournaliere.objects.filter(employee=self.employe).exclude(total=0)
+        }
+
+    def test_creation_modification_suppression(self):
+        alerte = creer_alerte(self.employe, self.modele, niveau='ELEVE')
+        creer_alerte(self.employe, self.modele, niveau='ELEVE')
+        self.assertEqual(self.compteurs(), {('NOUVEAU', 'ELEVE'): 2})
+
+        alerte = Alerte.objects.get(pk=alerte.pk)
+        alerte.statut = 'RESOLU'
+        alerte.save()
+        self.assertEqual(self.compteurs(), {('NOUVEAU', 'ELEVE'): 1, ('RESOLU', 'ELEVE'): 1})
+
+        alerte.delete()
+        self.assertEqual(self.compteurs(), {('NOUVEAU', 'ELEVE'): 1})
+
+    def test_mise_a_jour_en_lot(self):
+        for _ in range(3):
+            creer_alerte(self.employe, self.modele)
+
+        mettre_a_jour_en_lot(Alerte.objects.all(), statut='IGNORE', niveau='CRITIQUE')
+
+        self.assertEqual(self.compteurs(), {('IGNORE', 'CRITIQUE'): 3})
+
+    def test_reconstruire_corrige_les_ecarts(self):
+        creer_alerte(self.employe, self.modele)
+        Alerte.objects.update(niveau='FAIBLE')  # Contourne les signaux
+
+        reconstruire()
+
+        self.assertEqual(self.compteurs(), {('NOUVEAU', 'FAIBLE'): 1})
+
+    def test_compteurs_ecrits_dans_l_ordre_des_cles(self):
+        autre_modele = creer_modele(version='2.0')
+        autre = creer_employe(nom='Gagnon')
+        jour = timezone.localdate()
+        deltas = Counter({
+            (jour, autre.pk, autre_modele.pk, 'NOUVEAU', 'ELEVE'): 1,
+            (jour, self.employe.pk, self.modele.pk, 'NOUVEAU', 'ELEVE'): 1,
+            (jour, autre.pk, self.modele.pk, 'NOUVEAU', 'ELEVE'): 1,
+        })
+        parametres = []
+
+        def espion(execute, sql, params, many, context):
+            if sql.startswith('INSERT'):
+                parametres.append(list(params))
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(espion):
+            appliquer_deltas(deltas)
+
+        # Mêmes verrous, même ordre, quel que soit l'ordre des deltas: pas d'interblocage entre transactions
+        journaliers, par_modele, par_employe = parametres
+        self.assertEqual(journaliers[1::6], sorted(journaliers[1::6]))
+        self.assertEqual(par_modele[::len(par_modele) // 2], sorted([self.modele.pk, autre_modele.pk]))
+        self.assertEqual(
+            [tuple(par_employe[i:i + 2]) for i in range(0, 9, 3)],
+            sorted([(self.modele.pk, self.employe.pk), (self.modele.pk, autre.pk), (autre_modele.pk, autre.pk)]),
+        )
+
+    def test_panneaux_admin_en_une_requete(self):
+        creer_alerte(self.employe, self.modele, niveau='CRITIQUE')
+        admin_employe = site._registry[Employe]
+
+        with self.assertNumQueries(1):
+            html = admin_employe.statistiques_alertes_display(self.employe)
+        self.assertIn('Tableau de Bord', html)
+        with self.assertNumQueries(1):
+            admin_employe.graphique_alertes(self.employe)
+        with self.assertNumQueries(1):
+            site._registry[ModeleIA].performance_analysis(self.modele)
+
+
+@override_settings(MINIATURES_ASYNC=False)  # Callbacks de commit exécutés: miniatures dans le test
+class PanneauxCacheTests(TestCase):
+    """Les panneaux de l'admin sont servis depuis le cache tant que les alertes ne changent pas."""
+
+    def setUp(self):
+        cache.clear()
+        self.modele = creer_modele()
+        self.employe = creer_employe()
+        self.autre = creer_employe(nom='Gagnon')
+        with self.captureOnCommitCallbacks(execute=True):  # Versions publiées au commit
+            creer_alerte(self.employe, self.modele)
+        self.admin_employe = site._registry[Employe]
+
+    def test_deuxieme_affichage_sans_requete(self):
+        premier = self.admin_employe.statistiques_alertes_display(self.employe)
+
+        with self.assertNumQueries(0):
+            second = self.admin_employe.statistiques_alertes_display(self.employe)
+            self.admin_employe.statistiques_alertes_display(self.employe)
+        self.assertEqual(premier, second)
+
+    def test_invalidation_sur_changement_d_alerte(self):
+        self.admin_employe.timeline_alertes(self.employe)
+        self.admin_employe.timeline_alertes(self.autre)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            alerte = creer_alerte(self.employe, self.modele, typeEpiManquants='lunettes')
+
+        self.assertIn('lunettes', self.admin_employe.timeline_alertes(self.employe))
+        with self.assertNumQueries(0):
+            self.admin_employe.timeline_alertes(self.autre)
+
+        alerte = Alerte.objects.get(pk=alerte.pk)
+        alerte.typeEpiManquants = 'bouchons'
+        with self.captureOnCommitCallbacks(execute=True):
+            alerte.save()
+        self.assertIn('bouchons', self.admin_employe.timeline_alertes(self.employe))
+
+    def test_version_publiee_au_commit(self):
+        version = cache_panneaux.version_donnees('employe', self.employe.pk)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            creer_alerte(self.employe, self.modele, typeEpiManquants='lunettes')
+            # Pas encore validé: un autre lecteur garde l'ancienne version, et ce qui est lu ici n'est pas mis en cache
+            self.assertEqual(cache_panneaux.version_donnees('employe', self.employe.pk), version)
+            self.assertIn('lunettes', self.admin_employe.timeline_alertes(self.employe))
+            self.assertTrue(cache_panneaux.versions_en_attente())
+
+        self.assertNotEqual(cache_panneaux.version_donnees('employe', self.employe.pk), version)
+        self.admin_employe.timeline_alertes(self.employe)
+        with self.assertNumQueries(0):
+            self.admin_employe.timeline_alertes(self.employe)
+
+    def test_invalidation_sur_action_en_lot(self):
+        self.admin_employe.statistiques_alertes_display(self.employe)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            mettre_a_jour_en_lot(Alerte.objects.filter(employee=self.employe), statut='RESOLU')
+
+        self.assertIn('100%', self.admin_employe.statistiques_alertes_display(self.employe))
+
+
+class AlerteListeApiTests(TestCase):
+    """Liste des alertes paginée par curseur (created_at, id)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('superviseur', 'sup@example.com', 'motdepasse')
+        cls.modele = creer_modele()
+        cls.employe = creer_employe()
+        cls.autre = creer_employe(nom='Gagnon', department='Peinture')
+        alertes = Alerte.objects.bulk_create([
+            Alerte(
+                employee=cls.employe if i % 3 else cls.autre,
+                modeleIA=cls.modele,
+                typeEpiManquants='casque',
+                image='alertes/test.jpg',
+                niveau='CRITIQUE' if i % 5 == 0 else 'MOYEN',
+            )
+            for i in range(25)
+        ])
+        # Des dates identiques deux à deux: le départage par id doit tenir
+        maintenant = timezone.now()
+        for i, alerte in enumerate(alertes):
+            alerte.created_at = maintenant - timedelta(minutes=i // 2)
+        Alerte.objects.bulk_update(alertes, ['created_at'])
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def parcourir(self, url):
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            ids += [alerte['id'] for alerte in response.json()['results']]
+            url = response.json()['next']
+        return ids
+
+    def test_parcours_complet_sans_doublon(self):
+        ids = self.parcourir('/alertes/?page_size=4')
+
+        attendus = list(Alerte.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+        self.assertEqual(ids, attendus)
+
+    def test_filtres(self):
+        ids = self.parcourir('/alertes/?niveau=CRITIQUE&department=Peinture&page_size=2')
+
+        attendus = Alerte.objects.filter(niveau='CRITIQUE', employee=self.autre)
+        self.assertEqual(sorted(ids), sorted(attendus.values_list('id', flat=True)))
+
+    def test_page_profonde_meme_cout(self):
+        premiere = self.client.get('/alertes/?page_size=4')
+        suivante = premiere.json()['next']
+        for _ in range(4):
+            suivante = self.client.get(suivante).json()['next']
+
+        with CaptureQueriesContext(connection) as requetes_debut:
+            self.client.get('/alertes/?page_size=4')
+        with CaptureQueriesContext(connection) as requetes_profondes:
+            response = self.client.get(suivante)
+
+        self.assertEqual(len(response.json()['results']), 4)
+        self.assertEqual(len(requetes_debut.captured_queries), len(requetes_profondes.captured_queries))
+        self.assertNotIn('OFFSET', requetes_profondes.captured_queries[-1]['sql'])
+
+    def test_curseur_invalide(self):
+        self.assertEqual(self.client.get('/alertes/?cursor=pas-un-curseur').status_code, 404)
+
+
+class TypesEpiTests(MediaTemporaireMixin, TestCase):
+    """Les EPI manquants sont stockés en masque de bits et comptés sans LIKE."""
+
+    def setUp(self):
+        super().setUp()
+        self.deposer_image('a.jpg')
+        epi.vider_cache()
+        self.employe = creer_employe()
+        self.modele = creer_modele(typesEpi='Casque, Gants, Gilet')
+        self.user = User.objects.create_user('lecteur', password='motdepasse')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_masque_calcule_a_l_enregistrement(self):
+        alerte = creer_alerte(self.employe, self.modele, typeEpiManquants='gants ; Casque')
+
+        casque, gants, gilet = (TypeEpi.objects.get(code=code).bit for code in ('casque', 'gants', 'gilet'))
+        self.assertEqual(alerte.epiManquantsMasque, 1 << casque | 1 << gants)
+        self.assertEqual(self.modele.typesEpiMasque, 1 << casque | 1 << gants | 1 << gilet)
+        self.assertEqual(epi.libelles_pour(alerte.epiManquantsMasque), ['Casque', 'Gants'])
+
+    def test_type_connu_sans_requete(self):
+        creer_alerte(self.employe, self.modele, typeEpiManquants='casque')
+        with self.assertNumQueries(0):
+            epi.masque_pour(['Casque', 'gants'])
+        self.assertEqual(TypeEpi.objects.count(), 3)
+
+    def test_ingestion_remplit_le_masque(self):
+        lunettes = TypeEpi.objects.create(code='lunettes', libelle='Lunettes', bit=epi.prochain_bit())
+        creees, erreurs = ingerer_detections([
+            {'employee': self.employe.id, 'modeleIA': self.modele.id, 'typeEpiManquants': ['Lunettes'], 'image': 'a.jpg'},
+        ])
+
+        self.assertEqual(erreurs, {})
+        self.assertEqual(Alerte.objects.get(pk=creees[0].pk).epiManquantsMasque, 1 << lunettes.bit)
+
+    def test_types_inconnus_refuses_sans_creation(self):
+        epi.masque_pour('casque')  # Catalogue en mémoire
+        detections = [
+            {'employee': self.employe.id, 'modeleIA': self.modele.id, 'typeEpiManquants': [f'Inconnu {i}'], 'image': 'a.jpg'}
+            for i in range(100)
+        ] + [{'employee': self.employe.id, 'modeleIA': self.modele.id, 'typeEpiManquants': ['Casque'], 'image': 'a.jpg'}]
+
+        with CaptureQueriesContext(connection) as contexte:
+            creees, erreurs = ingerer_detections(detections)
+
+        self.assertEqual(len(creees), 1)
+        self.assertEqual(sorted(erreurs), list(range(100)))
+        self.assertIn('typeEpiManquants', erreurs[0])
+        self.assertEqual(TypeEpi.objects.count(), 3)
+        self.assertEqual(sum('types_epi' in requete['sql'] for requete in contexte.captured_queries), 1)
+
+        alerte = creer_alerte(self.employe, self.modele, typeEpiManquants='Casque, Parachute')
+        self.assertEqual(epi.libelles_pour(alerte.epiManquantsMasque), ['Casque'])
+        self.assertEqual(TypeEpi.objects.count(), 3)
+
+    def test_catalogue_plein_erreur_de_formulaire(self):
+        TypeEpi.objects.bulk_create(
+            TypeEpi(code=f'type-{bit}', libelle=f'Type {bit}', bit=bit) for bit in range(3, epi.NOMBRE_MAX_TYPES - 1)
+        )
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'motdepasse'))
+
+        def ajouter(types):
+            return self.client.post('/admin/prepa_api_app/modeleia/add/', {
+                'name': 'Nouveau', 'version': '1.0', 'sensibilite': 50, 'typesEpi': types,
+                'alertes-TOTAL_FORMS': 0, 'alertes-INITIAL_FORMS': 0,
+            })
+
+        response = ajouter('Casque, Harnais, Masque')  # Deux nouveaux types, une seule place
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('typesEpi', response.context['adminform'].form.errors)
+        self.assertFalse(ModeleIA.objects.filter(name='Nouveau').exists())
+
+        self.assertEqual(ajouter('Casque, Harnais, harnais').status_code, 302)
+        self.assertEqual(epi.bits_libres(), 0)
+
+        response = self.client.post('/admin/prepa_api_app/typeepi/add/', {'code': 'masque', 'libelle': 'Masque'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['adminform'].form.non_field_errors())
+        self.assertFalse(TypeEpi.objects.filter(code='masque').exists())
+
+    def test_filtre_et_comptes_api(self):
+        creer_alerte(self.employe, self.modele, typeEpiManquants='casque, gants')
+        creer_alerte(self.employe, self.modele, typeEpiManquants='gants')
+        creer_alerte(self.employe, self.modele, typeEpiManquants='gilet', niveau='CRITIQUE')
+
+        response = self.client.get('/alertes/?epi=gants')
+        self.assertEqual(len(response.json()['results']), 2)
+        self.assertEqual(self.client.get('/alertes/?epi=inconnu').json()['results'], [])
+
+        with CaptureQueriesContext(connection) as contexte:
+            comptes = self.client.get('/alertes/epi/').json()
+        self.assertEqual(comptes, {'Casque': 1, 'Gants': 2, 'Gilet': 1})
+        self.assertNotIn('LIKE', contexte.captured_queries[-1]['sql'])
+
+        self.assertEqual(self.client.get('/alertes/epi/?niveau=CRITIQUE').json(), {'Casque': 0, 'Gants': 0, 'Gilet': 1})
+
+
+class MiniaturesTests(MediaTemporaireMixin, TestCase):
+    """Les images d'alertes ont une miniature générée au commit, servie par l'admin et l'API."""
+
+    def setUp(self):
+        super().setUp()
+        self.employe = creer_employe()
+        self.modele = creer_modele()
+
+    def test_miniature_generee_au_commit(self):
+        alerte = self.creer_alerte_avec_image()
+
+        self.assertEqual(alerte.miniature.name, alerte.image.name.replace('.jpg', '.miniature.webp'))
+        with Image.open(alerte.miniature.path) as miniature:
+            self.assertEqual((miniature.format, miniature.size), ('WEBP', (120, 120)))
+        self.assertLess(alerte.miniature.size, alerte.image.size)
+
+    def test_ingestion_et_api(self):
+        nom = Alerte._meta.get_field('image').storage.save('alertes/camera.jpg', image_jpeg())
+        with self.captureOnCommitCallbacks(execute=True):
+            creees, _ = ingerer_detections([
+                {'employee': self.employe.id, 'modeleIA': self.modele.id, 'typeEpiManquants': ['casque'], 'image': nom},
+            ])
+
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user('lecteur', password='motdepasse'))
+        resultat = client.get('/alertes/').json()['results'][0]
+        self.assertEqual(resultat['id'], creees[0].pk)
+        self.assertTrue(resultat['miniature'].endswith('/media/' + miniatures.nom_miniature(nom)))
+
+    def test_image_absente_retombe_sur_l_original(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            alerte = creer_alerte(self.employe, self.modele, image='alertes/absente.jpg')
+        alerte.refresh_from_db()
+
+        self.assertEqual(alerte.miniature.name, '')
+        self.assertEqual(miniatures.url_apercu(alerte), '/media/alertes/absente.jpg')
+
+    def test_commande_de_rattrapage(self):
+        alerte = self.creer_alerte_avec_image()
+        Alerte.objects.filter(pk=alerte.pk).update(miniature='')
+
+        call_command('generer_miniatures', stdout=StringIO())
+
+        alerte.refresh_from_db()
+        self.assertEqual(alerte.miniature.name, miniatures.nom_miniature(alerte.image.name))
+
+
+class StockageParContenuTests(MediaTemporaireMixin, TestCase):
+    """Une image identique n'est stockée qu'une fois; le fichier disparaît avec sa dernière alerte."""
+
+    def setUp(self):
+        super().setUp()
+        self.employe = creer_employe()
+        self.modele = creer_modele()
+
+    def test_images_identiques_partagees(self):
+        premiere = self.creer_alerte_avec_image(image_jpeg())
+        seconde = self.creer_alerte_avec_image(image_jpeg())
+        autre = self.creer_alerte_avec_image(image_jpeg(couleur=(0, 0, 255)))
+
+        self.assertEqual(premiere.image.name, seconde.image.name)
+        self.assertRegex(premiere.image.name, r'^alertes/cas/[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}\.jpg$')
+        self.assertNotEqual(premiere.image.name, autre.image.name)
+        self.assertEqual(ImageBlob.objects.get(nom=premiere.image.name).references, 2)
+        self.assertEqual(ImageBlob.objects.count(), 2)
+
+    def test_suppression_libere_le_fichier(self):
+        premiere = self.creer_alerte_avec_image(image_jpeg())
+        seconde = self.creer_alerte_avec_image(image_jpeg())
+        chemin = premiere.image.path
+        miniature = Alerte.objects.get(pk=premiere.pk).miniature.path
+
+        with self.captureOnCommitCallbacks(execute=True):
+            premiere.delete()
+        self.assertTrue(os.path.exists(chemin))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            seconde.delete()
+        self.assertFalse(os.path.exists(chemin))
+        self.assertFalse(os.path.exists(miniature))
+        self.assertFalse(ImageBlob.objects.exists())
+
+    def test_image_reprise_avant_la_liberation(self):
+        premiere = self.creer_alerte_avec_image()
+        chemin = premiere.image.path
+        with self.captureOnCommitCallbacks() as liberations:
+            premiere.delete()  # Dernière référence: libération prévue au commit
+        seconde = self.creer_alerte_avec_image()  # Même contenu, reçu avant la libération
+
+        for liberation in liberations:
+            liberation()
+
+        self.assertEqual(seconde.image.name, premiere.image.name)
+        self.assertEqual(ImageBlob.objects.get().references, 1)
+        self.assertTrue(os.path.exists(chemin))
+
+    def test_image_reenregistree_sans_reference_en_trop(self):
+        alerte = self.creer_alerte_avec_image()
+        alerte.image.save('camera.jpg', image_jpeg())  # Même contenu, même fichier
+
+        self.assertEqual(ImageBlob.objects.get().references, 1)
+
+    @override_settings(IMAGES_DHASH_DISTANCE=6)
+    def test_quasi_doublon_note_sans_remplacer_l_image(self):
+        premiere = self.creer_alerte_avec_image(image_jpeg(couleur=(200, 30, 30)))
+        seconde = self.creer_alerte_avec_image(image_jpeg(couleur=(201, 31, 30)))
+
+        self.assertNotEqual(premiere.image.name, seconde.image.name)  # Peut-être un autre employé, une autre caméra
+        self.assertEqual(ImageBlob.objects.get(nom=seconde.image.name).proche, premiere.image.name)
+        self.assertEqual([blob.references for blob in ImageBlob.objects.all()], [1, 1])
+
+    def test_rapport(self):
+        self.creer_alerte_avec_image(image_jpeg())
+        self.creer_alerte_avec_image(image_jpeg())
+        sortie = StringIO()
+
+        call_command('rapport_stockage_images', stdout=sortie)
+
+        self.assertIn('1 fichier(s)', sortie.getvalue())
+        self.assertIn('gagnés', sortie.getvalue())
+
+
+class ServiceMediasTests(MediaTemporaireMixin, TestCase):
+    """Vue de production pour /media/: en-têtes de cache, GET conditionnel, Range et délégation au serveur web."""
+    reglages_media = {'MEDIA_SERVING': 'sendfile'}
+
+    def setUp(self):
+        super().setUp()
+        self.contenu = bytes(range(256)) * 40
+        os.makedirs(os.path.join(self.media, 'alertes'))
+        with open(os.path.join(self.media, 'alertes', 'camera.jpg'), 'wb') as fichier:
+            fichier.write(self.contenu)
+        self.factory = RequestFactory()
+
+    def servir(self, chemin='alertes/camera.jpg', methode='get', **entetes):
+        return servir_media(getattr(self.factory, methode)('/media/' + chemin, headers=entetes), chemin)
+
+    def test_fichier_complet_avec_validateurs(self):
+        response = self.servir()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.contenu)
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertTrue(response['ETag'].startswith('"'))
+        self.assertIn('Last-Modified', response)
+
+    def test_get_conditionnel(self):
+        etag = self.servir()['ETag']
+
+        self.assertEqual(self.servir(If_None_Match=etag).status_code, 304)
+        self.assertEqual(self.servir(If_None_Match='"autre"').status_code, 200)
+
+    def test_plage(self):
+        response = self.servir(Range='bytes=100-199')
+
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), self.contenu[100:200])
+        self.assertEqual(response['Content-Range'], f'bytes 100-199/{len(self.contenu)}')
+        self.assertEqual(b''.join(self.servir(Range='bytes=-10').streaming_content), self.contenu[-10:])
+        self.assertEqual(self.servir(Range='bytes=99999-').status_code, 416)
+
+    def test_nom_par_contenu_immuable(self):
+        empreinte = 'ab' * 32
+        chemin = f'alertes/cas/ab/ab/{empreinte}.jpg'
+        os.makedirs(os.path.join(self.media, 'alertes', 'cas', 'ab', 'ab'))
+        with open(os.path.join(self.media, chemin), 'wb') as fichier:
+            fichier.write(self.contenu)
+
+        response = self.servir(chemin)
+
+        self.assertEqual(response['ETag'], f'"{empreinte}"')
+        self.assertIn('immutable', response['Cache-Control'])
+
+    def test_miniature_par_contenu_revalidee(self):
+        empreinte = 'ab' * 32
+        chemin = f'alertes/cas/ab/ab/{empreinte}.miniature.webp'
+        os.makedirs(os.path.join(self.media, 'alertes', 'cas', 'ab', 'ab'))
+        with open(os.path.join(self.media, chemin), 'wb') as fichier:
+            fichier.write(self.contenu)
+        etag = self.servir(chemin)['ETag']
+
+        with open(os.path.join(self.media, chemin), 'wb') as fichier:  # Régénérée sur place (autre format)
+            fichier.write(self.contenu[:100])
+        response = self.servir(chemin, If_None_Match=etag)
+
+        self.assertNotEqual(etag, f'"{empreinte}"')
+        self.assertNotIn('immutable', response['Cache-Control'])
+        self.assertEqual(response.status_code, 200)
+
+    def test_delegation_au_serveur_web(self):
+        with self.settings(MEDIA_SERVING='x-accel-redirect'):
+            response = self.servir()
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/alertes/camera.jpg')
+        self.assertEqual(response.content, b'')
+
+        with self.settings(MEDIA_SERVING='x-sendfile'):
+            response = self.servir()
+        self.assertEqual(response['X-Sendfile'], os.path.join(self.media, 'alertes', 'camera.jpg'))
+
+    def test_chemin_hors_media(self):
+        with self.assertRaises(Http404):
+            self.servir('../settings.py')
+        with self.assertRaises(Http404):
+            self.servir('alertes/absente.jpg')
+
+
+class BrokerMemoire:
+    """Broker de test: garde les messages publiés."""
+
+    def __init__(self):
+        self.messages = []
+
+    def a_des_abonnes(self):
+        return True
+
+    def publier(self, messages):
+        self.messages += messages
+
+
+def message_alerte(identifiant, department='Atelier', niveau='CRITIQUE'):
+    return {'id': identifiant, 'department': department, 'niveau': niveau, 'evenement': 'creation'}
+
+
+class TempsReelTests(MediaTemporaireMixin, TestCase):
+    """Les alertes créées ou modifiées sont poussées aux abonnés du flux SSE."""
+
+    async def recevoir(self, abonnement):
+        return await asyncio.wait_for(abonnement.file.get(), 2)
+
+    async def test_filtres_departement_et_niveau(self):
+        broker = BrokerLocal()
+        tous = broker.abonner()
+        atelier_critique = broker.abonner(['Atelier'], ['CRITIQUE'])
+
+        await asyncio.to_thread(broker.publier, [
+            message_alerte(1), message_alerte(2, department='Peinture'), message_alerte(3, niveau='MOYEN'),
+        ])
+
+        self.assertEqual([(await self.recevoir(tous))['id'] for _ in range(3)], [1, 2, 3])
+        self.assertEqual((await self.recevoir(atelier_critique))['id'], 1)
+        self.assertTrue(atelier_critique.file.empty())
+
+        broker.desabonner(tous)
+        broker.desabonner(atelier_critique)
+        self.assertFalse(broker.a_des_abonnes())
+
+    async def test_client_lent_garde_les_plus_recents(self):
+        broker = BrokerLocal()
+        with self.settings(TEMPS_REEL_TAILLE_FILE=2):
+            abonnement = broker.abonner()
+        await asyncio.to_thread(broker.publier, [message_alerte(i) for i in range(5)])
+
+        self.assertEqual([(await self.recevoir(abonnement))['id'] for _ in range(2)], [3, 4])
+        self.assertEqual(abonnement.perdus, 3)
+
+    @override_settings(TEMPS_REEL_BROKER='prepa_api_app.tests.BrokerMemoire', MINIATURES_ASYNC=False)
+    def test_publication_apres_commit(self):
+        self.deposer_image('a.jpg')
+        employe = creer_employe()
+        modele = creer_modele()
+        with self.captureOnCommitCallbacks(execute=True):
+            alerte = creer_alerte(employe, modele)
+            self.assertEqual(get_broker().messages, [])
+        with self.captureOnCommitCallbacks(execute=True):
+            ingerer_detections([{'employee': employe.id, 'modeleIA': modele.id, 'typeEpiManquants': ['gants'], 'image': 'a.jpg'}])
+        with self.captureOnCommitCallbacks(execute=True):
+            mettre_a_jour_en_lot(Alerte.objects.filter(pk=alerte.pk), statut='RESOLU')
+
+        messages = get_broker().messages
+        self.assertEqual([m['evenement'] for m in messages], ['creation', 'creation', 'modification'])
+        self.assertEqual(messages[0]['department'], 'Atelier')
+        self.assertEqual(messages[2]['statut'], 'RESOLU')
+
+    async def test_flux_sse(self):
+        user = await User.objects.acreate(username='superviseur')
+        self.assertEqual((await self.async_client.get('/alertes/flux/')).status_code, 401)
+
+        response = await self.async_client.get(f'/alertes/flux/?token={AccessToken.for_user(user)}&niveau=CRITIQUE')
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        evenements = aiter(response.streaming_content)
+        self.assertIn(b': connect', await anext(evenements))
+
+        await asyncio.to_thread(get_broker().publier, [message_alerte(7, niveau='MOYEN'), message_alerte(8)])
+        evenement = await asyncio.wait_for(anext(evenements), 2)
+
+        self.assertTrue(evenement.startswith(b'id: 8\nevent: creation\ndata: {'))
+        await evenements.aclose()
+
+
+class TransitionsStatutTests(TestCase):
+    """Les transitions en lot sont tracées sans coût par alerte."""
+
+    def setUp(self):
+        self.user = User.objects.create_superuser('superviseur', 'sup@example.com', 'motdepasse')
+        self.employe = creer_employe()
+        self.modele = creer_modele()
+
+    def creer_alertes(self, nombre, **kwargs):
+        return Alerte.objects.bulk_create([
+            Alerte(employee=self.employe, modeleIA=self.modele, typeEpiManquants='casque', image='a.jpg', **kwargs)
+            for _ in range(nombre)
+        ])
+
+    def compter_requetes(self, nombre):
+        alertes = self.creer_alertes(nombre)
+        with CaptureQueriesContext(connection) as contexte:
+            changer_statut(Alerte.objects.filter(pk__in=[a.pk for a in alertes]), self.user, statut='RESOLU')
+        return len(contexte.captured_queries)
+
+    def test_nombre_de_requetes_constant(self):
+        self.assertEqual(self.compter_requetes(3), self.compter_requetes(60))
+
+    def test_historique_et_statistiques(self):
+        nouvelles = self.creer_alertes(3)
+        deja_resolue = creer_alerte(self.employe, self.modele, statut='RESOLU')
+        reconstruire()
+
+        ids = changer_statut(Alerte.objects.all(), self.user, statut='RESOLU', niveau='CRITIQUE')
+
+        self.assertCountEqual(ids, [a.pk for a in nouvelles] + [deja_resolue.pk])
+        ligne = HistoriqueStatutAlerte.objects.get(alerte=nouvelles[0])
+        self.assertEqual(
+            (ligne.utilisateur, ligne.statut_avant, ligne.statut_apres, ligne.niveau_avant, ligne.niveau_apres),
+            (self.user, 'NOUVEAU', 'RESOLU', 'MOYEN', 'CRITIQUE'),
+        )
+        self.assertEqual(changer_statut(Alerte.objects.all(), self.user, statut='RESOLU'), [])
+        self.assertEqual(
+            list(StatistiqueAlerteJournaliere.objects.filter(total__gt=0).values_list('statut', 'niveau', 'total')),
+            [('RESOLU', 'CRITIQUE', 4)],
+        )
+
+    def test_action_admin(self):
+        alertes = self.creer_alertes(2)
+        self.client.force_login(self.user)
+
+        response = self.client.post('/admin/prepa_api_app/alerte/', {
+            'action': 'marquer_ignore', '_selected_action': [a.pk for a in alertes],
+        })
+
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(HistoriqueStatutAlerte.objects.filter(statut_apres='IGNORE', utilisateur=self.user).count(), 2)
+
+    def test_api_transitions_et_historique(self):
+        alertes = self.creer_alertes(2)
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        response = client.post('/alertes/transitions/', {'ids': [a.pk for a in alertes] + [999999], 'statut': 'EN_COURS'},
+                               format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.json()['modifiees'], response.json()['inchangees']), (2, 1))
+        historique = client.get(f'/alertes/{alertes[0].pk}/historique/').json()
+        self.assertEqual([(h['utilisateur'], h['statut_apres']) for h in historique], [('superviseur', 'EN_COURS')])
+        self.assertEqual(client.post('/alertes/transitions/', {'ids': [alertes[0].pk]}, format='json').status_code, 400)
+
+
+class PartitionsTests(TestCase):
+    """Bornes mensuelles des partitions; la commande refuse une base autre que PostgreSQL."""
+
+    def test_bornes_mensuelles(self):
+        decembre = partitions.debut_mois(timezone.make_aware(datetime(2024, 12, 17, 23, 30)))
+
+        self.assertEqual(partitions.decaler_mois(decembre, 1), timezone.make_aware(datetime(2025, 1, 1)))
+        self.assertEqual(partitions.decaler_mois(decembre, -12), timezone.make_aware(datetime(2023, 12, 1)))
+        self.assertEqual(partitions.nom_partition(decembre), 'alertes_p2024_12')
+        self.assertEqual(
+            [debut.month for debut in partitions.mois_couverts(decembre, partitions.decaler_mois(decembre, 2))],
+            [12, 1, 2],
+        )
+
+    def test_mois_en_heure_locale(self):
+        # 31 janvier 22 h à Montréal: déjà le 1er février en UTC
+        soir = datetime.fromisoformat('2024-02-01T03:00:00+00:00')
+
+        self.assertEqual(partitions.debut_mois(soir), timezone.make_aware(datetime(2024, 1, 1)))
+
+    def test_commande_postgresql_uniquement(self):
+        if connection.vendor == 'postgresql':
+            self.skipTest("Base PostgreSQL: la commande s'exécuterait réellement")
+        with self.assertRaisesMessage(CommandError, 'PostgreSQL'):
+            call_command('partitions_alertes', stdout=StringIO())
+
+
+@skipUnless(connection.vendor == 'postgresql', "partitionnement vérifié sur PostgreSQL seulement")
+class PartitionsPostgreSQLTests(MediaTemporaireMixin, TestCase):
+    """Conversion, partition créée après coup (lignes sorties de la partition par défaut) et archivage."""
+
+    def setUp(self):
+        super().setUp()
+        self.employe = creer_employe()
+        self.modele = creer_modele()
+
+    def dater(self, alerte, date):
+        Alerte.objects.filter(pk=alerte.pk).update(created_at=date)
+
+    def compter(self, table):
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT COUNT(*) FROM {connection.ops.quote_name(table)}")
+            return cursor.fetchone()[0]
+
+    def test_convertir_creer_puis_archiver(self):
+        # Alertes anciennes: dernier soir de janvier (heure locale), déjà février en UTC
+        ancienne = self.creer_alerte_avec_image()
+        self.dater(ancienne, timezone.make_aware(datetime(2024, 1, 31, 22)))
+        HistoriqueStatutAlerte.objects.create(
+            alerte_id=ancienne.pk, statut_avant='NOUVEAU', statut_apres='RESOLU', niveau_avant='MOYEN', niveau_apres='MOYEN',
+            created_at=timezone.now(),
+        )
+        heritee = creer_alerte(self.employe, self.modele, image='alertes/2024/01/31/cam1.jpg',
+                               miniature='alertes/2024/01/31/cam1.miniature.webp')
+        self.dater(heritee, timezone.make_aware(datetime(2024, 1, 31, 21)))
+        for nom in ('cam1.jpg', 'cam1.miniature.webp'):
+            chemin = os.path.join(self.media, 'alertes', '2024', '01', '31', nom)
+            os.makedirs(os.path.dirname(chemin), exist_ok=True)
+            with open(chemin, 'wb') as fichier:
+                fichier.write(b'image')
+        recente = creer_alerte(self.employe, self.modele)
+        dans_six_mois = partitions.decaler_mois(partitions.debut_mois(timezone.now()), 6)
+
+        partitions.convertir(1)
+
+        self.assertTrue(partitions.est_partitionnee())
+        noms = [nom for nom, _, _ in partitions.partitions()]
+        self.assertEqual(noms[0], 'alertes_p2024_01')
+        self.assertEqual(self.compter('alertes_p2024_01'), 2)
+        self.assertEqual(self.compter('alertes_defaut'), 0)
+        nouvelle = creer_alerte(self.employe, self.modele)  # Séquence des id reprise après la copie
+        self.assertGreater(nouvelle.pk, recente.pk)
+        # Déclencheur du flux de changements recréé sur la table partitionnée
+        Alerte.objects.filter(pk=recente.pk).update(position_flux=0)
+        self.assertGreater(Alerte.objects.get(pk=recente.pk).position_flux, 0)
+
+        # Mois sans partition: la ligne va dans la partition par défaut, puis dans sa partition une fois créée
+        future = creer_alerte(self.employe, self.modele)
+        self.dater(future, dans_six_mois)
+        self.assertEqual(self.compter('alertes_defaut'), 1)
+        self.assertEqual(partitions.creer_partition(dans_six_mois), partitions.nom_partition(dans_six_mois))
+        self.assertEqual(self.compter('alertes_defaut'), 0)
+        self.assertEqual(self.compter(partitions.nom_partition(dans_six_mois)), 1)
+        self.assertIsNone(partitions.creer_partition(dans_six_mois))
+
+        self.assertEqual(partitions.partitions_expirees(12)[0], 'alertes_p2024_01')
+        dossier = os.path.join(self.media, 'archives')
+        image_cas = ancienne.image.path
+        with self.captureOnCommitCallbacks(execute=True):
+            fichiers = partitions.archiver_partition('alertes_p2024_01', dossier)
+
+        self.assertNotIn('alertes_p2024_01', [nom for nom, _, _ in partitions.partitions()])
+        self.assertEqual(partitions.partitions_detachees(), [])
+        self.assertFalse(Alerte.objects.filter(pk__in=[ancienne.pk, heritee.pk]).exists())
+        self.assertFalse(HistoriqueStatutAlerte.objects.filter(alerte_id=ancienne.pk).exists())
+        with gzip.open(fichiers[0], 'rt') as archive:
+            self.assertEqual(len(archive.read().splitlines()), 3)  # En-tête et deux alertes
+        with tarfile.open(fichiers[2]) as archive:
+            self.assertIn('alertes/2024/01/31/cam1.jpg', archive.getnames())
+        self.assertFalse(ImageBlob.objects.filter(nom=ancienne.image.name).exists())
+        self.assertFalse(os.path.exists(image_cas))
+        self.assertEqual(os.listdir(os.path.join(self.media, 'alertes', '2024', '01', '31')), [])
+
+    def test_archivage_interrompu_repris(self):
+        ancienne = creer_alerte(self.employe, self.modele)
+        self.dater(ancienne, timezone.make_aware(datetime(2024, 3, 10)))
+        partitions.convertir(0)
+
+        partitions.detacher_partition('alertes_p2024_03')  # Archivage interrompu après le détachement
+        self.assertFalse(Alerte.objects.filter(pk=ancienne.pk).exists())
+        self.assertEqual(partitions.partitions_detachees(), ['alertes_p2024_03'])
+
+        partitions.archiver_partition('alertes_p2024_03', os.path.join(self.media, 'archives'))
+        self.assertEqual(partitions.partitions_detachees(), [])
+
+
+class MetriquesModelesTests(TestCase):
+    """Les métriques par modèle suivent les alertes et servent l'admin et la comparaison en une requête."""
+
+    def setUp(self):
+        cache.clear()
+        self.modele = creer_modele()
+        self.employe = creer_employe()
+        self.autre = creer_employe(nom='Gagnon')
+
+    def test_suivi_incremental(self):
+        alerte = creer_alerte(self.employe, self.modele, niveau='CRITIQUE')
+        creer_alerte(self.employe, self.modele)
+        creer_alerte(self.autre, self.modele)
+        changer_statut(Alerte.objects.filter(pk=alerte.pk), statut='IGNORE')
+        mettre_a_jour_en_lot(Alerte.objects.filter(employee=self.autre), statut='RESOLU')
+
+        metriques = MetriquesModeleIA.objects.get(modeleIA=self.modele)
+        self.assertEqual(
+            (metriques.total, metriques.statut_nouveau, metriques.statut_ignore, metriques.statut_resolu),
+            (3, 1, 1, 1),
+        )
+        self.assertEqual((metriques.niveau_critique, metriques.niveau_moyen), (1, 2))
+        self.assertAlmostEqual(metriques.taux_faux_positifs, 100 / 3)
+        self.assertEqual(
+            dict(MetriquesEmployeModele.objects.values_list('employee', 'total')), {self.employe.pk: 2, self.autre.pk: 1}
+        )
+
+        Alerte.objects.get(pk=alerte.pk).delete()
+        self.assertEqual(MetriquesModeleIA.objects.get(modeleIA=self.modele).total, 2)
+
+    def test_reconstruire(self):
+        creer_alerte(self.employe, self.modele)
+        MetriquesModeleIA.objects.all().delete()
+        MetriquesEmployeModele.objects.update(total=7)
+
+        reconstruire()
+
+        self.assertEqual(MetriquesModeleIA.objects.get(modeleIA=self.modele).statut_nouveau, 1)
+        self.assertEqual(MetriquesEmployeModele.objects.get().total, 1)
+
+    def test_admin_sans_requete_par_ligne(self):
+        creer_alerte(self.employe, self.modele, statut='RESOLU')
+        admin_modele = site._registry[ModeleIA]
+        modele = admin_modele.get_queryset(RequestFactory().get('/')).get(pk=self.modele.pk)
+
+        with self.assertNumQueries(0):
+            admin_modele.nombre_alertes_generees(modele)
+            precision = admin_modele.taux_precision(modele)
+        self.assertIn('100%', precision)
+        with self.assertNumQueries(1):
+            html = admin_modele.statistiques_modele(modele)
+        self.assertIn('Tremblay', html)
+
+    def test_comparaison_en_une_requete(self):
+        user = User.objects.create_user('superviseur', 'sup@example.com', 'motdepasse')
+        modeles = [creer_modele(version=f'{i}.0') for i in range(50)]
+        for modele in modeles[:10]:
+            creer_alerte(self.employe, modele, statut='IGNORE')
+        client = APIClient()
+        client.force_authenticate(user)
+        ids = ','.join(str(modele.pk) for modele in modeles)
+
+        with CaptureQueriesContext(connection) as requetes:
+            response = client.get(f'/modeles/comparaison/?ids={ids}')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len([r for r in requetes.captured_queries if 'metriques_modeles_ia' in r['sql']]), 1)
+        lignes = {ligne['id']: ligne for ligne in response.json()}
+        self.assertEqual(len(lignes), 50)
+        self.assertEqual(lignes[modeles[0].pk]['taux_faux_positifs'], 100.0)
+        self.assertIsNone(lignes[modeles[-1].pk]['taux_resolution'])
+        self.assertEqual(client.get('/modeles/comparaison/?ids=a,b').status_code, 400)
+
+
+class ComparaisonVersionsTests(TestCase):
+    """Comparaison des versions de modèles sur les alertes historiques, agrégée par la base."""
+
+    def setUp(self):
+        epi.vider_cache()
+        self.v1 = creer_modele(version='1.0')
+        self.v2 = creer_modele(version='2.0', sensibilite=80)
+        self.employe = creer_employe()
+
+    def traiter(self, alerte, statut, delai):
+        changer_statut(Alerte.objects.filter(pk=alerte.pk), statut=statut)
+        HistoriqueStatutAlerte.objects.filter(alerte=alerte).update(created_at=alerte.created_at + delai)
+
+    def test_rapport(self):
+        for i in range(4):
+            alerte = creer_alerte(self.employe, self.v1, typeEpiManquants='casque, gants')
+            self.traiter(alerte, 'IGNORE' if i < 3 else 'RESOLU', timedelta(minutes=10 * (i + 1)))
+        alerte = creer_alerte(self.employe, self.v2, typeEpiManquants='gants')
+        self.traiter(alerte, 'RESOLU', timedelta(days=2))
+        creer_alerte(self.employe, self.v2, typeEpiManquants='gants')
+
+        with self.assertNumQueries(5):  # Statuts, types d'EPI, répartition par EPI, délais, modèles
+            rapport = {version['version']: version for version in comparaison.comparer_versions()}
+
+        v1, v2 = rapport['1.0'], rapport['2.0']
+        self.assertEqual((v1['total'], v1['taux_ignore'], v1['taux_resolution']), (4, 75.0, 25.0))
+        self.assertEqual(v1['par_epi']['casque'], {'total': 4, 'ignore': 3, 'taux_ignore': 75.0})
+        self.assertEqual(v1['delai_traitement']['nombre'], 4)
+        self.assertAlmostEqual(v1['delai_traitement']['moyenne_s'], 25 * 60)
+        self.assertTrue(15 * 60 <= v1['delai_traitement']['p50_s'] <= 60 * 60)
+        self.assertEqual(sum(classe['nombre'] for classe in v1['delai_traitement']['histogramme']), 4)
+        self.assertEqual((v2['total'], v2['taux_ignore'], v2['statuts']['NOUVEAU']), (2, 0.0, 1))
+        self.assertNotIn('casque', v2['par_epi'])
+        self.assertTrue(86400 <= v2['delai_traitement']['p50_s'] <= 3 * 86400)
+
+    def test_restriction_aux_modeles_et_alertes(self):
+        creer_alerte(self.employe, self.v1)
+        ancienne = creer_alerte(self.employe, self.v2)
+        Alerte.objects.filter(pk=ancienne.pk).update(created_at=timezone.now() - timedelta(days=90))
+
+        rapport = comparaison.comparer_versions(
+            [self.v2.pk], Alerte.objects.filter(created_at__gte=timezone.now() - timedelta(days=30)),
+        )
+
+        self.assertEqual([(version['id'], version['total']) for version in rapport], [(self.v2.pk, 0)])
+        self.assertIsNone(rapport[0]['taux_ignore'])
+        self.assertIsNone(rapport[0]['delai_traitement']['p50_s'])
+
+    def test_commande(self):
+        creer_alerte(self.employe, self.v1)
+        sortie = StringIO()
+
+        call_command('comparer_modeles', '--modeles', str(self.v1.pk), stdout=sortie)
+
+        self.assertIn('v1.0', sortie.getvalue())
+        self.assertIn('casque', sortie.getvalue())
+        with self.assertRaises(CommandError):
+            call_command('comparer_modeles', '--depuis', 'hier', stdout=StringIO())
+
+
+class DelaisTraitementTests(TestCase):
+    """Horodatage des transitions, histogrammes de délais et requêtes SLA."""
+
+    def setUp(self):
+        self.modele = creer_modele()
+        self.employe = creer_employe()
+
+    def vieillir(self, alerte, delai):
+        Alerte.objects.filter(pk=alerte.pk).update(created_at=timezone.now() - delai)
+
+    def histogramme(self, etape):
+        return list(
+            HistogrammeDelaiAlerte.objects.filter(etape=etape).exclude(total=0)
+            .values_list('department', 'niveau', 'classe', 'total')
+        )
+
+    def histogrammes(self):
+        return sorted(
+            HistogrammeDelaiAlerte.objects.exclude(total=0)
+            .values_list('modeleIA_id', 'etape', 'department', 'niveau', 'classe', 'total')
+        )
+
+    def assertConformeALaReconstruction(self):
+        tenus = self.histogrammes()
+        delais.reconstruire_delais()
+        self.assertEqual(tenus, self.histogrammes())
+
+    def test_percentiles_a_un_huitieme_pres(self):
+        valeurs = [7 * 1.37 ** i for i in range(40)]
+        classes = Counter(delais.classe_delai(valeur) for valeur in valeurs)
+
+        estimes = delais.percentiles(classes)
+
+        for p in (50, 90):
+            exact = sorted(valeurs)[int(len(valeurs) * p / 100) - 1]
+            self.assertLess(abs(estimes[p] - exact) / exact, 1 / delais.SOUS_CLASSES + 0.15)
+        self.assertEqual(delais.classe_delai(0.2), 0)
+        self.assertLessEqual(delais.borne_basse(delais.classe_delai(3600)), 3600)
+        self.assertGreater(delais.borne_basse(delais.classe_delai(3600) + 1), 3600)
+
+    def test_transitions_en_lot(self):
+        alerte = creer_alerte(self.employe, self.modele, niveau='CRITIQUE')
+        self.vieillir(alerte, timedelta(minutes=30))
+
+        changer_statut(Alerte.objects.filter(pk=alerte.pk), statut='EN_COURS')
+        alerte.refresh_from_db()
+        pris_en_charge_at = alerte.pris_en_charge_at
+        self.assertIsNotNone(pris_en_charge_at)
+        self.assertIsNone(alerte.traite_at)
+
+        changer_statut(Alerte.objects.filter(pk=alerte.pk), statut='RESOLU')
+        changer_statut(Alerte.objects.filter(pk=alerte.pk), statut='IGNORE')  # Reste traitée: pas de nouveau délai
+        alerte.refresh_from_db()
+        self.assertEqual(alerte.pris_en_charge_at, pris_en_charge_at)
+        self.assertIsNotNone(alerte.traite_at)
+
+        classe = delais.classe_delai(30 * 60)
+        for etape in ('PRISE_EN_CHARGE', 'TRAITEMENT'):
+            [(department, niveau, classe_lue, total)] = self.histogramme(etape)
+            self.assertEqual((department, niveau, total), ('Atelier', 'CRITIQUE', 1))
+            self.assertIn(classe_lue, (classe, classe + 1))
+
+        changer_statut(Alerte.objects.filter(pk=alerte.pk), statut='EN_COURS')  # Rouverte
+        alerte.refresh_from_db()
+        self.assertIsNone(alerte.traite_at)
+        self.assertEqual(self.histogramme('TRAITEMENT'), [])  # Plus traitée: plus de délai de traitement
+        self.assertEqual(len(self.histogramme('PRISE_EN_CHARGE')), 1)
+
+        changer_statut(Alerte.objects.filter(pk=alerte.pk), niveau='FAIBLE')
+        self.assertEqual([ligne[:2] for ligne in self.histogramme('PRISE_EN_CHARGE')], [('Atelier', 'FAIBLE')])
+        self.assertConformeALaReconstruction()
+
+    def test_save_horodate(self):
+        alerte = creer_alerte(self.employe, self.modele)
+        alerte = Alerte.objects.get(pk=alerte.pk)
+        alerte.statut = 'RESOLU'
+        alerte.save()
+
+        alerte.refresh_from_db()
+        self.assertIsNotNone(alerte.pris_en_charge_at)
+        self.assertEqual(alerte.traite_at, alerte.pris_en_charge_at)
+        self.assertEqual(len(self.histogramme('TRAITEMENT')), 1)
+
+        alerte.commentaire = 'vu'
+        alerte.save()
+        self.assertEqual(self.histogramme('TRAITEMENT')[0][3], 1)
+
+        alerte.statut = 'EN_COURS'  # Rouverte puis retraitée: un seul délai de traitement
+        alerte.save()
+        self.assertEqual(self.histogramme('TRAITEMENT'), [])
+        alerte.statut = 'RESOLU'
+        alerte.save()
+        self.assertEqual([ligne[3] for ligne in self.histogramme('TRAITEMENT')], [1])
+        self.assertConformeALaReconstruction()
+
+    def test_histogrammes_suivent_les_alertes(self):
+        autre_modele = creer_modele(version='2.0')
+        peinture = creer_employe(nom='Gagnon', department='Peinture')
+        alertes = [creer_alerte(self.employe, self.modele, niveau=niveau) for niveau in ('CRITIQUE', 'MOYEN', 'FAIBLE')]
+        for i, alerte in enumerate(alertes):
+            self.vieillir(alerte, timedelta(minutes=10 * (i + 1)))
+        changer_statut(Alerte.objects.all(), statut='RESOLU')
+
+        alerte = Alerte.objects.get(pk=alertes[0].pk)
+        alerte.niveau, alerte.modeleIA, alerte.employee = 'ELEVE', autre_modele, peinture
+        alerte.save()
+        self.assertConformeALaReconstruction()
+
+        self.employe.department = 'Soudure'
+        self.employe.save()
+        self.assertEqual(
+            {department for _, _, department, *_ in self.histogrammes()}, {'Peinture', 'Soudure'}
+        )
+        self.assertConformeALaReconstruction()
+
+        Alerte.objects.get(pk=alertes[1].pk).delete()
+        self.assertConformeALaReconstruction()
+        peinture.delete()  # Alertes supprimées en cascade avec l'employé
+        self.assertConformeALaReconstruction()
+        self.assertEqual(len(self.histogrammes()), 2)  # Prise en charge et traitement de la dernière alerte
+        Alerte.objects.all().delete()
+        self.assertEqual(self.histogrammes(), [])
+
+    def test_hors_sla(self):
+        critique = creer_alerte(self.employe, self.modele, niveau='CRITIQUE')
+        faible = creer_alerte(self.employe, self.modele, niveau='FAIBLE')
+        en_cours = creer_alerte(self.employe, self.modele, niveau='CRITIQUE', statut='EN_COURS')
+        for alerte in (critique, faible, en_cours):
+            self.vieillir(alerte, timedelta(minutes=20))
+
+        self.assertEqual(list(Alerte.objects.filter(delais.hors_sla()).values_list('pk', flat=True)), [critique.pk])
+
+        self.vieillir(en_cours, timedelta(hours=5))
+        self.assertEqual(
+            set(Alerte.objects.filter(delais.hors_sla()).values_list('pk', flat=True)), {critique.pk, en_cours.pk}
+        )
+
+        request = RequestFactory().get('/', {'traitement': 'urgent'})
+        filtre = AlerteNonTraiteeFilter(request, {'traitement': ['urgent']}, Alerte, site._registry[Alerte])
+        self.assertEqual(filtre.queryset(request, Alerte.objects.all()).count(), 2)
+
+    def test_api_et_reconstruction(self):
+        user = User.objects.create_user('superviseur', 'sup@example.com', 'motdepasse')
+        client = APIClient()
+        client.force_authenticate(user)
+        for minutes, niveau in ((10, 'CRITIQUE'), (20, 'CRITIQUE'), (600, 'FAIBLE')):
+            alerte = creer_alerte(self.employe, self.modele, niveau=niveau)
+            self.vieillir(alerte, timedelta(minutes=minutes))
+            changer_statut(Alerte.objects.filter(pk=alerte.pk), statut='EN_COURS')
+
+        with self.assertNumQueries(1):
+            groupes = delais.statistiques_delais('PRISE_EN_CHARGE', 'niveau')
+        par_niveau = {groupe['groupe']: groupe for groupe in groupes}
+        self.assertEqual(par_niveau['CRITIQUE']['nombre'], 2)
+        self.assertEqual(par_niveau['CRITIQUE']['dans_sla_pct'], 50.0)
+        self.assertEqual(par_niveau['FAIBLE']['dans_sla_pct'], 100.0)
+
+        response = client.get('/alertes/delais/?etape=prise_en_charge&par=department')
+        self.assertEqual(response.status_code, 200)
+        [groupe] = response.json()['groupes']
+        self.assertEqual((groupe['groupe'], groupe['nombre']), ('Atelier', 3))
+        self.assertTrue(20 * 60 <= groupe['p90_s'] <= 700 * 60)
+        self.assertEqual(client.get('/alertes/delais/?par=poste').status_code, 400)
+        self.assertEqual(client.get('/alertes/delais/?modeleIA=abc').status_code, 400)
+        self.assertEqual(client.get('/alertes/delais/?niveau=URGENT').status_code, 400)
+        self.assertEqual(client.get('/alertes/?hors_sla=true').json()['results'], [])
+
+        avant = sorted(self.histogramme('PRISE_EN_CHARGE'))
+        HistogrammeDelaiAlerte.objects.all().delete()
+        delais.reconstruire_delais()
+        self.assertEqual(sorted(self.histogramme('PRISE_EN_CHARGE')), avant)
+
+
+class ModelesActifsCacheTests(MediaTemporaireMixin, TestCase):
+    """Résolution des modèles IA de l'ingestion depuis le cache en mémoire, versionné."""
+
+    def setUp(self):
+        super().setUp()
+        self.deposer_image('alertes/frame.jpg')
+        cache.clear()
+        modeles_actifs.vider_cache()
+        self.employe = creer_employe()
+        self.modele = creer_modele(active=True)
+        self.autre = creer_modele(version='2.0', active=False)
+
+    def detection(self, **kwargs):
+        donnees = {'employee': self.employe.id, 'typeEpiManquants': ['casque'], 'image': 'alertes/frame.jpg'}
+        donnees.update(kwargs)
+        return donnees
+
+    def test_aucune_requete_sur_modeles_ia(self):
+        ingerer_detections([self.detection()])  # Charge le cache
+
+        with CaptureQueriesContext(connection) as requetes:
+            creees, erreurs = ingerer_detections([self.detection(), self.detection(modeleIA=self.autre.pk)])
+
+        self.assertEqual(erreurs, {})
+        self.assertEqual([alerte.modeleIA_id for alerte in creees], [self.modele.pk, self.autre.pk])
+        # Seule la vérification des clés primaires dans la transaction (employés et modèles, une requête)
+        lectures = [r['sql'] for r in requetes.captured_queries if 'FROM "modeles_ia"' in r['sql']]
+        self.assertEqual(len(lectures), 1)
+        self.assertIn('UNION ALL', lectures[0])
+
+    def test_activation_par_l_admin(self):
+        self.assertEqual(modeles_actifs.modeles_actifs(), [self.modele.pk])
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'motdepasse'))
+
+        def action(nom, modeles):
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post('/admin/prepa_api_app/modeleia/', {
+                    'action': nom, '_selected_action': [modele.pk for modele in modeles],
+                })
+            self.assertEqual(response.status_code, 302)
+
+        action('activer_modele', [self.autre])
+        self.assertEqual(modeles_actifs.modeles_actifs(), [self.autre.pk])
+
+        action('desactiver_modele', [self.modele, self.autre])
+        creees, erreurs = ingerer_detections([self.detection()])
+        self.assertEqual(list(erreurs), [0])
+
+        action('dupliquer_modele', [self.modele])
+        self.assertEqual(len(modeles_actifs.modeles_existants(ModeleIA.objects.values_list('pk', flat=True))), 3)
+
+    def test_version_partagee_et_ttl(self):
+        modeles_actifs.modeles_actifs()
+        ModeleIA.objects.filter(pk=self.autre.pk).update(active=True)  # Sans signal ni nouvelle version
+
+        with override_settings(MODELES_IA_CACHE_VERIFICATION=0):
+            self.assertEqual(modeles_actifs.modeles_actifs(), [self.modele.pk])
+            cache.set(modeles_actifs.CLE_VERSION, 'autre processus')
+            self.assertEqual(modeles_actifs.modeles_actifs(), [self.modele.pk, self.autre.pk])
+
+        ModeleIA.objects.filter(pk=self.modele.pk).update(active=False)
+        with override_settings(MODELES_IA_CACHE_TTL=0):
+            self.assertEqual(modeles_actifs.modeles_actifs(), [self.autre.pk])
+
+    def test_modele_inconnu_du_cache(self):
+        modeles_actifs.modeles_actifs()
+        nouveau = ModeleIA.objects.bulk_create([ModeleIA(name='Nouveau', version='1', sensibilite=50, typesEpi='casque')])[0]
+
+        self.assertEqual(modeles_actifs.modeles_existants([nouveau.pk, 999999]), {nouveau.pk})
+        modeles_actifs.modeles_actifs()  # Rechargement: le nouveau modèle est maintenant dans le cache
+        with self.assertNumQueries(0):
+            self.assertEqual(modeles_actifs.modeles_existants([nouveau.pk]), {nouveau.pk})
+
+
+class AnnuaireEmployesTests(MediaTemporaireMixin, TestCase):
+    """Employés lus dans l'annuaire en mémoire par l'ingestion, les exports et l'admin."""
+
+    def setUp(self):
+        super().setUp()
+        self.deposer_image('a.jpg')
+        get_annuaire().recharger()
+        self.modele = creer_modele()
+        self.employe = creer_employe()
+
+    def requetes_employes(self, requetes):
+        return [r for r in requetes.captured_queries if 'FROM "employes"' in r['sql']]
+
+    def test_couleur_stable_et_fiche_compacte(self):
+        self.assertEqual(couleur_avatar('Tremblay'), COULEURS_AVATAR[zlib.crc32(b'Tremblay') % len(COULEURS_AVATAR)])
+        fiche = get_annuaire().fiche(self.employe.pk)
+        self.assertEqual((fiche.nom_complet, fiche.initiale, fiche.couleur), ('Tremblay Jean', 'T', couleur_avatar('Tremblay')))
+        self.assertFalse(hasattr(fiche, '__dict__'))
+
+    def test_ingestion_sans_requete_sur_les_employes(self):
+        get_annuaire().fiches([self.employe.pk])
+        detection = {'employee': self.employe.pk, 'modeleIA': self.modele.pk, 'typeEpiManquants': ['casque'], 'image': 'a.jpg'}
+
+        with CaptureQueriesContext(connection) as requetes:
+            creees, erreurs = ingerer_detections([detection, {**detection, 'employee': 999999}])
+
+        self.assertEqual(len(creees), 1)
+        self.assertEqual(list(erreurs), [1])
+        # L'id inconnu est cherché en base, puis les ids retenus sont revérifiés (clés primaires seulement)
+        self.assertEqual(len(self.requetes_employes(requetes)), 2)
+
+    def test_modifications_du_processus(self):
+        annuaire = get_annuaire()
+        annuaire.fiches([self.employe.pk])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.employe.poste = 'Chef d\'équipe'
+            self.employe.save()
+            nouveau = creer_employe(nom='Gagnon')
+        with self.assertNumQueries(0):
+            self.assertEqual(annuaire.fiche(self.employe.pk).poste, 'Chef d\'équipe')
+            self.assertEqual(annuaire.fiche(nouveau.pk).name, 'Gagnon')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            nouveau.delete()
+        self.assertIsNone(annuaire.fiche(nouveau.pk))
+
+    @override_settings(ANNUAIRE_RAFRAICHISSEMENT=0)
+    def test_rafraichissement_incremental(self):
+        annuaire = get_annuaire()
+        annuaire.fiches([self.employe.pk])
+        # Modification par un autre processus (aucun signal dans celui-ci)
+        Employe.objects.filter(pk=self.employe.pk).update(department='Peinture', updated_at=timezone.now())
+
+        with CaptureQueriesContext(connection) as requetes:
+            self.assertEqual(annuaire.fiche(self.employe.pk).department, 'Peinture')
+        lectures = [r['sql'] for r in self.requetes_employes(requetes) if 'COUNT' not in r['sql']]
+        self.assertEqual(len(lectures), 1)
+        self.assertIn('"updated_at" >=', lectures[0])
+
+    @override_settings(ANNUAIRE_RAFRAICHISSEMENT=0)
+    def test_suppression_par_un_autre_processus(self):
+        autre = creer_employe(nom='Gagnon')
+        annuaire = get_annuaire()
+        self.assertEqual(len(annuaire), 2)
+
+        Employe.objects.filter(pk=autre.pk)._raw_delete(connection.alias)  # Ni signal ni on_commit
+
+        self.assertEqual(len(annuaire), 1)
+        self.assertIsNone(annuaire.fiche(autre.pk))
+
+    def test_liste_des_alertes_a_nombre_de_requetes_constant(self):
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'motdepasse'))
+
+        def compter():
+            with CaptureQueriesContext(connection) as requetes:
+                response = self.client.get('/admin/prepa_api_app/alerte/')
+            self.assertEqual(response.status_code, 200)
+            return len(requetes.captured_queries)
+
+        creer_alerte(self.employe, self.modele)
+        petite_page = compter()
+        for i in range(10):
+            creer_alerte(creer_employe(nom=f'Employe{i}'), creer_modele(version=f'2.{i}'))
+
+        self.assertEqual(compter(), petite_page)
+        self.assertContains(self.client.get('/admin/prepa_api_app/alerte/'), 'Employe9')
+
+
+@override_settings(MINIATURES_ASYNC=False)  # Callbacks de commit exécutés: miniatures dans le test
+class TendancesTests(TestCase):
+    """Tendances par département/poste et par heure/jour/semaine, en colonnes, avec ETag."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('superviseur', 'sup@example.com', 'motdepasse')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.modele = creer_modele()
+        self.atelier = creer_employe()
+        self.peinture = creer_employe(nom='Gagnon', department='Peinture', poste='Peintre')
+        # Lundi 2 mars 2026: 9h30 et 10h15 à l'atelier, 9h45 en peinture; mercredi 4 et lundi 9 mars à l'atelier
+        for employe, moment in [
+            (self.atelier, datetime(2026, 3, 2, 9, 30)), (self.atelier, datetime(2026, 3, 2, 10, 15)),
+            (self.peinture, datetime(2026, 3, 2, 9, 45)), (self.atelier, datetime(2026, 3, 4, 8, 0)),
+            (self.atelier, datetime(2026, 3, 9, 8, 0)),
+        ]:
+            with self.captureOnCommitCallbacks(execute=True):
+                alerte = creer_alerte(employe, self.modele)
+            Alerte.objects.filter(pk=alerte.pk).update(created_at=timezone.make_aware(moment))
+        reconstruire()
+
+    def test_par_jour_en_une_requete(self):
+        with self.assertNumQueries(1):
+            resultat = tendances.tendances('day', 'department', datetime(2026, 3, 1).date(), datetime(2026, 3, 4).date())
+
+        self.assertEqual(resultat['intervalles'], ['2026-03-01', '2026-03-02', '2026-03-03', '2026-03-04'])
+        self.assertEqual(resultat['groupes'], ['Atelier', 'Peinture'])
+        self.assertEqual(resultat['series'], [[0, 2, 0, 1], [0, 1, 0, 0]])
+
+    def test_par_semaine_et_par_heure(self):
+        semaines = tendances.tendances('week', 'poste', datetime(2026, 3, 4).date(), datetime(2026, 3, 10).date())
+        self.assertEqual(semaines['intervalles'], ['2026-03-02', '2026-03-09'])
+        self.assertEqual(dict(zip(semaines['groupes'], semaines['series'])), {'Peintre': [1, 0], 'Soudeur': [3, 1]})
+
+        heures = tendances.tendances('hour', 'department', datetime(2026, 3, 2).date(), datetime(2026, 3, 2).date(),
+                                     department='Atelier')
+        self.assertEqual(len(heures['intervalles']), 24)
+        self.assertEqual(heures['intervalles'][9], '2026-03-02T09:00:00-05:00')
+        self.assertEqual(heures['groupes'], ['Atelier'])
+        self.assertEqual([(i, n) for i, n in enumerate(heures['series'][0]) if n], [(9, 1), (10, 1)])
+
+    def test_heures_au_changement_d_heure(self):
+        # 8 mars 2026: passage à l'heure d'été, 23 heures dans la journée
+        heures = tendances.tendances('hour', 'department', datetime(2026, 3, 8).date(), datetime(2026, 3, 8).date())
+        self.assertEqual(len(heures['intervalles']), 23)
+        self.assertEqual(heures['intervalles'][2], '2026-03-08T03:00:00-04:00')
+
+    def test_get_conditionnel(self):
+        url = '/alertes/tendances/?pas=day&debut=2026-03-01&fin=2026-03-10'
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['series'], [[0, 2, 0, 1, 0, 0, 0, 0, 1, 0], [0, 1] + [0] * 8])
+        etag = response['ETag']
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            creer_alerte(self.peinture, self.modele)  # Nouvelle version des données, publiée au commit
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200)  # Lu avant le commit: ni ETag ni cache
+            self.assertNotIn('ETag', response)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_parametres_invalides(self):
+        for requete in ['pas=mois', 'par=niveau', 'debut=hier', 'debut=2026-03-10&fin=2026-03-01',
+                        'pas=hour&debut=2025-01-01&fin=2026-01-01', 'modeleIA=abc', 'statut=FERME', 'niveau=x']:
+            self.assertEqual(self.client.get(f'/alertes/tendances/?{requete}').status_code, 400, requete)
+
+
+PYARROW = importlib.util.find_spec('pyarrow') is not None
+
+
+class ExportAnalytiqueTests(TestCase):
+    """Export Parquet / Arrow IPC des alertes, en flux et incrémental."""
+
+    def setUp(self):
+        get_annuaire().recharger()
+        self.dossier = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dossier, ignore_errors=True)
+        reglages = override_settings(EXPORT_ANALYTIQUE_TAILLE_GROUPE=2)
+        reglages.enable()
+        self.addCleanup(reglages.disable)
+        self.modele = creer_modele()
+        self.atelier = creer_employe()
+        self.peinture = creer_employe(nom='Gagnon', department='Peinture')
+        self.alertes = [
+            creer_alerte(self.atelier, self.modele, niveau='CRITIQUE'),
+            creer_alerte(self.atelier, self.modele),
+            creer_alerte(self.peinture, self.modele, statut='RESOLU'),
+        ]
+
+    def lire(self, donnees, format='parquet'):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if format == 'parquet':
+            return pq.ParquetFile(BytesIO(donnees))
+        return pa.ipc.open_file(pa.BufferReader(donnees))
+
+    @skipUnless(PYARROW, "pyarrow n'est pas installé")
+    def test_parquet_par_groupes_de_lignes(self):
+        fichier = self.lire(b''.join(export_analytique.morceaux(Alerte.objects.all())))
+
+        self.assertEqual(fichier.metadata.num_row_groups, 2)
+        table = fichier.read()
+        self.assertEqual(table.column('id').to_pylist(), [alerte.pk for alerte in self.alertes])
+        self.assertEqual(table.column('niveau').to_pylist(), ['CRITIQUE', 'MOYEN', 'MOYEN'])
+        self.assertEqual(table.column('employee_department').to_pylist(), ['Atelier', 'Atelier', 'Peinture'])
+        self.assertEqual(str(table.schema.field('employee_department').type), 'dictionary<values=string, indices=int32, ordered=0>')
+        self.assertEqual(table.column('created_at').to_pylist()[0], self.alertes[0].created_at)
+
+    @skipUnless(PYARROW, "pyarrow n'est pas installé")
+    def test_arrow_dictionnaires_prolonges(self):
+        # Le second lot ajoute 'Peinture' au dictionnaire des départements (delta)
+        fichier = self.lire(b''.join(export_analytique.morceaux(Alerte.objects.all(), 'arrow')), 'arrow')
+
+        self.assertEqual(fichier.num_record_batches, 2)
+        table = fichier.read_all()
+        self.assertEqual(table.column('employee_department').to_pylist(), ['Atelier', 'Atelier', 'Peinture'])
+        self.assertEqual(table.column('statut').to_pylist(), ['NOUVEAU', 'NOUVEAU', 'RESOLU'])
+        self.assertEqual(table.column('modeleIA_version').to_pylist(), ['1.0'] * 3)
+
+    @skipUnless(PYARROW, "pyarrow n'est pas installé")
+    def test_export_incremental(self):
+        chemin, lignes = export_analytique.exporter_increment(self.dossier)
+        self.assertEqual(lignes, 3)
+        self.assertEqual(os.path.basename(chemin), f'alertes_{self.alertes[0].pk:012d}_{self.alertes[2].pk:012d}.parquet')
+
+        self.assertEqual(export_analytique.exporter_increment(self.dossier), (None, 0))
+        nouvelle = creer_alerte(self.peinture, self.modele)
+        chemin, lignes = export_analytique.exporter_increment(self.dossier)
+
+        self.assertEqual(lignes, 1)
+        self.assertEqual(self.lire(open(chemin, 'rb').read()).read().column('id').to_pylist(), [nouvelle.pk])
+        self.assertEqual(len(os.listdir(self.dossier)), 2)  # Un fichier par passage, pas de fichier temporaire
+        marque = ExportAnalytique.objects.get(nom='alertes')
+        self.assertEqual((marque.dernier_id, marque.lignes, marque.fichiers), (nouvelle.pk, 4, 2))
+
+    @skipUnless(PYARROW, "pyarrow n'est pas installé")
+    def test_commande_et_action_admin(self):
+        sortie = StringIO()
+        call_command('exporter_alertes', '--format', 'arrow', '--dossier', self.dossier, stdout=sortie)
+        self.assertIn('3 alerte(s) exportée(s)', sortie.getvalue())
+        call_command('exporter_alertes', '--dossier', self.dossier, '--reinitialiser', stdout=sortie)
+        self.assertEqual(len(os.listdir(self.dossier)), 2)
+
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'motdepasse'))
+        response = self.client.post('/admin/prepa_api_app/alerte/', {
+            'action': 'exporter_alertes_parquet', '_selected_action': [self.alertes[0].pk, self.alertes[2].pk],
+        })
+        self.assertEqual(response['Content-Type'], 'application/vnd.apache.parquet')
+        table = self.lire(b''.join(response.streaming_content)).read()
+        self.assertEqual(table.column('id').to_pylist(), [self.alertes[0].pk, self.alertes[2].pk])
+
+    def test_sans_pyarrow(self):
+        with mock.patch.dict(sys.modules, {'pyarrow': None}):
+            with self.assertRaisesMessage(CommandError, 'pyarrow'):
+                call_command('exporter_alertes', '--dossier', self.dossier, stdout=StringIO())
+        self.assertFalse(ExportAnalytique.objects.exists())
+
+
+@skipUnless(connection.vendor == 'postgresql' and PYARROW, "écritures concurrentes vérifiées sur PostgreSQL, avec pyarrow")
+@override_settings(EXPORT_ANALYTIQUE_ATTENTE_VERROU=0.2)
+class ExportAnalytiqueConcurrentTests(TransactionTestCase):
+    """Une alerte validée après une alerte d'id supérieur n'est pas sautée par la marque."""
+
+    def setUp(self):
+        self.dossier = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dossier, ignore_errors=True)
+        self.modele = creer_modele()
+        self.employe = creer_employe()
+        self.premiere = creer_alerte(self.employe, self.modele, image='')  # Sans image: pas de miniature au commit
+
+    def test_alerte_validee_en_retard(self):
+        autre = connections.create_connection('default')
+        self.addCleanup(autre.close)
+        colonnes = ', '.join(autre.ops.quote_name(champ.column) for champ in Alerte._meta.concrete_fields if not champ.primary_key)
+        autre.set_autocommit(False)
+        with autre.cursor() as cursor:
+            cursor.execute(f'INSERT INTO alertes ({colonnes}) SELECT {colonnes} FROM alertes WHERE id = %s RETURNING id',
+                           [self.premiere.pk])
+            en_retard = cursor.fetchone()[0]
+        suivante = creer_alerte(self.employe, self.modele, image='')
+        self.assertGreater(suivante.pk, en_retard)
+
+        # Transaction encore en cours: le passage est reporté plutôt que d'avancer la marque au-delà
+        self.assertEqual(export_analytique.exporter_increment(self.dossier), (None, 0))
+        autre.commit()
+        chemin, lignes = export_analytique.exporter_increment(self.dossier)
+
+        self.assertEqual(lignes, 3)
+        import pyarrow.parquet as pq
+        self.assertEqual(pq.read_table(chemin).column('id').to_pylist(), [self.premiere.pk, en_retard, suivante.pk])
+
+
+class ChangementsTests(TransactionTestCase):
+    """Flux de changements des alertes et employés: curseur (position_flux, id), lots bornés, suppressions.
+    Transactions validées une à une: sur PostgreSQL, la position est celle de la transaction."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user('bi', 'bi@example.com', 'motdepasse'))
+        self.modele = creer_modele()
+        self.employe = creer_employe()
+        self.alertes = [creer_alerte(self.employe, self.modele, image='') for _ in range(5)]
+
+    def lire(self, source='alertes', curseur=None, taille=2):
+        parametres = {'taille': taille}
+        if curseur:
+            parametres['curseur'] = curseur
+        response = self.client.get(f'/changements/{source}/', parametres)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def parcourir(self, curseur=None, source='alertes'):
+        ids, supprimes = [], []
+        while True:
+            page = self.lire(source, curseur)
+            ids += [ligne['id'] for ligne in page['changements']]
+            supprimes += [suppression['id'] for suppression in page['suppressions']]
+            curseur = page['curseur']
+            if not page['encore']:
+                return ids, supprimes, curseur
+
+    def test_parcours_par_lots_et_egalites(self):
+        # Une seule transaction: même position partout sur PostgreSQL, le départage par id doit tenir
+        Alerte.objects.update(commentaire='lot')
+        ids, supprimes, curseur = self.parcourir()
+
+        self.assertEqual(ids, [alerte.pk for alerte in self.alertes])
+        self.assertEqual(supprimes, [])
+        self.assertEqual(self.lire(curseur=curseur)['changements'], [])
+
+        changer_statut(Alerte.objects.filter(pk=self.alertes[2].pk), statut='RESOLU')
+        page = self.lire(curseur=curseur)
+        self.assertEqual([(ligne['id'], ligne['statut']) for ligne in page['changements']], [(self.alertes[2].pk, 'RESOLU')])
+
+    def test_suppressions(self):
+        ids_alertes, id_employe = [alerte.pk for alerte in self.alertes], self.employe.pk
+        _, _, curseur = self.parcourir()
+        self.alertes[0].delete()
+        ids, supprimes, curseur_alertes = self.parcourir(curseur)
+        self.assertEqual((ids, supprimes), ([], ids_alertes[:1]))
+
+        _, _, curseur_employes = self.parcourir(source='employes')
+        self.employe.delete()  # Cascade: les alertes restantes sont supprimées aussi
+        self.assertEqual(self.parcourir(curseur_employes, 'employes')[:2], ([], [id_employe]))
+        self.assertEqual(sorted(self.parcourir(curseur_alertes)[1]), ids_alertes[1:])
+        self.assertEqual(Suppression.objects.count(), 6)
+        # Compteurs par modèle à jour, ceux de l'employé supprimés avec lui
+        self.assertEqual(MetriquesModeleIA.objects.get(modeleIA=self.modele).total, 0)
+        self.assertFalse(MetriquesEmployeModele.objects.exists())
+
+        creer_alerte(creer_employe(nom='Gagnon'), self.modele, image='')
+        self.modele.delete()
+        self.assertFalse(StatistiqueAlerteJournaliere.objects.exists())
+
+    def test_suppression_en_lot(self):
+        def requetes(employe, nombre):
+            enregistrer_creations(Alerte.objects.bulk_create([
+                Alerte(employee=employe, modeleIA=self.modele, typeEpiManquants='casque', image='a.jpg')
+                for _ in range(nombre)
+            ]))
+            with CaptureQueriesContext(connection) as contexte:
+                employe.delete()
+            return len(contexte.captured_queries)
+
+        # Effets groupés (compteurs, références, flux): même nombre de requêtes pour 5 ou 50 alertes
+        self.assertEqual(requetes(creer_employe(nom='Gagnon'), 5), requetes(creer_employe(nom='Roy'), 50))
+        self.assertEqual(Suppression.objects.filter(type='alerte').count(), 55)
+
+        Alerte.objects.filter(pk__in=[alerte.pk for alerte in self.alertes[:3]]).delete()
+        self.assertEqual(Suppression.objects.filter(type='alerte').count(), 58)
+        self.assertEqual(MetriquesModeleIA.objects.get(modeleIA=self.modele).total, 2)
+        self.assertEqual(StatistiqueAlerteJournaliere.objects.get().total, 2)
+
+    def test_lecture_sans_signal_post_init(self):
+        self.assertFalse(post_init.has_listeners(Alerte))
+        alerte = Alerte.objects.only('id').get(pk=self.alertes[0].pk)  # Instance partielle: clé d'origine inconnue
+        self.assertEqual(alerte._initial, {'id': alerte.pk})
+
+    def test_employes_modifies(self):
+        autre = creer_employe(nom='Gagnon')
+        _, _, curseur = self.parcourir(source='employes')
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'motdepasse'))
+        self.client.post('/admin/prepa_api_app/employe/', {'action': 'desactiver_employes', '_selected_action': [autre.pk]})
+
+        page = self.lire('employes', curseur)
+        self.assertEqual([(ligne['id'], ligne['status']) for ligne in page['changements']], [(autre.pk, 'INACTIF')])
+
+    @skipUnless(connection.vendor == 'postgresql', "écritures concurrentes vérifiées sur PostgreSQL seulement")
+    def test_transaction_en_cours_retient_le_flux(self):
+        _, _, curseur = self.parcourir()
+        autre = connections.create_connection('default')
+        self.addCleanup(autre.close)
+        autre.set_autocommit(False)
+        with autre.cursor() as cursor:
+            cursor.execute("UPDATE alertes SET commentaire = 'en retard' WHERE id = %s", [self.alertes[0].pk])
+        changer_statut(Alerte.objects.filter(pk=self.alertes[1].pk), statut='RESOLU')
+
+        # Validée après, mais commencée avant: rien n'est rendu tant que l'autre transaction est en cours
+        self.assertEqual(self.lire(curseur=curseur)['changements'], [])
+        autre.commit()
+        ids, _, _ = self.parcourir(curseur)
+        self.assertEqual(ids, [self.alertes[0].pk, self.alertes[1].pk])
+
+    def test_parametres(self):
+        self.assertEqual(self.client.get('/changements/alertes/', {'curseur': 'invalide'}).status_code, 400)
+        self.assertEqual(self.client.get('/changements/modeles/').status_code, 404)
+
+    def test_requetes_constantes(self):
+        with self.assertNumQueries(2):  # Lignes (avec employé et modèle IA) et suppressions
+            self.lire(taille=100)
@@ -0,0 +1,94 @@
+# transitions.py
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Case, F, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .delais import STATUTS_TRAITES, appliquer_delais, horodater, variation
+from .models import Alerte, HistoriqueStatutAlerte
+from .statistiques import appliquer_deltas
+from .temps_reel import publier_alertes
+
+# Lignes d'historique par INSERT (SQLite redécoupe de lui-même sous sa limite de paramètres)
+TAILLE_LOT_HISTORIQUE = 1000
+
+
+#Service de transition de statut/niveau des alertes, utilisé par les actions de l'admin et l'API.
+#Quel que soit le nombre d'alertes: un SELECT ... FOR UPDATE, un bulk_create de l'historique, un UPDATE
+#et l'upsert des statistiques journalières et des histogrammes de délais.
+
+def changer_statut(queryset, utilisateur=None, statut=None, niveau=None):
+    """Applique statut et/ou niveau aux alertes du queryset et trace chaque changement.
+
+    Retourne la liste des ids modifiés (les alertes déjà dans l'état demandé sont ignorées).
+    """
+    if statut is None and niveau is None:
+        raise ValueError("Un statut ou un niveau est requis.")
+    if utilisateur is not None and not utilisateur.is_authenticated:
+        utilisateur = None
+
+    with transaction.atomic():
+        lignes = list(queryset.select_for_update(of=('self',)).order_by().values_list(
+            'id', 'created_at', 'employee_id', 'modeleIA_id', 'statut', 'niveau',
+            'employee__department', 'pris_en_charge_at', 'traite_at',
+        ))
+        # Horodatage pris une fois les verrous obtenus: l'attente d'une transaction concurrente ne le fait pas
+        # passer avant les écritures de celle-ci
+        maintenant = timezone.now()
+
+        historique = []
+        deltas = Counter()
+        delais = Counter()
+        for pk, created_at, employe, modele, statut_avant, niveau_avant, department, *horodatage in lignes:
+            statut_apres = statut or statut_avant
+            niveau_apres = niveau or niveau_avant
+            if (statut_apres, niveau_apres) == (statut_avant, niveau_avant):
+                continue
+            nouvel_horodatage = horodatage
+            if statut_apres != statut_avant:
+                nouvel_horodatage = horodater(statut_avant, statut_apres, *horodatage, maintenant)
+            delais.update(variation(
+                (modele, department, niveau_avant, created_at, *horodatage),
+                (modele, department, niveau_apres, created_at, *nouvel_horodatage),
+            ))
+            historique.append(HistoriqueStatutAlerte(
+                alerte_id=pk,
+                utilisateur=utilisateur,
+                statut_avant=statut_avant,
+                statut_apres=statut_apres,
+                niveau_avant=niveau_avant,
+                niveau_apres=niveau_apres,
+                created_at=maintenant,
+            ))
+            jour = timezone.localdate(created_at)
+            deltas[(jour, employe, modele, statut_avant, niveau_avant)] -= 1
+            deltas[(jour, employe, modele, statut_apres, niveau_apres)] += 1
+
+        ids = [ligne.alerte_id for ligne in historique]
+        if not ids:
+            return ids
+
+        changements = {'updated_at': maintenant}
+        if statut:
+            changements['statut'] = statut
+            # Mêmes règles que horodater(), en SQL: les valeurs lues à droite sont celles d'avant l'UPDATE
+            if statut != 'NOUVEAU':
+                changements['pris_en_charge_at'] = Coalesce(F('pris_en_charge_at'), Value(maintenant))
+            if statut in STATUTS_TRAITES:
+                changements['traite_at'] = Case(
+                    When(statut__in=STATUTS_TRAITES, traite_at__isnull=False, then=F('traite_at')),
+                    default=Value(maintenant),
+                )
+            else:
+                changements['traite_at'] = None
+        if niveau:
+            changements['niveau'] = niveau
+
+        HistoriqueStatutAlerte.objects.bulk_create(historique, batch_size=TAILLE_LOT_HISTORIQUE)
+        Alerte.objects.filter(pk__in=ids).update(**changements)
+        appliquer_deltas(deltas)
+        appliquer_delais(delais)
+        publier_alertes(ids, 'modification')
+    return ids
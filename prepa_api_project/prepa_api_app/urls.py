@@ -1,8 +1,25 @@
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
+from prepa_api_app import async_views, views
+
 router = DefaultRouter()
 
+# Appeler en GET
+router.register(r'alertes', views.AlerteViewSet, basename='alerte')  # Liste paginée et filtrée, détail d'une alerte
+
+# Les routes manuelles sont déclarées avant le router: 'alertes/ingestion/' serait sinon pris pour 'alertes/<pk>/'.
 urlpatterns = [
+    # Appeler en POST
+    path('alertes/ingestion/', views.AlerteIngestionView.as_view()),  # Lot de détections des caméras
+    path('alertes/transitions/', views.AlerteTransitionView.as_view()),  # Statut/niveau d'un lot d'alertes
+
+    # Appeler en GET
+    path('modeles/comparaison/', views.ModeleComparaisonView.as_view()),  # Métriques de plusieurs modèles IA
+    path('changements/<str:source>/', views.ChangementsView.as_view()),  # Flux de changements: alertes ou employes
+
+    # Appeler en GET (EventSource), servi par ASGI
+    path('alertes/flux/', async_views.flux_alertes),  # Alertes créées/modifiées en temps réel (SSE)
+
     path('', include(router.urls)),
 ]
\ No newline at end of file
@@ -0,0 +1,25 @@
+import csv
+
+from django.http import StreamingHttpResponse
+
+
+class Echo:
+    """Pseudo-buffer: csv.writer écrit une ligne, on la renvoie telle quelle au générateur."""
+
+    def write(self, value):
+        return value
+
+
+def reponse_csv_streaming(nom_fichier, entetes, lignes):
+    """StreamingHttpResponse CSV (séparateur ';' et BOM pour Excel) produite ligne par ligne."""
+    writer = csv.writer(Echo(), delimiter=';')
+
+    def contenu():
+        yield '\ufeff'  # BOM pour Excel
+        yield writer.writerow(entetes)
+        for ligne in lignes:
+            yield writer.writerow(ligne)
+
+    response = StreamingHttpResponse(contenu(), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{nom_fichier}"'
+    return response
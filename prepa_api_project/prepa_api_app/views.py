@@ -1,11 +1,31 @@
 # views.py
 
+from django.conf import settings
+from django.core.cache import cache
 from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response
+from django.utils.dateparse import parse_date
 from rest_framework import status, viewsets, permissions
+from rest_framework.decorators import action
+from rest_framework.fields import DateTimeField
 from rest_framework.response import Response
 from rest_framework.views import APIView
 import logging
 from rest_framework.permissions import IsAuthenticated
+from django_filters.rest_framework import DjangoFilterBackend
+
+from .cache import versions_en_attente
+from .changements import changements
+from .delais import statistiques_delais
+from .epi import compter_par_epi
+from .filters import AlerteFilter
+from .ingestion import ingerer_detections
+from .models import Alerte, Employe, HistogrammeDelaiAlerte, HistoriqueStatutAlerte
+from .pagination import KeysetPagination
+from .serializers import AlerteSerializer, EmployeSerializer, HistoriqueStatutSerializer, TransitionSerializer
+from .statistiques import comparer_modeles
+from .tendances import FILTRES, GROUPES, PAS, empreinte, fenetre_par_defaut, nombre_intervalles, tendances
+from .transitions import changer_statut
 
 logger = logging.getLogger(__name__)
 
@@ -15,4 +35,234 @@ logger = logging.getLogger(__name__)
 
 #Une view par exmple pour gerer l'historique d'un Model d'API et ou d'obtenir les API toutes
 
-# Faut penser qu'on fera des diagrammes cotÉ FrontEND 
\ No newline at end of file
+# Faut penser qu'on fera des diagrammes cotÉ FrontEND (données agrégées: AlerteViewSet.tendances, epi, delais)
+
+#Filtres des agrégats (delais, tendances) lus dans la query string et validés avant la requête:
+#une valeur invalide (?modeleIA=abc, ?niveau=X) donne un 400 et non une erreur 500 de la base.
+CHOIX_FILTRES = {'statut': dict(Alerte.STATUT_CHOICES), 'niveau': dict(Alerte.NIVEAU_CHOICES)}
+
+
+def filtres_agregats(params, champs):
+    """{champ: valeur} des `champs` présents dans `params`. ValueError (message pour le client) si invalide."""
+    filtres = {}
+    for champ in champs:
+        valeur = params.get(champ)
+        if not valeur:
+            continue
+        if champ == 'modeleIA':
+            try:
+                valeur = int(valeur)
+            except ValueError:
+                raise ValueError("modeleIA doit être un identifiant entier")
+        elif champ in CHOIX_FILTRES and valeur not in CHOIX_FILTRES[champ]:
+            raise ValueError(f"{champ} doit valoir {', '.join(CHOIX_FILTRES[champ])}")
+        filtres[champ] = valeur
+    return filtres
+
+
+#Cette View reçoit un lot de détections des caméras (POST) et crée toutes les alertes valides en une transaction.
+#Le corps est soit une liste de détections, soit {"detections": [...]}.
+class AlerteIngestionView(APIView):
+    http_method_names = ['post']
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        detections = request.data if isinstance(request.data, list) else request.data.get('detections')
+        if not isinstance(detections, list) or not detections:
+            return Response({"error": "Une liste de détections est requise"}, status=status.HTTP_400_BAD_REQUEST)
+        if len(detections) > settings.ALERTES_INGESTION_MAX_LOT:
+            return Response(
+                {"error": f"Lot trop volumineux (maximum {settings.ALERTES_INGESTION_MAX_LOT} détections)"},
+                status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+            )
+
+        creees, erreurs = ingerer_detections(detections)
+        logger.info("Ingestion: %d alerte(s) créée(s), %d rejetée(s)", len(creees), len(erreurs))
+
+        if not erreurs:
+            code = status.HTTP_201_CREATED
+        elif creees:
+            code = status.HTTP_207_MULTI_STATUS  # Lot partiellement accepté
+        else:
+            code = status.HTTP_400_BAD_REQUEST
+
+        return Response({
+            'crees': len(creees),
+            'ids': [alerte.id for alerte in creees],
+            'erreurs': [{'index': index, 'details': details} for index, details in sorted(erreurs.items())],
+        }, status=code)
+
+
+#Cette View change le statut et/ou le niveau d'un lot d'alertes (POST), avec historique, en un nombre fixe de requêtes.
+#Corps: {"ids": [1, 2, ...], "statut": "RESOLU", "niveau": "CRITIQUE"} (statut et/ou niveau).
+class AlerteTransitionView(APIView):
+    http_method_names = ['post']
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        serializer = TransitionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = set(serializer.validated_data['ids'])
+        if len(ids) > settings.ALERTES_TRANSITION_MAX_LOT:
+            return Response(
+                {"error": f"Lot trop volumineux (maximum {settings.ALERTES_TRANSITION_MAX_LOT} alertes)"},
+                status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+            )
+
+        modifiees = changer_statut(
+            Alerte.objects.filter(pk__in=ids),
+            request.user,
+            statut=serializer.validated_data.get('statut'),
+            niveau=serializer.validated_data.get('niveau'),
+        )
+        logger.info("Transition: %d alerte(s) modifiée(s) par %s", len(modifiees), request.user)
+
+        return Response({
+            'modifiees': len(modifiees),
+            'ids': modifiees,
+            'inchangees': len(ids) - len(modifiees),  # Déjà dans l'état demandé, ou introuvables
+        })
+
+
+#Cette View compare les métriques de plusieurs versions de modèles IA (GET), en une seule requête.
+#?ids=1,2,3 pour choisir les modèles; sans paramètre, tous les modèles.
+class ModeleComparaisonView(APIView):
+    http_method_names = ['get']
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        ids = None
+        if request.query_params.get('ids'):
+            try:
+                ids = {int(valeur) for valeur in request.query_params['ids'].split(',') if valeur.strip()}
+            except ValueError:
+                return Response({"error": "ids doit être une liste d'entiers séparés par des virgules"},
+                                status=status.HTTP_400_BAD_REQUEST)
+            if len(ids) > settings.MODELES_COMPARAISON_MAX:
+                return Response(
+                    {"error": f"Trop de modèles (maximum {settings.MODELES_COMPARAISON_MAX})"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+        return Response(comparer_modeles(ids))
+
+
+#Cette View sert le flux de changements (GET) des alertes ou des employés pour les systèmes en aval:
+#?curseur=...&taille=... Sans curseur, tout depuis le début; ensuite, le curseur rendu par la réponse précédente.
+#Réponse: lignes créées/modifiées, ids supprimés, curseur suivant et "encore" (relire tout de suite si vrai).
+class ChangementsView(APIView):
+    http_method_names = ['get']
+    permission_classes = [IsAuthenticated]
+    sources = {
+        'alertes': (Alerte.objects.select_related('employee', 'modeleIA'), AlerteSerializer),
+        'employes': (Employe.objects.all(), EmployeSerializer),
+    }
+
+    def get(self, request, source):
+        if source not in self.sources:
+            return Response({"error": "Source inconnue (alertes ou employes)"}, status=status.HTTP_404_NOT_FOUND)
+        queryset, serializer_class = self.sources[source]
+        try:
+            taille = int(request.query_params.get('taille', settings.CHANGEMENTS_TAILLE))
+        except ValueError:
+            return Response({"error": "taille doit être un entier"}, status=status.HTTP_400_BAD_REQUEST)
+        taille = max(1, min(taille, settings.CHANGEMENTS_MAX_TAILLE))
+        try:
+            page = changements(source, request.query_params.get('curseur'), taille, queryset=queryset)
+        except ValueError:
+            return Response({"error": "Curseur invalide"}, status=status.HTTP_400_BAD_REQUEST)
+
+        date = DateTimeField()  # Même format que les dates des lignes
+        return Response({
+            'changements': serializer_class(page['lignes'], many=True, context={'request': request}).data,
+            'suppressions': [{'id': pk, 'supprime_at': date.to_representation(moment)} for pk, moment in page['suppressions']],
+            'curseur': page['curseur'],
+            'encore': page['encore'],
+        })
+
+
+#Ce ViewSet permet de parcourir les alertes (GET), filtrées par statut/niveau/employé/modèle/département/dates,
+#avec une pagination par curseur (voir pagination.py).
+class AlerteViewSet(viewsets.ReadOnlyModelViewSet):
+    queryset = Alerte.objects.select_related('employee', 'modeleIA')
+    serializer_class = AlerteSerializer
+    permission_classes = [IsAuthenticated]
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = AlerteFilter
+    pagination_class = KeysetPagination
+
+    #Nombre d'alertes par type d'EPI manquant, avec les mêmes filtres que la liste (un seul agrégat)
+    @action(detail=False, methods=['get'])
+    def epi(self, request):
+        queryset = self.filter_queryset(Alerte.objects.all())
+        return Response(compter_par_epi(queryset))
+
+    #Percentiles des délais de prise en charge ou de traitement, lus dans les histogrammes (une requête):
+    #?etape=PRISE_EN_CHARGE|TRAITEMENT&par=department|modeleIA|niveau&department=...&modeleIA=...&niveau=...
+    @action(detail=False, methods=['get'])
+    def delais(self, request):
+        etape = request.query_params.get('etape', 'TRAITEMENT').upper()
+        par = request.query_params.get('par') or None
+        if etape not in dict(HistogrammeDelaiAlerte.ETAPE_CHOICES):
+            return Response({"error": "etape doit valoir PRISE_EN_CHARGE ou TRAITEMENT"}, status=status.HTTP_400_BAD_REQUEST)
+        if par not in (None, 'department', 'modeleIA', 'niveau'):
+            return Response({"error": "par doit valoir department, modeleIA ou niveau"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            filtres = filtres_agregats(request.query_params, ('department', 'modeleIA', 'niveau'))
+        except ValueError as erreur:
+            return Response({"error": str(erreur)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'etape': etape, 'par': par, 'groupes': statistiques_delais(etape, par, **filtres)})
+
+    #Nombre d'alertes par département ou poste et par heure/jour/semaine, en colonnes, pour les graphiques:
+    #?pas=hour|day|week&par=department|poste&debut=AAAA-MM-JJ&fin=AAAA-MM-JJ&department=...&poste=...
+    #&modeleIA=...&statut=...&niveau=... ETag sur la version des données: GET conditionnel (304).
+    @action(detail=False, methods=['get'])
+    def tendances(self, request):
+        pas = request.query_params.get('pas', 'day')
+        par = request.query_params.get('par', 'department')
+        if pas not in PAS:
+            return Response({"error": "pas doit valoir hour, day ou week"}, status=status.HTTP_400_BAD_REQUEST)
+        if par not in GROUPES:
+            return Response({"error": "par doit valoir department ou poste"}, status=status.HTTP_400_BAD_REQUEST)
+        debut, fin = fenetre_par_defaut(pas)
+        try:
+            debut = parse_date(request.query_params['debut']) if request.query_params.get('debut') else debut
+            fin = parse_date(request.query_params['fin']) if request.query_params.get('fin') else fin
+        except ValueError:
+            debut = None
+        if debut is None or fin is None or debut > fin:
+            return Response({"error": "debut et fin doivent être des dates AAAA-MM-JJ, debut <= fin"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if nombre_intervalles(pas, debut, fin) > settings.TENDANCES_MAX_INTERVALLES:
+            return Response(
+                {"error": f"Fenêtre trop longue (maximum {settings.TENDANCES_MAX_INTERVALLES} intervalles)"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            filtres = filtres_agregats(request.query_params, FILTRES)
+        except ValueError as erreur:
+            return Response({"error": str(erreur)}, status=status.HTTP_400_BAD_REQUEST)
+
+        if versions_en_attente():
+            # Transaction avec des changements pas encore publiés: ni cache ni ETag sous l'ancienne version
+            reponse = Response(tendances(pas, par, debut, fin, **filtres))
+            reponse['Cache-Control'] = 'private, no-store'
+            return reponse
+
+        etag = empreinte(pas, par, debut, fin, **filtres)
+        reponse = get_conditional_response(request, etag=etag)
+        if reponse is None:
+            cle = f'tendances:{etag}'
+            donnees = cache.get(cle)
+            if donnees is None:
+                donnees = tendances(pas, par, debut, fin, **filtres)
+                cache.set(cle, donnees, settings.PANNEAUX_CACHE_TIMEOUT)
+            reponse = Response(donnees)
+        reponse['ETag'] = etag
+        reponse['Cache-Control'] = 'private, no-cache'  # Revalidé à chaque affichage (304 si rien n'a changé)
+        return reponse
+
+    #Historique des changements de statut/niveau d'une alerte (plus récent d'abord)
+    @action(detail=True, methods=['get'])
+    def historique(self, request, pk=None):
+        historique = HistoriqueStatutAlerte.objects.filter(alerte=self.get_object()).select_related('utilisateur')
+        return Response(HistoriqueStatutSerializer(historique, many=True).data)
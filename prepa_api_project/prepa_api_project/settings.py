@@ -41,6 +41,7 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
     'rest_framework',
     'rest_framework_simplejwt',
+    'django_filters',
     'prepa_api_app',
     'prepa_Auth_app',
 ]
@@ -130,6 +131,25 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'static')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
 
+# Service de /media/ (voir prepa_api_app/medias.py):
+#   'django': vue statique de Django (développement, DEBUG uniquement)
+#   'sendfile': vue FileResponse avec ETag, 304 et Range; le serveur WSGI envoie le fichier par os.sendfile
+#   'x-accel-redirect': nginx envoie le fichier (location interne MEDIA_ACCEL_PREFIX -> MEDIA_ROOT)
+#   'x-sendfile': Apache mod_xsendfile (ou lighttpd) envoie le fichier
+MEDIA_SERVING = os.environ.get('MEDIA_SERVING', 'django')
+MEDIA_ACCEL_PREFIX = '/protected-media/'
+MEDIA_CACHE_MAX_AGE = 86400  # Secondes, pour les fichiers dont le nom ne dépend pas du contenu
+
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+    # Images des alertes stockées par contenu (sha256): une image identique n'est écrite qu'une fois
+    'images_alertes': {
+        'BACKEND': 'prepa_api_app.stockage.StockageParContenu',
+        'OPTIONS': {'dossier': 'alertes/cas'},
+    },
+}
+
 REST_FRAMEWORK = {
     #'PAGE_SIZE': 10,
     #'DEFAULT_PAGINATION_CLASS':
@@ -140,6 +160,99 @@ REST_FRAMEWORK = {
     'COERCE_DECIMAL_TO_STRING': False,
 }
 
+# Cache: mémoire locale (défaut, par processus) ou fichiers partagés entre les workers (CACHE_BACKEND=fichier)
+CACHE_BACKENDS = {
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'prepa',
+    },
+    'fichier': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache'),
+    },
+}
+CACHES = {
+    'default': CACHE_BACKENDS[os.environ.get('CACHE_BACKEND', 'locmem')],
+}
+PANNEAUX_CACHE_TIMEOUT = 300  # Durée max (s) d'un panneau de statistiques en cache (les "il y a X min" vieillissent)
+
+# reCAPTCHA (voir prepa_Auth_app/utils.py)
+RECAPTCHA_SECRET_KEY = os.environ.get('RECAPTCHA_SECRET_KEY', '')
+RECAPTCHA_BACKEND = os.environ.get('RECAPTCHA_BACKEND', 'prepa_Auth_app.utils.GoogleRecaptchaBackend')
+RECAPTCHA_TIMEOUT = (2, 3)  # (connexion, lecture) en secondes
+RECAPTCHA_POOL_SIZE = 10  # Connexions keep-alive gardées ouvertes vers Google
+RECAPTCHA_CACHE_TTL = 120  # Durée (s) pendant laquelle un jeton déjà présenté est refusé (usage unique)
+RECAPTCHA_LOCAL_LATENCY = 0  # Latence simulée (s) par LocalRecaptchaBackend
+
+# Dernière connexion (voir prepa_Auth_app/last_login.py): en différé, last_login est gardé en mémoire
+# et écrit en lot, la connexion ne fait alors plus aucune écriture en base.
+LAST_LOGIN_DEFERRED = os.environ.get('LAST_LOGIN_DEFERRED', '') == '1'
+LAST_LOGIN_FLUSH_INTERVAL = 30  # Secondes entre deux écritures en lot
+
+# Ingestion des détections des caméras (voir prepa_api_app/ingestion.py)
+ALERTES_INGESTION_MAX_LOT = 5000  # Nombre maximal de détections par requête
+ALERTES_INGESTION_TAILLE_LOT = 1000  # Nombre de lignes par INSERT du bulk_create
+ALERTES_TRANSITION_MAX_LOT = 10000  # Nombre maximal d'alertes par transition en lot (API)
+MODELES_COMPARAISON_MAX = 200  # Nombre maximal de modèles IA comparés par requête (API)
+
+# Cache des modèles IA de l'ingestion (voir prepa_api_app/modeles_actifs.py), en secondes: relecture du
+# compteur de version partagé, et âge maximal de la copie locale (délai maximal de prise en compte)
+MODELES_IA_CACHE_VERIFICATION = 2
+MODELES_IA_CACHE_TTL = 60
+
+# Annuaire des employés en mémoire (voir prepa_api_app/annuaire.py), en secondes: rafraîchissement
+# incrémental (updated_at) et rechargement complet (suppressions, mises à jour en lot)
+ANNUAIRE_RAFRAICHISSEMENT = 5
+ANNUAIRE_RECHARGEMENT = 300
+
+# Tendances par département/poste (voir prepa_api_app/tendances.py): fenêtre par défaut (jours) par pas,
+# et nombre maximal d'intervalles par réponse
+TENDANCES_FENETRES = {'hour': 2, 'day': 90, 'week': 364}
+TENDANCES_MAX_INTERVALLES = 1000
+
+# Flux de changements des alertes et employés (voir prepa_api_app/changements.py). Pas de marge d'horloge:
+# une transaction restée ouverte retarde le flux jusqu'à sa fin (position_flux.py).
+CHANGEMENTS_TAILLE = 500  # Changements par réponse par défaut
+CHANGEMENTS_MAX_TAILLE = 5000
+
+# Délais cibles (SLA, en minutes) par niveau de gravité (voir prepa_api_app/delais.py): prise en charge
+# (sortie de NOUVEAU) et traitement (passage à RESOLU/IGNORE), comptés depuis la création de l'alerte.
+ALERTES_SLA_PRISE_EN_CHARGE = {'CRITIQUE': 15, 'ELEVE': 60, 'MOYEN': 240, 'FAIBLE': 1440}
+ALERTES_SLA_TRAITEMENT = {'CRITIQUE': 240, 'ELEVE': 1440, 'MOYEN': 4320, 'FAIBLE': 10080}
+
+# Partitionnement mensuel et rétention de la table des alertes (PostgreSQL, commande partitions_alertes)
+ALERTES_PARTITIONS_AVANCE = 3  # Mois futurs pré-créés
+ALERTES_RETENTION_MOIS = 24  # Mois complets gardés en base; les plus anciens sont archivés puis supprimés
+ALERTES_ARCHIVES_DIR = os.path.join(BASE_DIR, 'archives')
+
+# Export analytique Parquet / Arrow IPC des alertes (voir prepa_api_app/export_analytique.py, demande pyarrow)
+EXPORT_ANALYTIQUE_DIR = os.path.join(BASE_DIR, 'exports')
+EXPORT_ANALYTIQUE_TAILLE_GROUPE = 100000  # Lignes par groupe de lignes (Parquet) / lot (Arrow)
+EXPORT_ANALYTIQUE_COMPRESSION = 'zstd'
+EXPORT_ANALYTIQUE_ATTENTE_VERROU = 5  # Secondes d'attente des écritures en cours avant de reporter le passage
+
+# Miniatures des images d'alertes (voir prepa_api_app/miniatures.py)
+MINIATURES_ACTIVES = True
+MINIATURES_ASYNC = True  # False: génération dans le processus au commit (tests)
+MINIATURES_WORKERS = 2
+MINIATURES_TAILLE = (120, 120)  # Pixels, recadrage centré (affichées en 50-60 px dans l'admin, écrans HiDPI compris)
+MINIATURES_FORMAT = 'WEBP'  # ou 'JPEG'
+MINIATURES_QUALITE = 80
+
+# Images quasi identiques (voir prepa_api_app/stockage.py): 0 désactive la détection par hash perceptuel.
+# Sinon, une image à moins de IMAGES_DHASH_DISTANCE bits (sur 64) d'une image reçue dans les
+# IMAGES_DHASH_FENETRE dernières secondes est notée (ImageBlob.proche, rapport_stockage_images); elle est
+# quand même écrite, l'image voisine pouvant venir d'un autre employé ou d'une autre caméra.
+IMAGES_DHASH_DISTANCE = 0
+IMAGES_DHASH_FENETRE = 300
+IMAGES_DHASH_CANDIDATS = 500
+
+# Flux temps réel des alertes (voir prepa_api_app/temps_reel.py et async_views.py)
+TEMPS_REEL_BROKER = 'prepa_api_app.temps_reel.BrokerLocal'
+TEMPS_REEL_TAILLE_FILE = 100  # Messages en attente par abonné avant de jeter les plus anciens
+TEMPS_REEL_HEARTBEAT = 15  # Secondes entre deux commentaires ": ping"
+TEMPS_REEL_RECONNEXION_MS = 3000  # Délai de reconnexion conseillé à EventSource
+
 # django-cors-headers - https://github.com/adamchainz/django-cors-headers#setup
 CORS_URLS_REGEX = r"^/.*$"
 